@@ -0,0 +1,302 @@
+# -------------------------------------------------------------------------------------------------
+# Librerías
+# -------------------------------------------------------------------------------------------------
+# Biblioteca estándar
+import argparse
+import json
+from pathlib import Path
+import sqlite3
+import time
+
+# De terceros:
+import numpy as np
+
+# -------------------------------------------------------------------------------------------------
+# Constantes
+# -------------------------------------------------------------------------------------------------
+FOLDER_PATH = "data"
+DB_FILE = Path(f"{FOLDER_PATH}/salarios.db")
+JSON_RESULTS_FILE = Path(f"{FOLDER_PATH}/resultados.json")
+SUMMARY_FILE = Path(f"{FOLDER_PATH}/estadisticas.json")
+# Columnas de los posts con salario (para actualizar el resumen sin volver a leer todos los posts):
+STATE_FILE = Path(f"{FOLDER_PATH}/estadisticas_estado.npz")
+STATISTICS_VERSION = 1              # Cambiarla si cambia la forma de calcular el resumen (se arma de nuevo).
+
+# Percentiles a calcular (nombre -> proporción), con la misma interpolación lineal que np.percentile:
+PERCENTILES = {"p10": 0.10, "p25": 0.25, "median": 0.50, "p75": 0.75, "p90": 0.90}
+TRIM_PROPORTION = 0.10              # Proporción de montos que se descarta de cada extremo en la media recortada.
+OUTLIER_IQR_FACTOR = 1.5            # Un monto es atípico si se aleja más de este factor del rango intercuartil.
+LOCAL_UTC_OFFSET = -time.timezone   # Los timestamps de los posts son de la hora local (para agrupar por mes).
+DECIMALS = 2
+
+# -------------------------------------------------------------------------------------------------
+# Clases
+# -------------------------------------------------------------------------------------------------
+class SalaryStatistics:
+    '''Clase que arma un resumen de los salarios por tipo y moneda (cantidad, media, media recortada, percentiles, mediana, montos atípicos y lo mismo por mes) y lo guarda en un archivo chico, para leerlo sin tocar los posts. Guarda aparte las columnas de los posts con salario para que, al llegar posts nuevos, editados o borrados, sólo se calculen de nuevo los grupos (tipo y moneda) que cambiaron.'''
+
+    def __init__(self, file=SUMMARY_FILE, state_file=STATE_FILE):
+        self.file = Path(file)
+        self.state_file = Path(state_file)
+        self.groups = []                    # (Tipo, moneda) de cada código de grupo.
+        self.post_number = np.empty(0, np.int64)
+        self.timestamp = np.empty(0, np.int64)
+        self.group = np.empty(0, np.int64)
+        self.amount = np.empty(0, np.float64)
+        self.summary = {}                   # Dicc. tipo -> moneda -> estadísticas.
+
+    def load(self):
+        '''Método que lee el resumen y las columnas guardadas. Retorna False si no existen o son de otra versión (hay que armarlo de nuevo).'''
+        try:
+            with open(self.file, "r", encoding="utf8") as open_file:
+                data = json.load(open_file)
+            with np.load(self.state_file) as state:
+                if data.get("version") != STATISTICS_VERSION or int(state["version"]) != STATISTICS_VERSION:
+                    return False
+                self.groups = list(zip(state["types"].tolist(), state["currencies"].tolist()))
+                self.post_number, self.timestamp = state["post_number"], state["timestamp"]
+                self.group, self.amount = state["group"], state["amount"]
+        except (OSError, ValueError, KeyError):
+            return False
+
+        self.summary = data["groups"]
+        return True
+
+    def rebuild(self, batch):
+        '''Método que arma el resumen de cero con todos los posts de un lote (ver update()).'''
+        self.__init__(self.file, self.state_file)
+        self.update(batch)
+
+    def update(self, batch, removed=()):
+        '''Método que agrega al resumen los posts de un lote (un PostBatch de obtener_salarios.py, o un objeto con sus mismas columnas) y quita los n° de posts de 'removed'. Un post que ya estaba se reemplaza (o se quita, si ya no tiene salario). Sólo se calculan de nuevo los grupos afectados.'''
+        post_number, timestamp, group, amount = self.get_batch_columns(batch)
+        replaced = np.isin(self.post_number, np.concatenate([np.asarray(batch.post_number, np.int64),
+                                                             np.asarray(list(removed), np.int64)]))
+        affected_groups = np.union1d(self.group[replaced], group)
+
+        keep = ~replaced
+        self.post_number = np.concatenate([self.post_number[keep], post_number])
+        self.timestamp = np.concatenate([self.timestamp[keep], timestamp])
+        self.group = np.concatenate([self.group[keep], group])
+        self.amount = np.concatenate([self.amount[keep], amount])
+
+        rows = np.isin(self.group, affected_groups)
+        statistics = get_groups_statistics(self.post_number[rows], self.timestamp[rows], self.group[rows], self.amount[rows])
+        for code in affected_groups.tolist():
+            salaries_type, currency = self.groups[code]
+            if code in statistics:
+                self.summary.setdefault(salaries_type, {})[currency] = statistics[code]
+            else:
+                # El grupo se quedó sin posts:
+                self.summary.get(salaries_type, {}).pop(currency, None)
+                if not self.summary.get(salaries_type, True):
+                    del self.summary[salaries_type]
+
+    def get_batch_columns(self, batch):
+        '''Método que retorna las columnas (arrays de numpy) de los posts del lote que tienen tipo, moneda y monto, con el tipo y la moneda como código de grupo.'''
+        type_codes = np.asarray(batch.type, np.int8).astype(np.int64)
+        currency_codes = np.asarray(batch.currency, np.int8).astype(np.int64)
+        amount = np.asarray(batch.amount, np.float64)
+        valid = (type_codes >= 0) & (currency_codes >= 0) & (amount > 0)          # NaN > 0 es False.
+
+        # Código de grupo del lote (tipo * monedas + moneda) -> código de grupo del resumen:
+        types, currencies = batch.categories["type"], batch.categories["currency"]
+        batch_groups = type_codes[valid] * max(len(currencies), 1) + currency_codes[valid]
+        codes = np.zeros(len(types) * len(currencies), np.int64)
+        for batch_group in np.unique(batch_groups).tolist():
+            key = (types[batch_group // len(currencies)], currencies[batch_group % len(currencies)])
+            if key not in self.groups:
+                self.groups.append(key)
+            codes[batch_group] = self.groups.index(key)
+
+        return (np.asarray(batch.post_number, np.int64)[valid], np.asarray(batch.timestamp, np.int64)[valid],
+                codes[batch_groups], amount[valid])
+
+    def save(self):
+        '''Método que guarda el resumen (json) y las columnas de los posts con salario (npz, sin pickle).'''
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        order = np.argsort(self.post_number, kind="stable")
+        types, currencies = zip(*self.groups) if self.groups else ((), ())
+        np.savez(self.state_file, version=STATISTICS_VERSION, post_number=self.post_number[order],
+                 timestamp=self.timestamp[order], group=self.group[order], amount=self.amount[order],
+                 types=np.array(types, dtype=str), currencies=np.array(currencies, dtype=str))
+
+        data = {"version": STATISTICS_VERSION, "updated": int(time.time()), "posts": len(self.post_number),
+                "groups": self.summary}
+        with open(self.file, "w", encoding="utf8") as open_file:
+            json.dump(data, open_file, ensure_ascii=False)
+
+
+class ColumnsBatch:
+    '''Clase con las columnas de varios posts (filas n° de post, fecha, tipo, moneda y monto) en el mismo formato que un PostBatch de obtener_salarios.py (sin tener que importarlo).'''
+
+    def __init__(self, rows):
+        post_numbers, timestamps, types, currencies, amounts = zip(*rows) if rows else ((), (), (), (), ())
+        self.post_number = np.array(post_numbers, np.int64)
+        self.timestamp = np.array(timestamps, np.int64)
+        self.amount = np.array([np.nan if amount is None else amount for amount in amounts], np.float64)
+        self.categories = {}
+        self.type = self.get_codes("type", types)
+        self.currency = self.get_codes("currency", currencies)
+
+    def get_codes(self, column, values):
+        '''Método que retorna los códigos (posición en 'categories', o -1 si no tiene) de los valores de una columna.'''
+        self.categories[column] = sorted({value for value in values if value is not None})
+        codes = {value: code for code, value in enumerate(self.categories[column])}
+
+        return np.array([codes.get(value, -1) for value in values], np.int8)
+
+# -------------------------------------------------------------------------------------------------
+# Funciones
+# -------------------------------------------------------------------------------------------------
+def get_segments(*keys):
+    '''Función que recibe columnas ya ordenadas y retorna el inicio y la cantidad de filas de cada segmento (filas seguidas con los mismos valores en todas las columnas).'''
+    changes = np.zeros(len(keys[0]), bool)
+    if len(changes):
+        changes[0] = True
+    for key in keys:
+        changes[1:] |= key[1:] != key[:-1]
+    starts = np.flatnonzero(changes)
+
+    return starts, np.diff(np.append(starts, len(changes)))
+
+
+def get_segments_statistics(amounts, starts, counts):
+    '''Función que calcula a la vez las estadísticas de todos los segmentos de un array de montos (ordenados dentro de cada segmento), sin recorrerlos uno por uno. Retorna un dicc. nombre -> array con el valor de cada segmento.'''
+    padded_amounts = np.append(amounts, 0.0)        # Para poder sumar hasta el final con reduceat.
+    ends = starts + counts
+    statistics = {"count": counts,
+                  "mean": np.add.reduceat(padded_amounts, starts) / counts,
+                  "min": amounts[starts],
+                  "max": amounts[ends - 1]}
+
+    # Media recortada: la suma de cada segmento sin los 'trimmed' montos de cada extremo:
+    trimmed = np.floor(counts * TRIM_PROPORTION).astype(np.int64)
+    trimmed_sums = np.add.reduceat(padded_amounts, np.column_stack([starts + trimmed, ends - trimmed]).ravel())[::2]
+    statistics["trimmed_mean"] = trimmed_sums / (counts - 2 * trimmed)
+
+    # Percentiles interpolando entre los dos montos más cercanos de cada segmento:
+    for name, proportion in PERCENTILES.items():
+        position = (counts - 1) * proportion
+        lower = np.floor(position).astype(np.int64)
+        upper = np.minimum(lower + 1, counts - 1)
+        lower_values, upper_values = amounts[starts + lower], amounts[starts + upper]
+        statistics[name] = lower_values + (upper_values - lower_values) * (position - lower)
+
+    return statistics
+
+
+def get_groups_statistics(post_number, timestamp, group, amount):
+    '''Función que calcula las estadísticas de cada grupo (código de tipo y moneda) y de cada mes dentro de cada grupo, junto a los montos atípicos (fuera de los límites de Tukey). Retorna un dicc. código de grupo -> estadísticas.'''
+    results = {}
+    if not len(group):
+        return results
+
+    # Por grupo:
+    order = np.lexsort((amount, group))
+    sorted_amounts = amount[order]
+    starts, counts = get_segments(group[order])
+    statistics = get_segments_statistics(sorted_amounts, starts, counts)
+    interquartile_range = statistics["p75"] - statistics["p25"]
+    statistics["lower_fence"] = statistics["p25"] - OUTLIER_IQR_FACTOR * interquartile_range
+    statistics["upper_fence"] = statistics["p75"] + OUTLIER_IQR_FACTOR * interquartile_range
+
+    # Montos atípicos, comparando cada fila con los límites de su grupo:
+    segment = np.repeat(np.arange(len(starts)), counts)
+    outliers = (sorted_amounts < statistics["lower_fence"][segment]) | (sorted_amounts > statistics["upper_fence"][segment])
+    sorted_post_numbers = post_number[order]
+
+    groups = group[order][starts].tolist()
+    for position, code in enumerate(groups):
+        results[code] = get_rounded_statistics(statistics, position)
+        results[code]["outliers"] = sorted(sorted_post_numbers[outliers & (segment == position)].tolist())
+        results[code]["months"] = {}
+
+    # Por mes (de la hora local) dentro de cada grupo:
+    months = (timestamp + LOCAL_UTC_OFFSET).astype("datetime64[s]").astype("datetime64[M]")
+    order = np.lexsort((amount, months, group))
+    sorted_months, sorted_groups = months[order], group[order]
+    starts, counts = get_segments(sorted_groups, sorted_months)
+    statistics = get_segments_statistics(amount[order], starts, counts)
+    for position, (code, month) in enumerate(zip(sorted_groups[starts].tolist(), sorted_months[starts].astype(str).tolist())):
+        results[code]["months"][month] = get_rounded_statistics(statistics, position)
+
+    return results
+
+
+def get_rounded_statistics(statistics, position):
+    '''Función que retorna como dicc. (con valores de Python, redondeados) las estadísticas de un segmento.'''
+    return {name: int(values[position]) if name == "count" else round(float(values[position]), DECIMALS)
+            for name, values in statistics.items()}
+
+
+def read_summary(file=SUMMARY_FILE):
+    '''Función que retorna el resumen de estadísticas guardado (dicc. tipo -> moneda -> estadísticas), o None si no existe.'''
+    try:
+        with open(file, "r", encoding="utf8") as open_file:
+            data = json.load(open_file)
+    except (OSError, ValueError):
+        return None
+
+    return data["groups"] if data.get("version") == STATISTICS_VERSION else None
+
+
+def read_posts_columns(file):
+    '''Función que lee de la base SQLite (o del json de resultados) las columnas de los posts necesarias para el resumen. Retorna un lote con las mismas columnas que un PostBatch.'''
+    columns = ["post_number", "timestamp", "type", "currency", "amount"]
+    file = Path(file)
+    if file.suffix == ".db":
+        connection = sqlite3.connect(file)
+        try:
+            rows = connection.execute(f"SELECT {', '.join(columns)} FROM posts ORDER BY post_number").fetchall()
+        finally:
+            connection.close()
+    else:
+        with open(file, "r", encoding="utf8") as open_file:
+            rows = [[post.get(column) for column in columns] for post in json.load(open_file)]
+
+    return ColumnsBatch(rows)
+
+
+def print_summary(summary):
+    '''Función que muestra por terminal las estadísticas principales de cada tipo de salario y moneda.'''
+    for salaries_type, currencies in sorted(summary.items()):
+        for currency, statistics in sorted(currencies.items()):
+            print(f"- {salaries_type} en {currency}: {statistics['count']} posts, mediana {statistics['median']}, "
+                  f"p25-p75 {statistics['p25']}-{statistics['p75']}, media recortada {statistics['trimmed_mean']}, "
+                  f"{len(statistics['outliers'])} atípicos, {len(statistics['months'])} meses.")
+
+
+def parse_arguments(args=None):
+    '''Función que define y parsea los argumentos recibidos por línea de comandos.'''
+    parser = argparse.ArgumentParser(description=f"Muestra el resumen de estadísticas de salarios ('{SUMMARY_FILE}'), que obtener_salarios.py actualiza en cada ejecución.")
+    parser.add_argument("--rebuild", action="store_true",
+                        help=f"Arma de nuevo el resumen a partir de todos los posts (de '{DB_FILE}' o, si no existe, de '{JSON_RESULTS_FILE}').")
+
+    return parser.parse_args(args)
+
+
+def main():
+    args = parse_arguments()
+    print("\n# Iniciando script.\n")
+
+    if args.rebuild:
+        initial_time = time.perf_counter()
+        statistics = SalaryStatistics()
+        statistics.rebuild(read_posts_columns(DB_FILE if DB_FILE.exists() else JSON_RESULTS_FILE))
+        statistics.save()
+        print(f"- Resumen armado con {len(statistics.post_number)} posts en {time.perf_counter() - initial_time:.3f} seg.")
+
+    initial_time = time.perf_counter()
+    summary = read_summary()
+    if summary is None:
+        raise SystemExit(f"- No hay resumen en '{SUMMARY_FILE}'. Ejecutar obtener_salarios.py o usar --rebuild.\n")
+    print(f"- Resumen leído en {(time.perf_counter() - initial_time) * 1000:.1f} ms:")
+    print_summary(summary)
+
+    print("\n# Fin del script.\n")
+
+# -------------------------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    main()
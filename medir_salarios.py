@@ -0,0 +1,1252 @@
+# -------------------------------------------------------------------------------------------------
+# Librerías
+# -------------------------------------------------------------------------------------------------
+# Biblioteca estándar:
+import argparse
+from contextlib import redirect_stdout
+import gc
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import io
+import json
+import os
+from pathlib import Path
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from importlib import util
+
+# De terceros:
+import regex as re
+
+# Propias:
+import obtener_salarios as salarios
+
+# -------------------------------------------------------------------------------------------------
+# Constantes
+# -------------------------------------------------------------------------------------------------
+HOST = "127.0.0.1"
+THREAD_PATH = "/threads/1-test-cuanto-ganas-cobras/page"
+POSTS_PER_PAGE = 15
+DEFAULT_PAGES = 20
+DEFAULT_LATENCY = 0.05              # Latencia (en seg.) que agrega el servidor local a cada request.
+DEFAULT_WORKERS = 8
+DEFAULT_POSTS = 2000
+FIXTURES_PATH = Path("fixtures")
+REGRESSION_CORPUS_FILE = FIXTURES_PATH / "salarios_regresion.txt"
+DEFAULT_REPETITIONS = 5
+DEFAULT_ROWS = 1000000
+DEFAULT_LOOP_ROWS = 20000           # Filas a convertir con el bucle anterior (fila por fila es muy lento).
+FIXTURE_PAGES_PATH = FIXTURES_PATH / "paginas"
+# Posts con saltos de linea y tabs en el código html (dentro de una frase, entre tags, en un <pre>) y el
+# texto con el salario que se debe obtener de cada uno:
+TEXT_FIXTURE_FILE = FIXTURES_PATH / "posts_texto.html"
+TEXT_FIXTURE_SALARIES = ["BRUTO: $ 350.000", "NETO: USD 2.000", "BRUTO: $ 280.000"]
+BASELINE_FILE = FIXTURES_PATH / "benchmark_base.json"
+DEFAULT_SUITE_REPETITIONS = 3
+DEFAULT_TOLERANCE = 0.25            # Cuánto más lenta (en proporción) puede ser una etapa respecto a la base.
+
+# Plantilla html similar a la de cada post de 3DG (vBulletin):
+POST_TEMPLATE = """
+<li class="postbitlegacy postbitim postcontainer old" id="post_{post_id}">
+  <div class="posthead">
+    <span class="postdate old"><span class="date">{date}</span></span>
+    <span class="nodecontrols"><a name="post{post_id}" href="#post{post_id}" class="postcounter">#{number}</a></span>
+  </div>
+  <div class="postdetails">
+    <div class="userinfo">
+      <div class="username_container">
+        <a class="username offline popupctrl" href="member.php?u={number}"><strong>usuario{number}</strong></a>
+      </div>
+    </div>
+    <div class="postbody">
+      <div class="content">
+        <blockquote class="postcontent restore ">
+          {quote}<b>Puesto</b>: Desarrollador<br />
+          <b>Salario mensual</b> {salary}<br />
+          <b>Antigüedad</b>: {years} años<br />
+        </blockquote>
+      </div>
+    </div>
+  </div>
+</li>"""
+QUOTE_TEMPLATE = """<div class="bbcode_container"><div class="bbcode_quote">Salario mensual BRUTO: $ 1</div></div>"""
+# El resto de la página (menú, foros relacionados, pie, scripts) que no tiene posts:
+NAV_ITEM_TEMPLATE = """<li class="navitem"><a href="forumdisplay.php?{number}">Foro {number}</a><span class="desc">Temas y mensajes del foro {number}</span></li>"""
+SCRIPT_TEMPLATE = """<script type="text/javascript">var vb_{number} = {{"id": {number}, "visible": true}};</script>"""
+DEFAULT_AMOUNTS = 200000
+DEFAULT_THREADS = 3
+DEFAULT_STATISTICS_POSTS = 100000
+STATISTICS_FIRST_TIMESTAMP = 1640995200     # 01/01/2022: los posts al azar se reparten durante ese año.
+NEW_POSTS_PROPORTION = 0.05         # Proporción de posts nuevos (y editados, y borrados) al actualizar el resumen.
+RETRIES_TIMEOUT = 0.5               # Timeout (en seg.) de cada request al probar los reintentos.
+RETRY_AFTER_SECONDS = 1
+THREADS_PATH_TEMPLATE = "/threads/{thread_id}-test-cuanto-ganas-cobras/page"
+# Reemplazos de montos de a un patrón por vez (como se hacía antes de REGEX_CONVERT_AMOUNT), para comparar:
+LEGACY_CONVERT_AMOUNT_PATTERNS = [("(?<=\d)[.|,](?=\d{3})", ""),
+                                  ("(?<=\d)[.|,](?=\d{1,2})", "."),
+                                  ("(MILLONES|MILLÓN|MILLON)", "1000000"),
+                                  ("(MILES|MIL|K)", "1000"),
+                                  ("(?<=\d)?\s?[a-zA-Z]+", "")]
+# Montos raros (además de los del corpus) para comprobar que ambos reemplazos den lo mismo:
+EXTRA_AMOUNTS = ["1.234.567,50", "12.345.67", "1,2,3", "1..000", "1000.", ".5", "1.5K", "300K", "2MILLONES",
+                 "1,2MILLÓN", "MILMILLON", "KILOS", "OK", "XMIL", "u$d3.500", "$1.000,-", "150mil", "1.0000",
+                 "1_000", "3.500usd", "€2,800", "1,5 MILLONES", "AR$ 250.000", "ÑANDÚ", "١٢٣", "2.5k/mes"]
+SALARIES = ["BRUTO: $ 350.000", "NETO: ARS 280000", "BRUTO USD 3.500", "BRUTO: 1,2 MILLONES",
+            "NETO: $300K", "EN MANO: U$D 2000", "BRUTO: € 2.800", ": no corresponde"]
+
+# -------------------------------------------------------------------------------------------------
+# Funciones
+# -------------------------------------------------------------------------------------------------
+def make_fake_page(page_number, edits=None, deleted=()):
+    '''Función que genera el html de una página falsa del thread, con el mismo formato de 3DG. En 'edits' se puede cambiar el salario de algunos posts (n° de post -> texto) y en 'deleted' quitar posts.'''
+    edits = edits or {}
+    posts = []
+    for position in range(POSTS_PER_PAGE):
+        number = (page_number - 1) * POSTS_PER_PAGE + position + 1
+        if number in deleted:
+            continue
+        posts.append(POST_TEMPLATE.format(post_id=1000000 + number,
+                                          number=number,
+                                          date=f"{(number % 28) + 1:02d}-02-22, 03:30 PM",
+                                          quote=QUOTE_TEMPLATE if number % 7 == 0 else "",
+                                          salary=edits.get(number, SALARIES[number % len(SALARIES)]),
+                                          years=number % 10))
+
+    body = "\n".join(posts)
+    navbar = "".join(NAV_ITEM_TEMPLATE.format(number=number) for number in range(150))
+    scripts = "".join(SCRIPT_TEMPLATE.format(number=number) for number in range(100))
+    html = (f"<html><head>{scripts}</head><body><ul id=\"navbar\">{navbar}</ul>"
+            f"<ol id=\"posts\">{body}</ol><ul id=\"footer\">{navbar}</ul></body></html>")
+
+    return html.encode("ISO-8859-1", "xmlcharrefreplace")
+
+
+def make_handler(total_pages, latency, pages=None, thread_path=THREAD_PATH, failures=None, requests_counter=None):
+    '''Función que crea la clase handler del servidor local que simula el thread de 3DG, con páginas falsas o con el html recibido en 'pages' (un array que se puede modificar con el servidor andando). Al igual que en vBulletin, pedir una página mayor a la última devuelve la última página. En 'failures' se puede indicar, por página, una lista de fallas a responder antes de la página (ej: {"status": 503, "headers": {"Retry-After": "1"}} o {"delay": 10}), y en 'requests_counter' se cuentan los requests de cada página.'''
+
+    class FakeThreadHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"       # Para permitir conexiones keep-alive.
+        disable_nagle_algorithm = True      # Si no, headers y html van en paquetes separados (~40 ms de espera).
+
+        def do_GET(self):
+            if not self.path.startswith(thread_path):
+                self.send_error(404)
+                return
+
+            page_number = min(int(self.path[len(thread_path):] or 1), len(pages) if pages else total_pages)
+            if requests_counter is not None:
+                requests_counter[page_number] = requests_counter.get(page_number, 0) + 1
+            failure = failures[page_number].pop(0) if failures and failures.get(page_number) else {}
+
+            time.sleep(latency + failure.get("delay", 0))
+            if "delay" in failure:
+                # Una página lenta: el cliente ya cortó por timeout, así que no se responde.
+                self.close_connection = True
+                return
+            if "status" in failure:
+                self.send_response(failure["status"])
+                for header, value in failure.get("headers", {}).items():
+                    self.send_header(header, value)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+            content = pages[page_number - 1] if pages else make_fake_page(page_number)
+            etag = f"\"{hashlib.md5(content).hexdigest()}\""
+
+            # Igual que un servidor real, responder 304 si la página no cambió (GET condicional):
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Type", "text/html; charset=ISO-8859-1")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, format, *args):
+            pass                            # Evitar mensajes por cada request.
+
+    return FakeThreadHandler
+
+
+def start_fake_server(total_pages, latency, pages=None, thread_path=THREAD_PATH, failures=None, requests_counter=None):
+    '''Función que levanta en un hilo aparte el servidor local que simula el thread de 3DG. Retorna el servidor y la url del thread (a la que sólo le falta el n° de página).'''
+    server = ThreadingHTTPServer((HOST, 0), make_handler(total_pages, latency, pages, thread_path, failures, requests_counter))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server, f"http://{HOST}:{server.server_port}{thread_path}"
+
+
+def check_fetch_retries(latency, workers):
+    '''Función que prueba la descarga con asyncio contra un servidor local que responde errores (503, 500, 429 con Retry-After, 404) y una página más lenta que el timeout: que reintente lo que corresponde, que respete Retry-After, que una página que falla no corte el resto y que se reintente en la ejecución siguiente. Retorna la cantidad de pruebas que fallaron.'''
+    number_pages = 8
+    retries = 3
+    failures = {2: [{"status": 503}, {"status": 500}],
+                3: [{"status": 429, "headers": {"Retry-After": str(RETRY_AFTER_SECONDS)}}],
+                4: [{"delay": RETRIES_TIMEOUT * 2}],
+                5: [{"status": 500}] * (retries + 1),
+                6: [{"status": 404}]}
+    requests_counter = {}
+    server, url = start_fake_server(number_pages, latency, failures=failures, requests_counter=requests_counter)
+    expected_posts = {page: salarios.get_posts_data_from(salarios.parse_html_to_posts(make_fake_page(page)))
+                      for page in range(1, number_pages + 1)}
+    original_values = salarios.URL, salarios.TIMEOUT, salarios.fetch_engine, salarios.MAX_RETRIES
+    original_folder = Path.cwd()
+    checks = []
+
+    with tempfile.TemporaryDirectory() as folder, redirect_stdout(io.StringIO()):
+        os.chdir(folder)
+        salarios.URL, salarios.TIMEOUT = url, RETRIES_TIMEOUT
+        salarios.set_download_options(workers, 0, "asyncio", retries)
+        try:
+            # 1) Las páginas que fallan no cortan la descarga del resto:
+            initial_time = time.perf_counter()
+            posts = salarios.get_all_post_from([], number_pages)
+            elapsed_time = time.perf_counter() - initial_time
+            failed_pages = salarios.read_failed_pages()
+            pages_ok = [page for page in range(1, number_pages + 1) if page not in (5, 6)]
+            checks.append(("Posts de las páginas sin errores", posts == [post for page in pages_ok for post in expected_posts[page]]))
+            checks.append((f"Páginas con errores guardadas ({failed_pages})", failed_pages == [5, 6]))
+            checks.append(("Reintentos de 503/500", requests_counter[2] == 3))
+            checks.append((f"Espera de Retry-After ({elapsed_time:.2f} seg.)", requests_counter[3] == 2 and elapsed_time >= RETRY_AFTER_SECONDS))
+            checks.append(("Reintento por timeout", requests_counter[4] == 2))
+            checks.append(("Tope de reintentos", requests_counter[5] == retries + 1))
+            checks.append(("Sin reintentos para 404", requests_counter[6] == 1))
+
+            # 2) En la ejecución siguiente (ya sin errores) se reintentan las páginas que fallaron:
+            posts = salarios.get_all_post_from([], number_pages, first_page=number_pages)
+            checks.append(("Páginas reintentadas en la ejecución siguiente",
+                           posts == expected_posts[5] + expected_posts[6] + expected_posts[number_pages]
+                           and not salarios.read_failed_pages()))
+
+            # 3) En modo streaming (con cada forma de descargar) una página que falla tampoco corta el flujo:
+            progress_file = Path(folder, "progreso.jsonl")
+            for engine in salarios.FETCH_ENGINES:
+                salarios.set_download_options(engine=engine)
+                failures[5] = [{"status": 500}] * (retries + 1)
+                salarios.run_streaming_pipeline(number_pages, progress_file=progress_file)
+                streamed_pages = [page for page, _ in salarios.read_progress_file(progress_file)]
+                failed_pages = salarios.read_failed_pages()
+                failures[5] = []
+                progress_file.unlink()
+                salarios.run_streaming_pipeline(number_pages, progress_file=progress_file)
+                retried_pages = [page for page, _ in salarios.read_progress_file(progress_file)]
+                progress_file.unlink()
+                checks.append((f"Streaming ({engine}): página con errores guardada ({failed_pages}) y reintentada",
+                               streamed_pages == [page for page in range(1, number_pages + 1) if page != 5] and failed_pages == [5]
+                               and retried_pages == list(range(1, number_pages + 1)) and not salarios.read_failed_pages()))
+
+            # 4) Con varios threads (--thread-urls) las páginas que fallan se guardan por thread y se reintentan:
+            salarios.set_download_options(engine="asyncio")
+            thread_failures = {}
+            thread_server, thread_url = start_fake_server(number_pages, latency, thread_path=THREADS_PATH_TEMPLATE.format(thread_id=2),
+                                                          failures=thread_failures)
+            try:
+                threads_failed_pages = []
+                for _ in range(2):
+                    contexts = salarios.make_thread_contexts([url, thread_url])
+                    salarios.find_threads_last_pages(contexts)
+                    # (La falla se agrega después de buscar la última página, para que sea al descargarla):
+                    thread_failures[3] = [{"status": 500}] * (retries + 1) if not threads_failed_pages else []
+                    salarios.get_all_threads_posts(contexts)
+                    threads_failed_pages.append(([salarios.read_failed_pages(context) for context in contexts],
+                                                 sorted(contexts[1].pages_results)))
+            finally:
+                thread_server.shutdown()
+            checks.append((f"Varios threads: página con errores guardada por thread ({threads_failed_pages[0][0]}) y reintentada",
+                           threads_failed_pages[0] == ([[], [3]], [page for page in range(1, number_pages + 1) if page != 3])
+                           and threads_failed_pages[1] == ([[], []], list(range(1, number_pages + 1)))))
+        finally:
+            os.chdir(original_folder)
+            salarios.URL, salarios.TIMEOUT = original_values[:2]
+            salarios.set_download_options(engine=original_values[2], retries=original_values[3])
+            server.shutdown()
+
+    print("\n# Descarga con asyncio y reintentos, y páginas con errores en streaming y con varios threads (contra servidor local con errores):")
+    for name, passed in checks:
+        print(f"- {name}: {'ok' if passed else 'FALLÓ'}")
+    print()
+
+    return sum(1 for _, passed in checks if not passed)
+
+
+def check_edited_posts(number_pages, latency, workers):
+    '''Función que descarga y analiza el thread del servidor local, edita, borra y agrega posts en el servidor y vuelve a descargar todas las páginas (como con --refresh). Comprueba que se detecten exactamente los posts nuevos, editados y borrados (según el hash de su texto), que sólo esos se analicen de nuevo y que la base quede igual a descargar el thread editado desde cero. Retorna la cantidad de pruebas que fallaron.'''
+    edits = {5: "BRUTO: USD 9.999", 2 * POSTS_PER_PAGE: "NETO: $ 123.456"}
+    deleted = {7, 3 * POSTS_PER_PAGE + 1}
+    new_posts = set(range(number_pages * POSTS_PER_PAGE + 1, (number_pages + 1) * POSTS_PER_PAGE + 1))
+    pages = [make_fake_page(page) for page in range(1, number_pages + 1)]
+    server, url = start_fake_server(number_pages, latency, pages)
+    original_values = salarios.URL, salarios.post_store
+    checks = []
+
+    with tempfile.TemporaryDirectory() as folder, redirect_stdout(io.StringIO()):
+        salarios.URL = url
+        salarios.set_download_options(workers=workers, requests_per_second=0)
+        try:
+            # 1) La 1° ejecución guarda en la base todos los posts, ya analizados:
+            salarios.post_store = salarios.PostStore(Path(folder, "salarios.db"))
+            posts = salarios.get_all_post_from([], number_pages)
+            salarios.add_salaries_data_to(posts, workers=1)
+            salarios.post_store.upsert_posts(posts)
+            salarios.post_store.changes = {name: set() for name in salarios.post_store.changes}
+
+            # 2) Se editan, borran y agregan posts en el thread, y se descarga todo de nuevo:
+            pages[:] = [make_fake_page(page, edits, deleted) for page in range(1, number_pages + 2)]
+            analyzed_posts = salarios.metrics.counters.get("posts_analyzed", 0)
+            salarios.get_all_post_from([], number_pages + 1)
+            pending_posts = salarios.post_store.get_posts(pending=True)
+            salarios.add_salaries_data_to(pending_posts, workers=1)
+            salarios.post_store.upsert_posts(pending_posts)
+            analyzed_posts = salarios.metrics.counters.get("posts_analyzed", 0) - analyzed_posts
+            refreshed_posts = salarios.post_store.get_posts()
+            changes = salarios.post_store.changes
+            salarios.post_store.close()
+
+            # 3) El thread editado, descargado y analizado desde cero (sin base):
+            salarios.post_store = None
+            expected_posts = [post.to_dict() for post in salarios.get_all_post_from([], number_pages + 1)]
+            salarios.add_salaries_data_to(expected_posts, workers=1)
+        finally:
+            salarios.URL, salarios.post_store = original_values
+            server.shutdown()
+
+    checks.append((f"Posts nuevos ({len(changes['added'])})", changes["added"] == new_posts))
+    checks.append((f"Posts editados ({sorted(changes['changed'])})", changes["changed"] == set(edits)))
+    checks.append((f"Posts borrados ({sorted(changes['removed'])})", changes["removed"] == deleted))
+    checks.append((f"Sólo se analizan los posts nuevos o editados ({analyzed_posts})", analyzed_posts == len(new_posts) + len(edits)))
+    checks.append(("Mismos posts que descargando desde cero",
+                   [{key: value for key, value in post.items() if value is not None} for post in refreshed_posts]
+                   == [{key: value for key, value in post.items() if value is not None} for post in expected_posts]))
+
+    print(f"\n# Posts nuevos, editados y borrados en {number_pages} páginas (servidor local):")
+    for name, passed in checks:
+        print(f"- {name}: {'ok' if passed else 'FALLÓ'}")
+    print()
+
+    return sum(1 for _, passed in checks if not passed)
+
+
+def check_last_page_search(latency):
+    '''Función que prueba la búsqueda de la última página contra el servidor local: con páginas nuevas, con la última conocida después de la real (el thread se achicó), con errores pasajeros en páginas intermedias y con una página que siempre falla (se debe quedar con la última conocida, sin guardar páginas). Retorna la cantidad de pruebas que fallaron.'''
+    number_pages = 12
+    cases = [("Páginas nuevas", 1, None, number_pages),
+             ("Última conocida después de la real", 40, None, number_pages),
+             ("Última conocida igual a la real", number_pages, None, number_pages),
+             ("Errores pasajeros (503) en todas las páginas", 3, {page: [{"status": 503}] for page in range(1, number_pages + 1)}, number_pages),
+             ("Página intermedia que siempre falla", 1, {8: [{"status": 500}] * 10}, 1)]
+    original_values = salarios.URL, salarios.MAX_RETRIES
+    checks = []
+
+    with redirect_stdout(io.StringIO()):
+        salarios.set_download_options(requests_per_second=0, retries=2)
+        try:
+            for name, last_known_page, failures, expected_page in cases:
+                server, salarios.URL = start_fake_server(number_pages, latency, failures=failures)
+                try:
+                    context = salarios.get_default_context()
+                    last_page = salarios.find_last_page(context, last_known_page)
+                    # Las páginas guardadas en la búsqueda deben ser las correctas (o ninguna, si falló):
+                    discovered_ok = all(posts[-1].get("id") == f"post_{1000000 + page * POSTS_PER_PAGE}"
+                                        for page, posts in context.discovered_pages.items())
+                    checks.append((f"{name} ({last_page})", last_page == expected_page and discovered_ok
+                                   and (expected_page == number_pages or not context.discovered_pages)))
+                finally:
+                    server.shutdown()
+        finally:
+            salarios.URL = original_values[0]
+            salarios.set_download_options(retries=original_values[1])
+
+    print("\n# Búsqueda de la última página (contra servidor local):")
+    for name, passed in checks:
+        print(f"- {name}: {'ok' if passed else 'FALLÓ'}")
+    print()
+
+    return sum(1 for _, passed in checks if not passed)
+
+
+def time_download(number_pages, workers):
+    '''Función que descarga todas las páginas con una cantidad de hilos dada. Retorna los posts obtenidos y los segundos que tardó.'''
+    salarios.set_download_options(workers=workers, requests_per_second=0)
+    initial_time = time.perf_counter()
+    posts = salarios.get_all_post_from([], number_pages, workers=workers)
+
+    return posts, time.perf_counter() - initial_time
+
+
+def benchmark_downloads(number_pages, latency, workers):
+    '''Función que compara la descarga secuencial contra la concurrente sobre el servidor local.'''
+    server, salarios.URL = start_fake_server(number_pages, latency)
+
+    try:
+        sequential_posts, sequential_time = time_download(number_pages, 1)
+        concurrent_posts, concurrent_time = time_download(number_pages, workers)
+    finally:
+        server.shutdown()
+
+    assert sequential_posts == concurrent_posts, "Los posts no coinciden entre ambos modos."
+
+    print(f"\n# Descarga de {number_pages} páginas (latencia de {latency} seg.):")
+    print(f"- Secuencial: {sequential_time:.2f} seg.")
+    print(f"- Concurrente ({workers} hilos): {concurrent_time:.2f} seg.")
+    print(f"- Mejora: x{sequential_time / concurrent_time:.1f}\n")
+
+
+def check_threads_crawler(number_threads, number_pages, latency, workers, engine=salarios.FETCH_ENGINE):
+    '''Función que descarga varios threads del servidor local de a uno (como el thread de URL) y todos a la vez (un contexto por thread, compartiendo los hilos de descarga o, con 'engine' asyncio, las descargas simultáneas). Comprueba que cada thread tenga la misma última página y los mismos posts en ambos modos. Retorna la cantidad de threads que no coinciden.'''
+    servers = []
+    urls = []
+    for position in range(number_threads):
+        # Cada thread con una cantidad de páginas distinta:
+        thread_path = THREADS_PATH_TEMPLATE.format(thread_id=position + 1)
+        server, url = start_fake_server(number_pages + position * 3, latency, thread_path=thread_path)
+        servers.append(server)
+        urls.append(url)
+
+    original_url = salarios.URL
+    salarios.set_download_options(workers=workers, requests_per_second=0)
+    try:
+        with redirect_stdout(io.StringIO()):
+            initial_time = time.perf_counter()
+            expected = []
+            for url in urls:
+                salarios.URL = url
+                last_page = salarios.find_last_page(salarios.get_default_context())
+                expected.append((last_page, salarios.get_all_post_from([], last_page)))
+            sequential_time = time.perf_counter() - initial_time
+
+            initial_time = time.perf_counter()
+            salarios.set_download_options(engine=engine)
+            contexts = salarios.make_thread_contexts(urls)
+            salarios.find_threads_last_pages(contexts)
+            salarios.get_all_threads_posts(contexts)
+            concurrent_time = time.perf_counter() - initial_time
+    finally:
+        salarios.URL = original_url
+        salarios.set_download_options(engine=salarios.FETCH_ENGINE)
+        for server in servers:
+            server.shutdown()
+
+    mismatches = [context.thread_id for context, (last_page, posts) in zip(contexts, expected)
+                  if (context.number_pages, context.get_results()) != (last_page, posts)]
+
+    print(f"\n# {number_threads} threads de {number_pages} a {number_pages + (number_threads - 1) * 3} páginas (latencia de {latency} seg., {workers} hilos):")
+    print(f"- De a un thread: {sequential_time:.2f} seg.")
+    print(f"- Todos a la vez ({engine}): {concurrent_time:.2f} seg.")
+    print(f"- Mejora: x{sequential_time / concurrent_time:.1f}")
+    print(f"- Threads con posts distintos: {len(mismatches)} {mismatches if mismatches else ''}\n")
+
+    return len(mismatches)
+
+
+def load_salary_texts(number_posts, file=salarios.JSON_RESULTS_FILE):
+    '''Función que retorna un array de textos con salarios ('selected_text') para analizar. Se toman del archivo de resultados si existe; si no, de los salarios de ejemplo. Con 'number_posts' en 0 se retornan sólo los del archivo, sin repetir.'''
+    try:
+        with open(file, "r") as open_file:
+            texts = [post["selected_text"] for post in json.load(open_file) if post.get("selected_text")]
+    except (OSError, ValueError):
+        texts = []
+
+    if not number_posts:
+        return texts
+
+    if not texts:
+        texts = [salarios.get_value_from_string(f"Salario mensual {salary}") for salary in SALARIES]
+        texts = [text for text in texts if text]
+
+    return [texts[position % len(texts)] for position in range(number_posts)]
+
+
+def benchmark_nlp(number_posts, batch_size):
+    '''Función que compara el análisis de salarios de a un post contra el análisis en lotes con nlp.pipe.'''
+    texts = load_salary_texts(number_posts)
+
+    initial_time = time.perf_counter()
+    single_values = [salarios.analize_and_get_data_from(text) for text in texts]
+    single_time = time.perf_counter() - initial_time
+
+    initial_time = time.perf_counter()
+    batch_values = salarios.analize_all_and_get_data_from(texts, batch_size)
+    batch_time = time.perf_counter() - initial_time
+
+    assert single_values == batch_values, "Los resultados no coinciden entre ambos modos."
+
+    print(f"\n# Análisis NLP de {number_posts} textos con salarios:")
+    print(f"- De a un post: {number_posts / single_time:.0f} posts/seg.")
+    print(f"- En lotes de {batch_size} (nlp.pipe): {number_posts / batch_time:.0f} posts/seg.")
+    print(f"- Mejora: x{single_time / batch_time:.1f}\n")
+
+
+def benchmark_processes(number_posts, workers, batch_size):
+    '''Función que compara el análisis de salarios en un solo proceso contra el análisis repartido en varios procesos.'''
+    texts = load_salary_texts(number_posts)
+
+    initial_time = time.perf_counter()
+    single_values = salarios.analize_texts(texts, batch_size, workers=1)
+    single_time = time.perf_counter() - initial_time
+
+    initial_time = time.perf_counter()
+    pool_values = salarios.analize_texts(texts, batch_size, workers=workers)
+    pool_time = time.perf_counter() - initial_time
+
+    assert single_values == pool_values, "Los resultados no coinciden entre ambos modos."
+
+    print(f"\n# Análisis NLP de {number_posts} textos con salarios:")
+    print(f"- 1 proceso: {single_time:.2f} seg. ({number_posts / single_time:.0f} posts/seg.)")
+    print(f"- {workers} procesos: {pool_time:.2f} seg. ({number_posts / pool_time:.0f} posts/seg.)")
+    print(f"- Mejora: x{single_time / pool_time:.1f}\n")
+
+
+def time_python_code(code, repetitions):
+    '''Función que ejecuta un código en un intérprete de Python nuevo varias veces y retorna la mediana de segundos que tardó cada ejecución.'''
+    times = []
+    for _ in range(repetitions):
+        initial_time = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True)
+        times.append(time.perf_counter() - initial_time)
+
+    return statistics.median(times)
+
+
+def benchmark_startup(repetitions):
+    '''Función que mide el costo de inicio de obtener_salarios.py: el intérprete solo, la importación del módulo y la carga del modelo de spaCy.'''
+    python_time = time_python_code("pass", repetitions)
+    import_time = time_python_code("import obtener_salarios", repetitions)
+    nlp_time = time_python_code("import obtener_salarios; obtener_salarios.get_nlp()", repetitions)
+
+    print(f"\n# Tiempo de inicio (mediana de {repetitions} ejecuciones):")
+    print(f"- Intérprete de Python: {python_time:.3f} seg.")
+    print(f"- import obtener_salarios: {import_time - python_time:.3f} seg.")
+    print(f"- Carga del modelo de spaCy (get_nlp): {nlp_time - import_time:.3f} seg.\n")
+
+
+def load_fixture_pages(number_pages):
+    '''Función que retorna el html de las páginas guardadas en 'fixtures/paginas/'. Si no hay ninguna, se generan páginas falsas con el formato de 3DG.'''
+    files = sorted(FIXTURE_PAGES_PATH.glob("*.html"))
+    if files:
+        return [file.read_bytes() for file in files]
+
+    return [make_fake_page(page_number) for page_number in range(1, number_pages + 1)]
+
+
+def get_posts_info(all_posts):
+    '''Función que retorna los datos (como texto) de username, n° de post, fecha y texto de cada post.'''
+    return [[str(tag) for tag in salarios.get_specific_user_info(post)] for post in all_posts]
+
+
+def get_posts_info_with_find(all_posts):
+    '''Función que retorna los mismos datos que get_posts_info(), pero con un 'find' por dato (como antes).'''
+    return [[str(post.find("a", class_=salarios.USERNAME_CLASS)),
+             str(post.find("a", class_=salarios.NUMBER_POST_CLASS)),
+             str(post.find("span", class_=salarios.DATE_POST_CLASS)),
+             str(post.find("blockquote", class_=salarios.BLOCKQUOTE_CLASS))] for post in all_posts]
+
+
+def benchmark_parsing(number_pages):
+    '''Función que compara el tiempo y la memoria para parsear páginas (y extraer los datos de cada post) con cada parser de BS4, con y sin SoupStrainer.'''
+    pages = load_fixture_pages(number_pages)
+    reference = [get_posts_info_with_find(salarios.parse_html_to_posts(page, salarios.HTML_PARSER, False))
+                 for page in pages]
+
+    print(f"\n# Parseo de {len(pages)} páginas ({sum(map(len, pages)) // 1024} KB):")
+    for parser in salarios.HTML_PARSERS:
+        if parser != salarios.HTML_PARSER and not util.find_spec(parser):
+            print(f"- {parser}: no instalado.")
+            continue
+
+        for strainer in [False, True]:
+            # 1° se mide el tiempo y luego, por separado, la memoria (tracemalloc hace todo más lento):
+            initial_time = time.perf_counter()
+            for page, page_reference in zip(pages, reference):
+                posts_info = get_posts_info(salarios.parse_html_to_posts(page, parser, strainer))
+                assert posts_info == page_reference, f"Los datos de los posts no coinciden ({parser})."
+            total_time = time.perf_counter() - initial_time
+
+            peak_memory = 0
+            for page in pages:
+                tracemalloc.start()
+                all_posts = salarios.parse_html_to_posts(page, parser, strainer)
+                peak_memory = max(peak_memory, tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+                del all_posts
+
+            print(f"- {parser}{' + SoupStrainer' if strainer else ''}: "
+                  f"{total_time * 1000 / len(pages):.1f} ms/página, "
+                  f"memoria máx. {peak_memory / 1024:.0f} KB/página")
+    print()
+
+
+def load_results(number_posts, file=salarios.JSON_RESULTS_FILE):
+    '''Función que retorna 'number_posts' posts con el formato de 'resultados.json'. Se toman del archivo de resultados si existe; si no, se generan con los salarios de ejemplo.'''
+    try:
+        with open(file, "r") as open_file:
+            posts = json.load(open_file)
+    except (OSError, ValueError):
+        posts = []
+
+    if not posts:
+        posts = [{"post_number": position, "username": f"usuario{position}", "timestamp": 1643772600,
+                  "post": f"|> Puesto: Desarrollador  |> Salario mensual {salary}  |> Antigüedad: 1 años||"}
+                 for position, salary in enumerate(SALARIES, 1)]
+        salarios.add_salaries_data_to(posts)
+
+    return [dict(posts[position % len(posts)], post_number=position + 1) for position in range(number_posts)]
+
+
+def save_to_sqlite_file(file, posts):
+    '''Función que guarda posts en una base SQLite nueva, igual que obtener_salarios.py.'''
+    post_store = salarios.PostStore(file)
+    post_store.upsert_posts(posts)
+    post_store.close()
+
+
+def read_sqlite_file(file, columns):
+    '''Función que lee con pandas sólo algunas columnas de los posts de una base SQLite.'''
+    import pandas as pd
+
+    connection = sqlite3.connect(file)
+    try:
+        return pd.read_sql_query(f"SELECT {', '.join(columns)} FROM posts ORDER BY post_number", connection)
+    finally:
+        connection.close()
+
+
+def benchmark_formats(number_posts):
+    '''Función que compara el tamaño y el tiempo de escritura y de lectura (con pandas) de los resultados en json, json lines, parquet y SQLite.'''
+    import pandas as pd
+
+    columns = ["post_number", "type", "currency", "amount"]
+
+    posts = load_results(number_posts)
+    with tempfile.TemporaryDirectory() as folder:
+        formats = [("json", Path(folder, "resultados.json"), salarios.save_to_json_file, pd.read_json, {}),
+                   ("jsonl", Path(folder, "resultados.jsonl"), salarios.save_to_jsonl_file, pd.read_json,
+                    {"lines": True}),
+                   ("parquet", Path(folder, "resultados.parquet"), salarios.save_to_parquet_file, pd.read_parquet,
+                    {"columns": columns}),
+                   ("sqlite", Path(folder, "salarios.db"), save_to_sqlite_file, read_sqlite_file,
+                    {"columns": columns})]
+
+        measures = []
+        for name, file, save_function, read_function, read_options in formats:
+            if name == "parquet" and not util.find_spec("pyarrow"):
+                continue
+            initial_time = time.perf_counter()
+            save_function(file, posts)
+            write_time = time.perf_counter() - initial_time
+
+            initial_time = time.perf_counter()
+            df = read_function(file, **read_options)
+            read_time = time.perf_counter() - initial_time
+            assert len(df) == len(posts), f"Se leyeron {len(df)} posts de {len(posts)} ({name})."
+            measures.append((name, file.stat().st_size, write_time, read_time))
+
+    print(f"\n# Formatos de resultados ({len(posts)} posts):")
+    for name, size, write_time, read_time in measures:
+        print(f"- {name}: {size / 1024:.0f} KB, escritura {write_time * 1000:.0f} ms, lectura {read_time * 1000:.0f} ms")
+    print()
+
+
+def make_salaries_dataframe(number_rows):
+    '''Función que retorna un dataframe con 'number_rows' salarios al azar (con las columnas de resultados.json que usa plotear_salarios.py).'''
+    import numpy as np
+    import pandas as pd
+
+    generator = np.random.default_rng(0)
+    amounts = generator.uniform(1000, 1000000, number_rows).round()
+    amounts[generator.random(number_rows) < 0.1] = np.nan        # Posts sin salario.
+    currencies = generator.choice(np.array(["ARS", "USD", "EUR", None], dtype=object), number_rows)
+
+    return pd.DataFrame({"post_number": np.arange(1, number_rows + 1),
+                         "type": generator.choice(["BRUTO", "NETO"], number_rows),
+                         "currency": currencies,
+                         "amount": amounts})
+
+
+def change_to_pesos_by_row(df, amount_counter, dolar_blue, euro_blue):
+    '''Función con la conversión a pesos anterior (fila por fila, con iloc), para comparar contra la vectorizada.'''
+    amount_column = df.columns.get_loc("amount")
+    currency_column = df.columns.get_loc("currency")
+
+    for x in range(len(df)):
+        if df.iloc[x, amount_column] > 0:
+            amount_counter += 1
+        if df.iloc[x, currency_column] == "USD":
+            df.iloc[x, amount_column] *= dolar_blue
+        elif df.iloc[x, currency_column] == "EUR":
+            df.iloc[x, amount_column] *= euro_blue
+
+    return df, amount_counter
+
+
+def benchmark_pesos_conversion(number_rows, loop_rows, dolar_blue=200.0, euro_blue=210.0):
+    '''Función que compara el tiempo de la conversión a pesos fila por fila contra la vectorizada de plotear_salarios.py (que den lo mismo se prueba en tests/test_plotear_salarios.py).'''
+    import plotear_salarios
+
+    rates = {"USD": dolar_blue, "EUR": euro_blue}
+    df = make_salaries_dataframe(number_rows)
+
+    # El bucle es lento: se mide con pocas filas y se estima para el total:
+    sample = df.head(loop_rows)
+    initial_time = time.perf_counter()
+    change_to_pesos_by_row(sample.copy(), 0, dolar_blue, euro_blue)
+    loop_time = time.perf_counter() - initial_time
+
+    initial_time = time.perf_counter()
+    plotear_salarios.change_to_pesos(df, 0, rates)
+    vectorized_time = time.perf_counter() - initial_time
+    estimated_loop_time = loop_time * number_rows / len(sample)
+
+    print(f"\n# Conversión a pesos de {number_rows} filas:")
+    print(f"- Fila por fila: {estimated_loop_time:.1f} seg. (estimado a partir de {len(sample)} filas)")
+    print(f"- Vectorizada: {vectorized_time:.3f} seg.")
+    print(f"- Mejora: x{estimated_loop_time / vectorized_time:.0f}\n")
+
+
+def record_fixture_pages(number_pages):
+    '''Función que descarga las primeras páginas del thread real de 3DG y las guarda en 'fixtures/paginas/', para usarlas en las mediciones.'''
+    FIXTURE_PAGES_PATH.mkdir(parents=True, exist_ok=True)
+    for page_number in range(1, number_pages + 1):
+        file = FIXTURE_PAGES_PATH / f"pagina{page_number:04d}.html"
+        file.write_bytes(salarios.get_html_from_page(page_number))
+        print(f"- Página {page_number} guardada en '{file}'.")
+
+
+def measure_stage(function, items, repetitions):
+    '''Función que llama a 'function' con cada item, 'repetitions' veces, sin mostrar lo que imprima. Retorna los segundos de cada llamada y el pico de memoria de una pasada más (medida aparte, porque tracemalloc hace todo más lento).'''
+    latencies = []
+    with redirect_stdout(io.StringIO()):
+        for _ in range(repetitions):
+            for item in items:
+                initial_time = time.perf_counter()
+                function(item)
+                latencies.append(time.perf_counter() - initial_time)
+
+        tracemalloc.start()
+        for item in items:
+            function(item)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return latencies, peak_memory
+
+
+def summarize_stage(latencies, peak_memory):
+    '''Función que retorna un dicc. con la cantidad de llamadas, las llamadas por seg., los percentiles 50, 95 y 99 de latencia (en ms) y el pico de memoria (en KB) de una etapa.'''
+    percentiles = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else latencies * 99
+
+    return {"calls": len(latencies),
+            "per_second": round(len(latencies) / sum(latencies), 1),
+            "p50_ms": round(percentiles[49] * 1000, 3),
+            "p95_ms": round(percentiles[94] * 1000, 3),
+            "p99_ms": round(percentiles[98] * 1000, 3),
+            "peak_kb": round(peak_memory / 1024)}
+
+
+def get_suite_stages(number_pages, folder):
+    '''Función que prepara los datos de entrada de cada etapa de obtener_salarios.py y plotear_salarios.py (una a partir de la salida de la anterior). Retorna un array de (nombre, función, items).'''
+    import pandas as pd
+    import plotear_salarios
+
+    pages = range(1, number_pages + 1)
+    all_posts = [post for page in pages for post in salarios.get_page_and_parse_to_bs4(page)]
+    blockquotes = [salarios.remove_quote(salarios.get_specific_user_info(post)[3]) for post in all_posts]
+    texts = [salarios.remove_problematic_chars(salarios.parse_bs4_to_markdown(blockquote)) for blockquote in blockquotes]
+    salary_texts = [text for text in map(salarios.get_value_from_string, texts) if text]
+
+    with redirect_stdout(io.StringIO()):
+        results = salarios.get_all_post_from([], number_pages, workers=1)
+        salarios.add_salaries_data_to(results)
+    df = pd.DataFrame([post.to_dict() for post in results])     # Igual al que arma plotear_salarios.py al leer resultados.json.
+    rates = {"USD": 200.0, "EUR": 210.0}
+
+    return [("fetch html", salarios.get_html_from_page, pages),
+            ("get_page_and_parse_to_bs4", salarios.get_page_and_parse_to_bs4, pages),
+            ("parse_bs4_to_markdown", salarios.parse_bs4_to_markdown, blockquotes),
+            ("get_post_text", salarios.get_post_text, blockquotes),
+            ("get_value_from_string", salarios.get_value_from_string, texts),
+            ("analize_and_get_data_from", salarios.analize_and_get_data_from, salary_texts),
+            ("save_to_json_file", lambda data: salarios.save_to_json_file(Path(folder, "resultados.json"), data), [results]),
+            ("change_to_pesos", lambda data: plotear_salarios.change_to_pesos(data.copy(), 0, rates), [df])]
+
+
+def compare_with_baseline(summary, baseline, tolerance):
+    '''Función que compara la latencia (p50) de cada etapa contra la base guardada. Retorna los nombres de las etapas más lentas que la base por encima de la tolerancia.'''
+    regressions = []
+    for name, stage in summary.items():
+        if name in baseline and stage["p50_ms"] > baseline[name]["p50_ms"] * (1 + tolerance):
+            regressions.append(name)
+
+    return regressions
+
+
+def run_benchmark_suite(number_pages, repetitions, tolerance, save_baseline, baseline_file=BASELINE_FILE):
+    '''Función que mide por separado cada etapa (descarga, parseo, markdown, búsqueda del salario, NLP, guardado y conversión a pesos) contra páginas grabadas servidas localmente, y compara cada una con la base guardada. Retorna la cantidad de etapas más lentas que la base.'''
+    pages = load_fixture_pages(number_pages)
+    source = f"'{FIXTURE_PAGES_PATH}'" if FIXTURE_PAGES_PATH.exists() and any(FIXTURE_PAGES_PATH.glob("*.html")) else "páginas generadas"
+    server, salarios.URL = start_fake_server(len(pages), 0, pages)
+    salarios.set_download_options(workers=1, requests_per_second=0)
+    salarios.set_cache_options(enabled=False)
+
+    summary = {}
+    try:
+        with tempfile.TemporaryDirectory() as folder:
+            for name, function, items in get_suite_stages(len(pages), folder):
+                summary[name] = summarize_stage(*measure_stage(function, items, repetitions))
+    finally:
+        server.shutdown()
+
+    # La base depende de la máquina donde se mide, así que no se versiona: cada uno guarda la suya.
+    baseline_error = None
+    try:
+        with open(baseline_file, "r") as open_file:
+            baseline = json.load(open_file)
+    except FileNotFoundError:
+        baseline, baseline_error = {}, "no existe"
+    except (OSError, ValueError) as error:
+        baseline, baseline_error = {}, f"no se pudo leer ({error})"
+    regressions = compare_with_baseline(summary, baseline, tolerance)
+
+    print(f"\n# Etapas con {len(pages)} páginas ({source}), {repetitions} repeticiones:")
+    print(f"{'Etapa':<28}{'llamadas':>9}{'por seg.':>11}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'memoria KB':>12}{'vs. base':>10}")
+    for name, stage in summary.items():
+        ratio = f"x{stage['p50_ms'] / baseline[name]['p50_ms']:.2f}" if baseline.get(name, {}).get("p50_ms") else "-"
+        flag = " ⚠" if name in regressions else ""
+        print(f"{name:<28}{stage['calls']:>9}{stage['per_second']:>11}{stage['p50_ms']:>10}{stage['p95_ms']:>10}"
+              f"{stage['p99_ms']:>10}{stage['peak_kb']:>12}{ratio:>10}{flag}")
+
+    if save_baseline:
+        baseline_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(baseline_file, "w") as open_file:
+            json.dump(summary, open_file, indent=4)
+        print(f"\n- Base guardada en '{baseline_file}'.")
+    elif not baseline:
+        print(f"\n- La base '{baseline_file}' {baseline_error or 'está vacía'}: no se compara ninguna etapa (columna 'vs. base' en '-').")
+        print("- Guardar una base de esta máquina con: python medir_salarios.py etapas --guardar-base")
+    elif regressions:
+        print(f"\n- Etapas más lentas que la base (más de {tolerance:.0%}): {', '.join(regressions)}.")
+    print()
+
+    return 0 if save_baseline else len(regressions)
+
+
+def get_salary_texts_with(extractor, pages):
+    '''Función que obtiene el texto con el salario de cada post de las páginas con uno de los modos de extracción de texto. Retorna los textos y los segundos que tardó sólo la extracción.'''
+    texts = []
+    elapsed_time = 0
+    for page in pages:
+        for post in salarios.parse_html_to_posts(page):
+            blockquote = salarios.get_specific_user_info(post)[3]
+            initial_time = time.perf_counter()
+            if extractor == "direct":
+                text = salarios.get_post_text(blockquote)
+            else:
+                text = salarios.remove_problematic_chars(salarios.parse_bs4_to_markdown(salarios.remove_quote(blockquote)))
+            elapsed_time += time.perf_counter() - initial_time
+            texts.append(salarios.get_value_from_string(text))
+
+    return texts, elapsed_time
+
+
+def compare_text_extractors(number_pages):
+    '''Función que compara el texto de cada post obtenido en una pasada (get_post_text) contra el de markdown: el texto con el salario debe ser el mismo. También comprueba el salario de los posts de TEXT_FIXTURE_FILE. Retorna la cantidad de posts en los que no coincide.'''
+    pages = load_fixture_pages(number_pages)
+    markdown_texts, markdown_time = get_salary_texts_with("markdown", pages)
+    direct_texts, direct_time = get_salary_texts_with("direct", pages)
+    mismatches = [(markdown_text, direct_text) for markdown_text, direct_text in zip(markdown_texts, direct_texts)
+                  if markdown_text != direct_text]
+    # Los saltos de linea del código html no cortan una frase (ej: "Salario mensual\nBRUTO"):
+    fixture_texts = get_salary_texts_with("direct", [TEXT_FIXTURE_FILE.read_bytes()])[0]
+    fixture_mismatches = [(expected_text, text) for expected_text, text in zip(TEXT_FIXTURE_SALARIES, fixture_texts)
+                          if expected_text != text]
+
+    print(f"\n# Extracción del texto de {len(direct_texts)} posts:")
+    print(f"- Markdown: {markdown_time * 1000000 / len(markdown_texts):.0f} µs/post")
+    print(f"- Directo: {direct_time * 1000000 / len(direct_texts):.0f} µs/post")
+    print(f"- Mejora: x{markdown_time / direct_time:.1f}")
+    print(f"- Textos con salarios distintos: {len(mismatches)}")
+    for markdown_text, direct_text in mismatches[:10]:
+        print(f"  - Markdown: '{markdown_text}' / Directo: '{direct_text}'")
+    print(f"- Posts de '{TEXT_FIXTURE_FILE}' con un salario distinto al esperado: {len(fixture_mismatches)}")
+    for expected_text, text in fixture_mismatches:
+        print(f"  - Esperado: '{expected_text}' / Directo: '{text}'")
+    print()
+
+    return len(mismatches) + len(fixture_mismatches)
+
+
+def normalize_amount_string_legacy(string_number):
+    '''Función que deja un monto listo para float() aplicando un regex por vez, como lo hacía antes parse_string_to_integer().'''
+    string_number = re.sub(salarios.REGEX_REPLACE_INVALID_PATTERN, '', string_number, flags=re.IGNORECASE)
+    for pattern in LEGACY_CONVERT_AMOUNT_PATTERNS:
+        string_number = re.sub(pattern[0], pattern[1], string_number, flags=re.IGNORECASE)
+
+    return string_number
+
+
+def load_amount_strings(corpus_file=REGRESSION_CORPUS_FILE):
+    '''Función que retorna las palabras (sin repetir) de los textos de salarios del corpus de regresión y de los resultados guardados, más algunos montos raros.'''
+    with open(corpus_file, "r", encoding="utf8") as open_file:
+        texts = [line.strip().upper() for line in open_file if line.strip()]
+
+    words = [word for text in texts + load_salary_texts(0) for word in text.split()]
+
+    return list(dict.fromkeys(words + EXTRA_AMOUNTS))
+
+
+def benchmark_amounts(number_amounts):
+    '''Función que compara el reemplazo de montos de a un regex por vez contra el de una sola pasada (normalize_amount_string), en tiempo y en resultado. Retorna la cantidad de montos en los que no coinciden.'''
+    amounts = load_amount_strings()
+    mismatches = [(amount, normalize_amount_string_legacy(amount), salarios.normalize_amount_string(amount))
+                  for amount in amounts]
+    mismatches = [mismatch for mismatch in mismatches if mismatch[1] != mismatch[2]]
+
+    amounts = [amounts[position % len(amounts)] for position in range(number_amounts)]
+    times = {}
+    for name, function in [("Un regex por vez", normalize_amount_string_legacy),
+                           ("Una pasada", salarios.normalize_amount_string)]:
+        initial_time = time.perf_counter()
+        for amount in amounts:
+            function(amount)
+        times[name] = time.perf_counter() - initial_time
+
+    print(f"\n# Reemplazo de {number_amounts} montos ({len(set(amounts))} distintos):")
+    for name, seconds in times.items():
+        print(f"- {name}: {seconds * 1000000 / number_amounts:.2f} µs/monto")
+    print(f"- Mejora: x{times['Un regex por vez'] / times['Una pasada']:.1f}")
+    print(f"- Montos con resultados distintos: {len(mismatches)}")
+    for amount, legacy_string, new_string in mismatches[:10]:
+        print(f"  - '{amount}': antes='{legacy_string}' / ahora='{new_string}'")
+    print()
+
+    return len(mismatches)
+
+
+def make_posts_rows(number_posts, seed=0):
+    '''Función que retorna filas de posts al azar (n° de post, fecha, tipo, moneda y monto), algunas sin salario.'''
+    import numpy as np
+
+    generator = np.random.default_rng(seed)
+    timestamps = STATISTICS_FIRST_TIMESTAMP + generator.integers(0, 365 * 24 * 3600, number_posts)
+    amounts = generator.lognormal(12, 1, number_posts).round()
+    amounts[generator.random(number_posts) < 0.1] = np.nan        # Posts sin salario.
+    types = generator.choice(np.array(["BRUTO", "NETO", None], dtype=object), number_posts, p=[0.6, 0.3, 0.1])
+    currencies = generator.choice(np.array(["ARS", "USD", "EUR", None], dtype=object), number_posts, p=[0.6, 0.2, 0.1, 0.1])
+
+    return [(number, timestamp, salaries_type, currency, None if amount != amount else amount)
+            for number, timestamp, salaries_type, currency, amount
+            in zip(range(1, number_posts + 1), timestamps.tolist(), types, currencies, amounts.tolist())]
+
+
+def get_reference_statistics(rows):
+    '''Función que calcula las estadísticas del resumen grupo por grupo (y mes por mes) con pandas y numpy, para comparar contra las calculadas a la vez en estadisticas_salarios.py.'''
+    import numpy as np
+    import pandas as pd
+    import estadisticas_salarios as estadisticas
+
+    def get_statistics(amounts):
+        amounts = np.sort(amounts)
+        trimmed = int(len(amounts) * estadisticas.TRIM_PROPORTION)
+        statistics = {"count": len(amounts), "mean": np.mean(amounts), "min": amounts[0], "max": amounts[-1],
+                      "trimmed_mean": np.mean(amounts[trimmed:len(amounts) - trimmed])}
+        statistics.update({name: np.percentile(amounts, proportion * 100) for name, proportion in estadisticas.PERCENTILES.items()})
+        return statistics
+
+    df = pd.DataFrame(rows, columns=["post_number", "timestamp", "type", "currency", "amount"]).dropna()
+    df = df[df["amount"] > 0]
+    df["month"] = pd.to_datetime(df["timestamp"] + estadisticas.LOCAL_UTC_OFFSET, unit="s").dt.strftime("%Y-%m")
+    summary = {}
+    for (salaries_type, currency), group_df in df.groupby(["type", "currency"]):
+        statistics = get_statistics(group_df["amount"].to_numpy())
+        interquartile_range = statistics["p75"] - statistics["p25"]
+        statistics["lower_fence"] = statistics["p25"] - estadisticas.OUTLIER_IQR_FACTOR * interquartile_range
+        statistics["upper_fence"] = statistics["p75"] + estadisticas.OUTLIER_IQR_FACTOR * interquartile_range
+        outliers = (group_df["amount"] < statistics["lower_fence"]) | (group_df["amount"] > statistics["upper_fence"])
+        statistics["outliers"] = sorted(group_df["post_number"][outliers].tolist())
+        statistics["months"] = {month: get_statistics(month_df["amount"].to_numpy()) for month, month_df in group_df.groupby("month")}
+        summary.setdefault(salaries_type, {})[currency] = statistics
+
+    return summary
+
+
+def count_statistics_mismatches(summary, expected_summary, tolerance=0.011):
+    '''Función que retorna la cantidad de estadísticas (de grupos o meses) que no coinciden entre dos resúmenes. Los valores pueden diferir en el último decimal por el redondeo.'''
+    def count_mismatches(statistics, expected_statistics):
+        if statistics is None or statistics.keys() - {"outliers", "months"} != expected_statistics.keys() - {"outliers", "months"}:
+            return 1
+        return sum(1 for name, value in expected_statistics.items()
+                   if name not in ("outliers", "months") and abs(statistics[name] - value) > tolerance)
+
+    mismatches = 0
+    expected_groups = {(salaries_type, currency) for salaries_type, currencies in expected_summary.items() for currency in currencies}
+    groups = {(salaries_type, currency) for salaries_type, currencies in summary.items() for currency in currencies}
+    mismatches += len(groups ^ expected_groups)
+    for salaries_type, currency in groups & expected_groups:
+        statistics, expected_statistics = summary[salaries_type][currency], expected_summary[salaries_type][currency]
+        mismatches += count_mismatches(statistics, expected_statistics)
+        mismatches += statistics["outliers"] != expected_statistics["outliers"]
+        mismatches += len(statistics["months"].keys() ^ expected_statistics["months"].keys())
+        mismatches += sum(count_mismatches(statistics["months"].get(month), expected_month)
+                          for month, expected_month in expected_statistics["months"].items())
+
+    return mismatches
+
+
+def check_statistics(number_posts):
+    '''Función que compara el resumen de estadísticas (calculado a la vez para todos los grupos y meses) contra el cálculo grupo por grupo con pandas, y la actualización con posts nuevos, editados y borrados contra armar el resumen de cero. Retorna la cantidad de estadísticas que no coinciden.'''
+    import estadisticas_salarios as estadisticas
+
+    rows = make_posts_rows(number_posts)
+    number_changes = int(number_posts * NEW_POSTS_PROPORTION)
+    initial_rows = rows[:-number_changes]
+    # Posts editados (con otros datos al azar) y borrados entre los ya guardados:
+    edited_rows = [(number, *row[1:]) for number, row in zip(range(1, number_changes * 2, 2), make_posts_rows(number_changes, seed=1))]
+    removed_posts = list(range(2, number_changes * 2, 2))
+    changed_rows = rows[-number_changes:] + edited_rows
+    final_rows = {row[0]: row for row in initial_rows + changed_rows}
+    for number in removed_posts:
+        del final_rows[number]
+    final_rows = sorted(final_rows.values())
+
+    times = {}
+    with tempfile.TemporaryDirectory() as folder:
+        files = Path(folder, "estadisticas.json"), Path(folder, "estado.npz")
+        initial_time = time.perf_counter()
+        expected_summary = get_reference_statistics(final_rows)
+        times["Grupo por grupo (pandas)"] = time.perf_counter() - initial_time
+
+        batch = estadisticas.ColumnsBatch(final_rows)
+        initial_time = time.perf_counter()
+        rebuilt_statistics = estadisticas.SalaryStatistics(*files)
+        rebuilt_statistics.rebuild(batch)
+        times["Todos a la vez (de cero)"] = time.perf_counter() - initial_time
+
+        statistics = estadisticas.SalaryStatistics(*files)
+        statistics.rebuild(estadisticas.ColumnsBatch(initial_rows))
+        statistics.save()
+        batch = estadisticas.ColumnsBatch(changed_rows)
+        initial_time = time.perf_counter()
+        statistics = estadisticas.SalaryStatistics(*files)
+        loaded = statistics.load()
+        statistics.update(batch, removed_posts)
+        statistics.save()
+        times[f"Actualización con {len(changed_rows)} posts y {len(removed_posts)} borrados (leer, actualizar y guardar)"] = time.perf_counter() - initial_time
+
+        initial_time = time.perf_counter()
+        summary = estadisticas.read_summary(files[0])
+        times["Lectura del resumen"] = time.perf_counter() - initial_time
+        summary_size = files[0].stat().st_size
+
+    reference_mismatches = count_statistics_mismatches(rebuilt_statistics.summary, expected_summary)
+    update_mismatches = 0 if loaded and summary == rebuilt_statistics.summary else 1
+
+    print(f"\n# Estadísticas de {number_posts} posts ({len(final_rows)} tras editar, agregar y borrar):")
+    for name, seconds in times.items():
+        print(f"- {name}: {seconds * 1000:.1f} ms")
+    print(f"- Tamaño del resumen: {summary_size / 1024:.1f} KB")
+    print(f"- Estadísticas distintas a las de pandas: {reference_mismatches}")
+    print(f"- Actualización igual a armar el resumen de cero: {'ok' if not update_mismatches else 'FALLÓ'}\n")
+
+    return reference_mismatches + update_mismatches
+
+
+def get_posts_as_dicts(all_posts, plain_strings=False):
+    '''Función que obtiene los datos de cada post como antes de PostRecord: un dicc. por post, con el nombre de usuario como NavigableString de bs4 (o como str, con 'plain_strings').'''
+    posts = []
+    for post in all_posts:
+        username, post_number, date_post, text_post = salarios.get_specific_user_info(post)
+        posts.append({"post_number": int(post_number.string[1:]),
+                      "username": str(username.string) if plain_strings else username.string,
+                      "timestamp": salarios.parse_date_string_to_timestamp(date_post.get_text()),
+                      "post": salarios.get_post_text(text_post)})
+
+    return posts
+
+
+def add_known_salaries_data_to(posts, salary_values, text_mode="keep"):
+    '''Función que agrega a cada post su texto con el salario y sus 3 valores como add_salaries_data_to(), pero tomando los valores de un dicc. ya analizado (texto -> valores), para no medir la memoria de spaCy.'''
+    selected_texts = [salarios.get_value_from_string(post["post"]) for post in posts]
+    salarios.set_post_options(text_mode)
+    salarios.apply_post_text_mode(posts)
+    salarios.set_post_options()
+
+    for post, selected_text in zip(posts, selected_texts):
+        values = salary_values.get(selected_text) if selected_text else None
+        post["selected_text"] = selected_text or None
+        post["type"], post["currency"], post["amount"] = values or (None, None, None)
+
+    return posts
+
+
+def measure_retained_memory(function):
+    '''Función que ejecuta una función y retorna lo que retorna y los bytes que siguen ocupados (por lo retornado) al terminar.'''
+    gc.collect()
+    tracemalloc.start()
+    value = function()
+    gc.collect()
+    retained_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return value, retained_memory
+
+
+def benchmark_posts_memory(number_pages):
+    '''Función que compara la memoria que ocupan los posts de varias páginas (ya analizados) como dicc., como PostRecord (dejando, compartiendo o descartando su texto) y como columnas de un PostBatch.'''
+    pages = load_fixture_pages(number_pages)
+    # Los salarios se analizan una sola vez, antes de medir:
+    texts = [salarios.get_value_from_string(post.post) for page in pages for post in salarios.get_posts_data_from(salarios.parse_html_to_posts(page))]
+    texts = list(dict.fromkeys(text for text in texts if text))
+    salary_values = dict(zip(texts, salarios.analize_texts(texts)))
+
+    def get_posts(get_posts_data, text_mode="keep"):
+        posts = [post for page in pages for post in get_posts_data(salarios.parse_html_to_posts(page))]
+        return add_known_salaries_data_to(posts, salary_values, text_mode)
+
+    measures = []
+    for name, get_posts_data, text_mode in [("Dicc. por post (antes)", get_posts_as_dicts, "keep"),
+                                            ("Dicc. por post, con str", lambda all_posts: get_posts_as_dicts(all_posts, True), "keep"),
+                                            ("PostRecord", salarios.get_posts_data_from, "keep"),
+                                            ("PostRecord (--post-text intern)", salarios.get_posts_data_from, "intern"),
+                                            ("PostRecord (--post-text drop)", salarios.get_posts_data_from, "drop")]:
+        posts, retained_memory = measure_retained_memory(lambda: get_posts(get_posts_data, text_mode))
+        measures.append((name, retained_memory))
+    batch, retained_memory = measure_retained_memory(lambda: salarios.PostBatch.from_posts(posts))
+    measures.append(("PostBatch (sólo columnas de salarios)", retained_memory))
+
+    number_posts = len(batch)
+    before_memory = measures[0][1]
+    print(f"\n# Memoria de {number_posts} posts analizados ({len(pages)} páginas):")
+    for name, retained_memory in measures:
+        print(f"- {name}: {retained_memory / 1024 / 1024:.2f} MB ({retained_memory / number_posts:.0f} bytes/post, x{before_memory / retained_memory:.1f} menos)")
+    print()
+
+
+def parse_arguments(args=None):
+    '''Función que define y parsea los argumentos recibidos por línea de comandos.'''
+    parser = argparse.ArgumentParser(description="Mediciones de rendimiento de obtener_salarios.py.")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    downloads = subparsers.add_parser("descargas", help="Descarga secuencial vs. concurrente.")
+    downloads.add_argument("--paginas", type=int, default=DEFAULT_PAGES)
+    downloads.add_argument("--latencia", type=float, default=DEFAULT_LATENCY)
+    downloads.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+
+    nlp = subparsers.add_parser("nlp", help="Análisis de a un post vs. en lotes con nlp.pipe.")
+    nlp.add_argument("--posts", type=int, default=DEFAULT_POSTS)
+    nlp.add_argument("--batch-size", type=int, default=salarios.NLP_BATCH_SIZE)
+
+    processes = subparsers.add_parser("procesos", help="Análisis NLP en 1 proceso vs. en varios.")
+    processes.add_argument("--posts", type=int, default=DEFAULT_POSTS * 10)
+    processes.add_argument("--workers", type=int, default=DEFAULT_WORKERS // 2)
+    processes.add_argument("--batch-size", type=int, default=salarios.NLP_BATCH_SIZE)
+
+    startup = subparsers.add_parser("inicio", help="Tiempo de importación y de carga del modelo de spaCy.")
+    startup.add_argument("--repeticiones", type=int, default=DEFAULT_REPETITIONS)
+
+    parsing = subparsers.add_parser("parseo", help="Tiempo y memoria por página de cada parser de html.")
+    parsing.add_argument("--paginas", type=int, default=DEFAULT_PAGES)
+
+    formats = subparsers.add_parser("formatos", help="Tamaño y tiempo de lectura de json, json lines, parquet y SQLite.")
+    formats.add_argument("--posts", type=int, default=DEFAULT_POSTS * 10)
+
+    pesos = subparsers.add_parser("pesos", help="Conversión a pesos fila por fila vs. vectorizada.")
+    pesos.add_argument("--filas", type=int, default=DEFAULT_ROWS)
+    pesos.add_argument("--filas-bucle", type=int, default=DEFAULT_LOOP_ROWS)
+
+    suite = subparsers.add_parser("etapas", help="Tiempo, percentiles y memoria de cada etapa, comparados con una base guardada.")
+    suite.add_argument("--paginas", type=int, default=DEFAULT_PAGES)
+    suite.add_argument("--repeticiones", type=int, default=DEFAULT_SUITE_REPETITIONS)
+    suite.add_argument("--tolerancia", type=float, default=DEFAULT_TOLERANCE)
+    suite.add_argument("--guardar-base", action="store_true", help=f"Guarda los resultados como nueva base en '{BASELINE_FILE}'.")
+
+    record = subparsers.add_parser("grabar", help=f"Descarga páginas del thread real de 3DG en '{FIXTURE_PAGES_PATH}'.")
+    record.add_argument("--paginas", type=int, default=DEFAULT_PAGES)
+
+    text = subparsers.add_parser("texto", help="Texto de cada post vía markdown vs. en una pasada (y que el salario sea el mismo).")
+    text.add_argument("--paginas", type=int, default=DEFAULT_PAGES)
+
+    threads = subparsers.add_parser("hilos", help="Varios threads de a uno vs. todos a la vez (y que den los mismos posts).")
+    threads.add_argument("--hilos", type=int, default=DEFAULT_THREADS)
+    threads.add_argument("--paginas", type=int, default=DEFAULT_PAGES)
+    threads.add_argument("--latencia", type=float, default=DEFAULT_LATENCY)
+    threads.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    threads.add_argument("--fetch-engine", choices=salarios.FETCH_ENGINES, default=salarios.FETCH_ENGINE)
+
+    retries = subparsers.add_parser("reintentos", help="Descarga con asyncio contra un servidor con errores (reintentos, Retry-After, páginas fallidas).")
+    retries.add_argument("--latencia", type=float, default=DEFAULT_LATENCY)
+    retries.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+
+    edited = subparsers.add_parser("ediciones", help="Detección de posts nuevos, editados y borrados al descargar de nuevo el thread (por hash).")
+    edited.add_argument("--paginas", type=int, default=DEFAULT_PAGES)
+    edited.add_argument("--latencia", type=float, default=DEFAULT_LATENCY)
+    edited.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+
+    last_page = subparsers.add_parser("ultima", help="Búsqueda de la última página con páginas nuevas, un thread más corto y errores.")
+    last_page.add_argument("--latencia", type=float, default=DEFAULT_LATENCY)
+
+    memory = subparsers.add_parser("memoria", help="Memoria de los posts como dicc., como PostRecord y como columnas (PostBatch).")
+    memory.add_argument("--paginas", type=int, default=DEFAULT_PAGES)
+
+    summary = subparsers.add_parser("estadisticas", help="Resumen de estadísticas por grupo a la vez vs. con pandas, y actualizado vs. armado de cero.")
+    summary.add_argument("--posts", type=int, default=DEFAULT_STATISTICS_POSTS)
+
+    amounts = subparsers.add_parser("montos", help="Reemplazo de montos de a un regex vs. en una pasada (y que den lo mismo).")
+    amounts.add_argument("--montos", type=int, default=DEFAULT_AMOUNTS)
+
+    return parser.parse_args(args)
+
+
+def main():
+    args = parse_arguments()
+
+    if args.benchmark == "descargas":
+        benchmark_downloads(args.paginas, args.latencia, args.workers)
+    elif args.benchmark == "nlp":
+        benchmark_nlp(args.posts, args.batch_size)
+    elif args.benchmark == "procesos":
+        benchmark_processes(args.posts, args.workers, args.batch_size)
+    elif args.benchmark == "inicio":
+        benchmark_startup(args.repeticiones)
+    elif args.benchmark == "parseo":
+        benchmark_parsing(args.paginas)
+    elif args.benchmark == "formatos":
+        benchmark_formats(args.posts)
+    elif args.benchmark == "etapas":
+        sys.exit(1 if run_benchmark_suite(args.paginas, args.repeticiones, args.tolerancia, args.guardar_base) else 0)
+    elif args.benchmark == "grabar":
+        record_fixture_pages(args.paginas)
+    elif args.benchmark == "texto":
+        sys.exit(1 if compare_text_extractors(args.paginas) else 0)
+    elif args.benchmark == "hilos":
+        sys.exit(1 if check_threads_crawler(args.hilos, args.paginas, args.latencia, args.workers, args.fetch_engine) else 0)
+    elif args.benchmark == "reintentos":
+        sys.exit(1 if check_fetch_retries(args.latencia, args.workers) else 0)
+    elif args.benchmark == "ediciones":
+        sys.exit(1 if check_edited_posts(args.paginas, args.latencia, args.workers) else 0)
+    elif args.benchmark == "ultima":
+        sys.exit(1 if check_last_page_search(args.latencia) else 0)
+    elif args.benchmark == "memoria":
+        benchmark_posts_memory(args.paginas)
+    elif args.benchmark == "estadisticas":
+        sys.exit(1 if check_statistics(args.posts) else 0)
+    elif args.benchmark == "montos":
+        sys.exit(1 if benchmark_amounts(args.montos) else 0)
+    elif args.benchmark == "pesos":
+        benchmark_pesos_conversion(args.filas, args.filas_bucle)
+
+# -------------------------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    main()
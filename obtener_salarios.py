@@ -2,34 +2,123 @@
 # Librerías
 # -------------------------------------------------------------------------------------------------
 # Biblioteca estándar:
+import argparse
+from array import array
+import asyncio
+from bisect import bisect_right
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+import cProfile
 import datetime
+from email.utils import parsedate_to_datetime
+import gzip
+import hashlib
+from importlib import metadata, util
+from itertools import repeat
 import json
 import logging
+import io
+import os
 from pathlib import Path
+import pstats
+import queue
+import random
+import sqlite3
+import textwrap
+import threading
 import time
 import traceback
 from types import NoneType              # Si se usa Spacy con Python >=3.10
 import sys
+from urllib.parse import urlsplit
 
-# De terceros:
-from bs4 import BeautifulSoup
-from markdownify import MarkdownConverter as mdc
+# De terceros (bs4, markdownify, spaCy y aiohttp se importan recién al usarse, para no demorar el inicio):
 import regex as re                      # regex permite realizar multiples lookbehinds.
 import requests
-import spacy
-import en_core_web_sm
+from requests.adapters import HTTPAdapter
 
 # -------------------------------------------------------------------------------------------------
 # Constantes
 # -------------------------------------------------------------------------------------------------
 FOLDER_PATH = "data"
 JSON_RESULTS_FILE = Path(f"{FOLDER_PATH}/resultados.json")
-JSON_DB_FILE = Path(f"{FOLDER_PATH}/db.json")
+JSONL_RESULTS_FILE = Path(f"{FOLDER_PATH}/resultados.jsonl")
+PARQUET_RESULTS_FILE = Path(f"{FOLDER_PATH}/resultados.parquet")
+DB_FILE = Path(f"{FOLDER_PATH}/salarios.db")
+JSON_DB_FILE = Path(f"{FOLDER_PATH}/db.json")     # Anterior a la base SQLite (sólo se lee para migrar).
 LOG_FILE = Path(f"{FOLDER_PATH}/last_activity.log")
+CACHE_FOLDER_PATH = Path(f"{FOLDER_PATH}/cache")
+CACHE_INDEX_FILE = CACHE_FOLDER_PATH / "index.json"
+CACHE_MAX_MEGABYTES = 50            # Tamaño máximo del caché de páginas html (comprimidas).
+ANALYSIS_CACHE_FILE = Path(f"{FOLDER_PATH}/cache_analisis.json")
+THREADS_FOLDER_PATH = Path(f"{FOLDER_PATH}/hilos")            # Resultados de cada thread (con --thread-urls).
+SERIES_FILE = Path(f"{FOLDER_PATH}/serie_salarios.jsonl")     # Posts de todos los threads, ordenados por fecha.
+PROGRESS_FILE = Path(f"{FOLDER_PATH}/progreso.jsonl")
+FAILED_PAGES_FILE = Path(f"{FOLDER_PATH}/paginas_fallidas.json")     # Páginas a reintentar en la próxima ejecución.
+METRICS_FILE = Path(f"{FOLDER_PATH}/metricas.json")
+PROFILE_FILE = Path(f"{FOLDER_PATH}/perfil.prof")
+PROMETHEUS_PREFIX = "salarios3dg"
+PROFILE_TOP_FUNCTIONS = 15          # Funciones a mostrar (las de mayor tiempo acumulado) con --profile.
+STREAM_QUEUE_SIZE = 8               # Máximo de páginas en espera entre cada etapa del modo streaming.
+ANALYSIS_CACHE_MAX_ENTRIES = 20000  # Máximo de textos de salarios (ya analizados) a recordar.
 
 # Recordar que debe finalizar seguido del n° de página (Ej: ...cuanto-ganas-cobras/page10)
 URL = "https://foros.3dgames.com.ar/threads/1059022-2022-cuanto-ganas-cobras/page"
 TIMEOUT = 5
+DOWNLOAD_WORKERS = 4                # Cantidad de hilos para descargar páginas en simultáneo (1 = secuencial).
+REQUESTS_PER_SECOND = 5             # Límite de requests por segundo a un mismo host (0 = sin límite).
+HTTP_OK = 200
+HTTP_NOT_MODIFIED = 304
+FETCH_ENGINES = ["requests", "asyncio"]
+FETCH_ENGINE = "requests"           # Con "asyncio" las páginas se descargan con aiohttp, con reintentos.
+MAX_RETRIES = 3                     # Reintentos de cada página que falla (sólo con asyncio).
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+BACKOFF_BASE_SECONDS = 0.5          # Espera máxima del 1° reintento (se duplica en cada uno, al azar entre 0 y ese valor).
+BACKOFF_MAX_SECONDS = 30            # Tope de espera entre reintentos (también para 'Retry-After').
+BEYOND_LAST_PAGE = 1000000          # Un n° de página imposible: 3DG (vBulletin) devuelve la última página.
+REGEX_THREAD_ID_PATTERN = r"threads/(\d+)"
+
+# Base SQLite:
+POST_COLUMNS = ["post_number", "username", "timestamp", "post", "selected_text", "type", "currency", "amount"]
+DB_SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    post_number INTEGER PRIMARY KEY,
+    username TEXT,
+    timestamp INTEGER,
+    post TEXT,
+    content_hash TEXT,
+    selected_text TEXT,
+    type TEXT,
+    currency TEXT,
+    amount REAL,
+    analyzed INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS posts_timestamp ON posts (timestamp);
+CREATE INDEX IF NOT EXISTS posts_username ON posts (username);
+CREATE INDEX IF NOT EXISTS posts_currency ON posts (currency);
+CREATE INDEX IF NOT EXISTS posts_type ON posts (type);
+CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value);
+"""
+# Un post sin analizar con el mismo texto (normalizado) que el guardado no pisa el análisis anterior:
+DB_UPSERT_POST = """
+INSERT INTO posts (post_number, username, timestamp, post, content_hash, selected_text, type, currency, amount, analyzed)
+VALUES (:post_number, :username, :timestamp, :post, :content_hash, :selected_text, :type, :currency, :amount, :analyzed)
+ON CONFLICT (post_number) DO UPDATE SET
+    username = excluded.username, timestamp = excluded.timestamp, post = COALESCE(excluded.post, posts.post),
+    content_hash = COALESCE(excluded.content_hash, posts.content_hash),
+    selected_text = excluded.selected_text, type = excluded.type, currency = excluded.currency,
+    amount = excluded.amount, analyzed = excluded.analyzed
+WHERE excluded.analyzed OR posts.content_hash IS NOT excluded.content_hash
+"""
+# Con otro extractor de texto cambia el texto (y el hash) de todos los posts, pero no su análisis:
+DB_REHASH_POST = "UPDATE posts SET post = :post, content_hash = :content_hash WHERE post_number = :post_number"
+CONTENT_HASH_LENGTH = 16            # Caracteres (hexa) del hash del texto de cada post que se guardan en la base.
+POSTS_CHANGES_LISTED = 20           # Máximo de n° de posts nuevos/editados/borrados que se listan en el resumen.
+# Qué hacer con el texto de cada post una vez obtenido el texto con el salario ('selected_text'):
+POST_TEXT_MODES = ["keep", "intern", "drop"]
+POST_TEXT_MODE = "keep"             # "intern": textos iguales comparten memoria. "drop": se descarta (queda en la base).
+MISSING_CODE = -1                   # Código de un tipo de salario o moneda vacío en PostBatch.
 
 # Nombre de clases a buscar dentro de cada página html retornada desde la url de 3DG:
 POST_CLASS = "post_"                # El nombre de class de cada <li> que contienen posts.
@@ -40,6 +129,24 @@ DATE_POST_CLASS = "date"            # El nombre de class de cada <span> que cont
 # TIME_POST_CLASS = "time"          # El nombre de class de cada <span> que contiene la hora del post.
 QUOTE_CLASS = "bbcode_container"    # El nombre de class de cada <div> que contiene quotes.
 
+# Parsers de html para BS4 (lxml es más rápido, pero hay que instalarlo aparte):
+HTML_PARSER = "html.parser"
+HTML_PARSERS = ["html.parser", "lxml"]
+HTML_ENCODING = "ISO-8859-1"
+USE_SOUP_STRAINER = True            # Parsear sólo los <li> de posts en lugar de la página entera.
+TEXT_EXTRACTORS = ["direct", "markdown"]
+TEXT_EXTRACTOR = "direct"           # Extraer el texto de cada post recorriéndolo una vez, sin pasar por markdown.
+# Tags que (como en markdown) ocupan sus propias lineas dentro del texto de un post:
+BLOCK_TAGS = ["address", "blockquote", "div", "dl", "dd", "dt", "h1", "h2", "h3", "h4", "h5", "h6",
+              "hr", "li", "ol", "p", "pre", "table", "tr", "ul"]
+
+# Columnas (y sus tipos en pyarrow) del archivo parquet de resultados:
+PARQUET_COLUMNS = [("post_number", "int64"),
+                   ("timestamp", "timestamp[s]"),
+                   ("type", "string"),
+                   ("currency", "string"),
+                   ("amount", "float64")]
+
 # Caracteres especiales:
 ORIGINAL_NEWLINE_CHAR = "\n"        # El caracter de salto de linea dentro de posts.
 NEW_ENDLINE_CHAR = "|"              # El nuevo caracter de reemplazo (para evitar problemas).
@@ -48,15 +155,34 @@ NEW_ENDLINE_CHAR = "|"              # El nuevo caracter de reemplazo (para evita
 REGEX_SALARY_PATTERN_1 = "(?<=salario mensual) (?:bruto|neto)?\s?:?\s?[^|]*"
 # REGEX_SALARY_PATTERN_2 = "^[|]?[^|]*[|]" # Para probar en posts n° 4 11 108 111 112 138.
 REGEX_PROBLEMATIC_CHARS_PATTERN = r"\t|\r|\*"
+REGEX_REPEATED_SPACES_PATTERN = r"[\t ]+"
+REGEX_SOURCE_WHITESPACE_PATTERN = r"[ \t\r\n\f\v]+"   # Espacios y saltos de linea del html (no son saltos del post).
 REGEX_REPLACE_INVALID_PATTERN = "[^\w.,]+"
-REGEX_CONVERT_AMOUNT_PATTERNS = [("(?<=\d)[.|,](?=\d{3})", ""),
-                                 ("(?<=\d)[.|,](?=\d{1,2})", "."),
-                                 ("(MILLONES|MILLÓN|MILLON)", "1000000"),
-                                 ("(MILES|MIL|K)", "1000"),
-                                 ("(?<=\d)?\s?[a-zA-Z]+", "")]
+# Todos los reemplazos de un monto en una sola pasada (ej: "1.234,5" -> "1234.5", "MIL" -> "1000", "PESOS" -> ""):
+REGEX_CONVERT_AMOUNT_PATTERN = (r"(?P<thousands_sep>(?<=\d)[.,](?=\d{3}))"
+                                r"|(?P<decimal_sep>(?<=\d)[.,](?=\d))"
+                                r"|(?P<millions>MILLONES|MILLÓN|MILLON)"
+                                r"|(?P<thousands>MILES|MIL|K)"
+                                r"|(?P<letters>[A-JLN-Z]+|[A-Z])")
+AMOUNT_REPLACEMENTS = {"thousands_sep": "", "decimal_sep": ".", "millions": "1000000", "thousands": "1000", "letters": ""}
+
+# Regex ya compiladas (para no compilarlas o buscarlas en el caché de 're' en cada llamada):
+REGEX_THREAD_ID = re.compile(REGEX_THREAD_ID_PATTERN)
+REGEX_SALARY_1 = re.compile(REGEX_SALARY_PATTERN_1, re.IGNORECASE)
+REGEX_PROBLEMATIC_CHARS = re.compile(REGEX_PROBLEMATIC_CHARS_PATTERN)
+REGEX_REPEATED_SPACES = re.compile(REGEX_REPEATED_SPACES_PATTERN)
+REGEX_SOURCE_WHITESPACE = re.compile(REGEX_SOURCE_WHITESPACE_PATTERN)
+REGEX_REPLACE_INVALID = re.compile(REGEX_REPLACE_INVALID_PATTERN)
+REGEX_CONVERT_AMOUNT = re.compile(REGEX_CONVERT_AMOUNT_PATTERN, re.IGNORECASE)
 
 # NLP (spaCy):
 TOKENS_LIMIT = 6                    # Un límite de tokens a analizar por NLP (spaCy).
+NLP_BATCH_SIZE = 256                # Cantidad de textos por lote al analizar con nlp.pipe (0 = de a uno).
+NLP_DISABLED_PIPES = ["parser", "ner", "senter"]   # Componentes que no aportan nada al análisis.
+NLP_WORKERS = 1                     # Cantidad de procesos para el análisis NLP (1 = en este mismo proceso).
+NLP_CHUNKS_PER_WORKER = 4           # Partes en las que se divide el trabajo de cada proceso.
+PARSING_RULES_VERSION = 1           # Incrementar al cambiar la lógica de análisis (invalida el caché).
+NLP_MODEL_PACKAGE = "en_core_web_sm"
 NUM =  "NUM"
 PROPN = "PROPN"
 NOUN = "NOUN"
@@ -91,17 +217,571 @@ VALID_EUROS_CODES = ["€", "EU", "EURO", "EUROS"]
 # -------------------------------------------------------------------------------------------------
 # Variables
 # -------------------------------------------------------------------------------------------------
-# Método alternativo para cargar pipiline. Pero se necesita descargar 1° el mismo desde:
-# https://github.com/explosion/spacy-models/releases?q=+es_core_news_lg&expanded=true
-nlp = en_core_web_sm.load()
-# nlp = spacy.load("es_core_news_sm")
-nlp.enable_pipe("senter")
-
-
 # Variables globales:
+nlp = None              # Modelo de spaCy (se carga recién al usarse, ver get_nlp()).
 main_counter = 1        # Un simple contador de actividades que se muestran por terminal.
-results = []            # Array donde se guardan temp. todos los posts.
-number_pages = None     # Contador de total de páginas.
+default_context = None  # Contexto del thread de URL (el que se procesa si no se indica otro).
+context_lock = threading.Lock()
+session = None          # Sesión HTTP compartida (pool de conexiones keep-alive).
+rate_limiter = None     # Limitador de requests por segundo por host.
+fetch_engine = FETCH_ENGINE
+session_lock = threading.Lock()
+page_cache = None       # Caché en disco de las páginas html descargadas.
+offline = False         # Si es True, se usan las páginas del caché sin consultar al foro.
+html_parser = HTML_PARSER
+use_soup_strainer = USE_SOUP_STRAINER
+text_extractor = TEXT_EXTRACTOR
+analysis_stats = {"cache": 0, "nlp": 0}        # Contadores de textos analizados por cada vía.
+analysis_cache = None   # Caché de textos de salarios ya analizados por spaCy.
+post_store = None       # Base SQLite con los posts y los datos de cada ejecución.
+post_text_mode = POST_TEXT_MODE
+
+# -------------------------------------------------------------------------------------------------
+# Clases
+# -------------------------------------------------------------------------------------------------
+class ProbeError(Exception):
+    '''Excepción para cuando no se puede obtener una página al buscar la última página de un thread.'''
+
+
+class RateLimiter:
+    '''Clase que limita la cantidad de requests por segundo hacia cada host. Es segura entre hilos.'''
+
+    def __init__(self, requests_per_second):
+        self.interval = 1 / requests_per_second if requests_per_second > 0 else 0
+        self.next_times = {}        # Dicc. con el próximo horario permitido de cada host.
+        self.lock = threading.Lock()
+
+    def wait(self, url):
+        '''Método que bloquea el hilo actual hasta que se pueda realizar un request al host de la url.'''
+        delay = self.reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+
+    def reserve(self, url):
+        '''Método que reserva el próximo horario permitido para un request al host de la url y retorna los segundos que faltan para ese horario (sin bloquear, para poder esperar con asyncio).'''
+        if not self.interval:
+            return 0
+
+        host = urlsplit(url).netloc
+        with self.lock:
+            now = time.monotonic()
+            next_time = max(now, self.next_times.get(host, now))
+            self.next_times[host] = next_time + self.interval
+
+        return next_time - now
+
+
+class PageCache:
+    '''Clase que guarda en disco el html comprimido de cada página descargada, junto a su ETag, Last-Modified y hash. El contenido se guarda según su hash (así páginas iguales ocupan un solo archivo) y se borran las páginas menos usadas al superar un tamaño máximo. Es segura entre hilos.'''
+
+    def __init__(self, folder=CACHE_FOLDER_PATH, max_megabytes=CACHE_MAX_MEGABYTES):
+        self.folder = Path(folder)
+        self.index_file = self.folder / CACHE_INDEX_FILE.name
+        self.max_bytes = max_megabytes * 1024 * 1024
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        try:
+            with open(self.index_file, "r") as open_file:
+                self.index = json.load(open_file)
+        except (OSError, ValueError):
+            self.index = {}     # Dicc. 'hilo/página' -> datos de la página guardada.
+
+    def get_object_path(self, content_hash):
+        '''Método que retorna la ruta del archivo donde se guarda el html de un hash dado.'''
+        return self.folder / "objects" / f"{content_hash}.html.gz"
+
+    def get_entry(self, key):
+        '''Método que retorna los datos guardados de una página (o None si no está en caché).'''
+        with self.lock:
+            entry = self.index.get(key)
+            if entry and not self.get_object_path(entry["hash"]).exists():
+                entry = None
+            return dict(entry) if entry else None
+
+    def get_conditional_headers(self, entry):
+        '''Método que arma los headers para un GET condicional a partir de los datos de una página guardada.'''
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+        return headers
+
+    def load(self, key, entry):
+        '''Método que retorna el html guardado de una página, marcándola como usada recientemente.'''
+        with open(self.get_object_path(entry["hash"]), "rb") as open_file:
+            content = gzip.decompress(open_file.read())
+
+        with self.lock:
+            self.hits += 1
+            if key in self.index:
+                self.index[key]["accessed"] = time.time()
+
+        return content
+
+    def store(self, key, content, headers):
+        '''Método que guarda el html de una página y sus headers de validación (ETag y Last-Modified).'''
+        content_hash = hashlib.sha256(content).hexdigest()
+        object_path = self.get_object_path(content_hash)
+
+        if not object_path.exists():
+            object_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = object_path.with_name(f"{object_path.name}.{threading.get_ident()}.tmp")
+            with open(temp_path, "wb") as open_file:
+                open_file.write(gzip.compress(content))
+            os.replace(temp_path, object_path)
+
+        with self.lock:
+            self.misses += 1
+            self.index[key] = {"hash": content_hash,
+                               "etag": headers.get("ETag"),
+                               "last_modified": headers.get("Last-Modified"),
+                               "size": object_path.stat().st_size,
+                               "accessed": time.time()}
+            self.evict()
+
+    def evict(self):
+        '''Método que borra las páginas menos usadas hasta que el caché no supere su tamaño máximo. Se debe llamar con el lock tomado.'''
+        sizes = {entry["hash"]: entry["size"] for entry in self.index.values()}
+        total_bytes = sum(sizes.values())
+        if total_bytes <= self.max_bytes:
+            return
+
+        for key in sorted(self.index, key=lambda key: self.index[key]["accessed"]):
+            content_hash = self.index.pop(key)["hash"]
+            # Un mismo archivo puede estar compartido por varias páginas con igual contenido:
+            if all(entry["hash"] != content_hash for entry in self.index.values()):
+                self.get_object_path(content_hash).unlink(missing_ok=True)
+                total_bytes -= sizes[content_hash]
+            if total_bytes <= self.max_bytes:
+                break
+
+    def save(self):
+        '''Método que guarda en disco el índice de páginas del caché.'''
+        with self.lock:
+            self.evict()
+            self.folder.mkdir(parents=True, exist_ok=True)
+            with open(self.index_file, "w") as open_file:
+                json.dump(self.index, open_file)
+
+
+class AnalysisCache:
+    '''Clase que recuerda el resultado (tipo, moneda y monto) de cada texto de salario ya analizado por spaCy, descartando los menos usados al superar un máximo. Se guarda en disco junto a una versión que cambia con el modelo de spaCy y las reglas de análisis: si no coincide, se empieza de cero.'''
+
+    def __init__(self, file=ANALYSIS_CACHE_FILE, max_entries=ANALYSIS_CACHE_MAX_ENTRIES):
+        self.file = Path(file)
+        self.max_entries = max_entries
+        self.version = get_analysis_version()
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        try:
+            with open(self.file, "r", encoding="utf8") as open_file:
+                data = json.load(open_file)
+            if data["version"] == self.version:
+                self.entries.update((text, tuple(values)) for text, values in data["entries"])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    def get(self, text):
+        '''Método que retorna los 3 valores guardados de un texto (o None si no está en caché).'''
+        values = self.entries.get(normalize_salary_text(text))
+        if values is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(normalize_salary_text(text))
+
+        return values
+
+    def put(self, text, values):
+        '''Método que guarda los 3 valores de un texto, descartando los textos menos usados si se supera el máximo.'''
+        self.entries[normalize_salary_text(text)] = tuple(values)
+        self.entries.move_to_end(normalize_salary_text(text))
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def save(self):
+        '''Método que guarda en disco todos los textos del caché con su versión.'''
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.file, "w", encoding="utf8") as open_file:
+            json.dump({"version": self.version, "entries": list(self.entries.items())}, open_file, ensure_ascii=False)
+
+
+class Metrics:
+    '''Clase que junta las mediciones de una ejecución: segundos y llamadas por etapa (red, parseo, markdown, análisis, guardado, etc.), contadores (bytes descargados, posts analizados, etc.) y la latencia de cada request. Es segura entre hilos.'''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stages = {}            # Dicc. etapa -> [segundos, llamadas].
+        self.counters = {}          # Dicc. nombre -> valor.
+        self.latencies = []         # Segundos de cada request al foro.
+
+    @contextmanager
+    def stage(self, name):
+        '''Método (context manager) que suma a una etapa el tiempo que tarda el bloque de código.'''
+        initial_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - initial_time)
+
+    def add_time(self, name, seconds):
+        '''Método que suma segundos (y una llamada) a una etapa.'''
+        with self.lock:
+            stage = self.stages.setdefault(name, [0.0, 0])
+            stage[0] += seconds
+            stage[1] += 1
+
+    def count(self, name, value=1):
+        '''Método que suma un valor a un contador.'''
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def add_request(self, seconds, downloaded_bytes):
+        '''Método que registra un request al foro: su latencia (también en la etapa 'network') y los bytes descargados.'''
+        self.add_time("network", seconds)
+        self.count("requests")
+        self.count("bytes_downloaded", downloaded_bytes)
+        with self.lock:
+            self.latencies.append(seconds)
+
+    def get_latency_percentiles(self):
+        '''Método que retorna un dicc. con los percentiles 50, 95 y 99 (y el máximo) de latencia de los requests, en segundos.'''
+        with self.lock:
+            latencies = sorted(self.latencies)
+        if not latencies:
+            return {}
+
+        return {quantile: latencies[min(len(latencies) - 1, int(float(quantile) * len(latencies)))]
+                for quantile in ["0.5", "0.95", "0.99", "1"]}
+
+    def get_summary(self):
+        '''Método que retorna un dicc. (serializable a json) con todas las mediciones de la ejecución y los datos de los cachés.'''
+        with self.lock:
+            stages = {name: {"seconds": round(seconds, 4), "calls": calls} for name, (seconds, calls) in self.stages.items()}
+            counters = dict(self.counters)
+
+        analysis_seconds = stages.get("analysis", {}).get("seconds")
+        summary = {"timestamp": int(get_time()),
+                   "stages": stages,
+                   "counters": counters,
+                   "request_latency_seconds": {quantile: round(seconds, 4)
+                                               for quantile, seconds in self.get_latency_percentiles().items()},
+                   "posts_analyzed_per_second": round(counters.get("posts_analyzed", 0) / analysis_seconds, 1)
+                                                if analysis_seconds else None,
+                   "salaries_by_path": dict(analysis_stats)}
+        if page_cache:
+            summary["page_cache"] = {"hits": page_cache.hits, "misses": page_cache.misses}
+        if analysis_cache:
+            summary["analysis_cache"] = {"hits": analysis_cache.hits, "misses": analysis_cache.misses}
+
+        return summary
+
+    def to_prometheus(self, summary):
+        '''Método que convierte el resumen de mediciones al formato de texto de Prometheus (para el 'textfile collector' de node exporter).'''
+        lines = []
+
+        def add_metric(name, description, samples):
+            lines.append(f"# HELP {PROMETHEUS_PREFIX}_{name} {description}")
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{name} gauge")
+            for labels, value in samples:
+                lines.append(f"{PROMETHEUS_PREFIX}_{name}{labels} {value}")
+
+        add_metric("last_run_timestamp_seconds", "Fecha de la última ejecución.", [("", summary["timestamp"])])
+        add_metric("stage_seconds", "Segundos por etapa en la última ejecución (sumados entre hilos).",
+                   [(f'{{stage="{name}"}}', stage["seconds"]) for name, stage in summary["stages"].items()])
+        add_metric("stage_calls", "Llamadas por etapa en la última ejecución.",
+                   [(f'{{stage="{name}"}}', stage["calls"]) for name, stage in summary["stages"].items()])
+        for name, value in summary["counters"].items():
+            add_metric(name, f"Contador '{name}' de la última ejecución.", [("", value)])
+        if summary["request_latency_seconds"]:
+            add_metric("request_latency_seconds", "Latencia de los requests al foro (percentiles).",
+                       [(f'{{quantile="{quantile}"}}', seconds) for quantile, seconds in summary["request_latency_seconds"].items()])
+        if summary["posts_analyzed_per_second"] is not None:
+            add_metric("posts_analyzed_per_second", "Posts analizados por segundo.", [("", summary["posts_analyzed_per_second"])])
+        for cache in ["page_cache", "analysis_cache"]:
+            if cache in summary:
+                add_metric(f"{cache}_hits", "Aciertos del caché.", [("", summary[cache]["hits"])])
+                add_metric(f"{cache}_misses", "Fallos del caché.", [("", summary[cache]["misses"])])
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()     # Mediciones de la ejecución actual (se usa desde todas las etapas).
+
+
+class PostStore:
+    '''Clase que guarda en una base SQLite los posts (con sus salarios) y los datos de cada ejecución. Los posts se indexan por n° de post, fecha, usuario, moneda y tipo, para poder actualizarlos y consultarlos sin leer todo el thread. Es segura entre hilos.'''
+
+    def __init__(self, file=DB_FILE):
+        self.file = Path(file)
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        # La conexión se comparte entre los hilos de descarga y de escritura, siempre con el lock tomado:
+        self.connection = sqlite3.connect(self.file, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        with self.connection:
+            self.connection.executescript(DB_SCHEMA)
+            self.add_content_hashes()
+        # N° de los posts nuevos, editados y borrados durante la ejecución actual:
+        self.changes = {"added": set(), "changed": set(), "removed": set()}
+        # Si el texto de los posts guardados se extrajo de otra forma, sus hashes no sirven para detectar ediciones:
+        self.rehashing = False
+
+    def add_content_hashes(self):
+        '''Método que agrega la columna 'content_hash' a una base creada por una versión anterior, calculando el hash de los posts ya guardados.'''
+        columns = [row["name"] for row in self.connection.execute("PRAGMA table_info(posts)")]
+        if "content_hash" in columns:
+            return
+        self.connection.execute("ALTER TABLE posts ADD COLUMN content_hash TEXT")
+        rows = self.connection.execute("SELECT post_number, post FROM posts WHERE post IS NOT NULL").fetchall()
+        self.connection.executemany("UPDATE posts SET content_hash = ? WHERE post_number = ?",
+                                    [(get_content_hash(row["post"]), row["post_number"]) for row in rows])
+
+    def upsert_posts(self, posts, track_changes=False):
+        '''Método que agrega o actualiza posts según su 'post_number'. Un post ya analizado tiene la clave 'type'; si no la tiene y el hash de su texto cambió, queda pendiente de analizar. Con 'track_changes' se anotan cuáles son nuevos o editados.'''
+        rows = [{**{column: post.get(column) for column in POST_COLUMNS}, "content_hash": get_content_hash(post.get("post")),
+                 "analyzed": "type" in post} for post in posts]
+        with metrics.stage("saving"), self.lock, self.connection:
+            if self.rehashing and rows:
+                rows = self.rehash_posts(rows)
+            if track_changes and rows:
+                self.track_changes(rows)
+            self.connection.executemany(DB_UPSERT_POST, rows)
+
+    def set_text_extractor(self, extractor):
+        '''Método que compara el extractor de texto actual con el de la ejecución anterior (guardado en la base). Si cambió (o no se sabe cuál fue) y ya hay posts guardados, éstos sólo se rehashean al volver a descargarse, sin anotarse como editados ni volver a analizarse. Retorna si hay que rehashear.'''
+        previous_extractor = self.get_metadata().get("text_extractor")
+        self.rehashing = previous_extractor != extractor and bool(self.count_posts()[0])
+        return self.rehashing
+
+    def rehash_posts(self, rows):
+        '''Método que actualiza el texto y el hash de los posts sin analizar (filas a guardar) que ya están en la base, manteniendo su análisis. Retorna las filas restantes (las analizadas y los posts nuevos). Se llama con el lock tomado.'''
+        numbers = [row["post_number"] for row in rows]
+        stored_numbers = {number for number, in self.connection.execute(
+            f"SELECT post_number FROM posts WHERE post_number IN ({', '.join('?' * len(numbers))})", numbers)}
+        rehashed_rows = [row for row in rows if not row["analyzed"] and row["post_number"] in stored_numbers]
+        self.connection.executemany(DB_REHASH_POST, rehashed_rows)
+        metrics.count("rehashed_posts", len(rehashed_rows))
+        return [row for row in rows if row["analyzed"] or row["post_number"] not in stored_numbers]
+
+    def track_changes(self, rows):
+        '''Método que anota como nuevos los posts (filas a guardar) que no están en la base, y como editados los que tienen un hash distinto al guardado. Se llama con el lock tomado.'''
+        numbers = [row["post_number"] for row in rows]
+        stored_hashes = dict(self.connection.execute(
+            f"SELECT post_number, content_hash FROM posts WHERE post_number IN ({', '.join('?' * len(numbers))})", numbers).fetchall())
+        for row in rows:
+            if row["post_number"] not in stored_hashes:
+                self.changes["added"].add(row["post_number"])
+            elif row["content_hash"] is not None and stored_hashes[row["post_number"]] != row["content_hash"]:
+                self.changes["changed"].add(row["post_number"])
+
+    def get_post_numbers(self):
+        '''Método que retorna (ordenados) los n° de todos los posts guardados.'''
+        with self.lock:
+            return [row[0] for row in self.connection.execute("SELECT post_number FROM posts ORDER BY post_number")]
+
+    def delete_posts(self, post_numbers):
+        '''Método que borra los posts recibidos (sus n°) y los anota como borrados.'''
+        with self.lock, self.connection:
+            self.connection.executemany("DELETE FROM posts WHERE post_number = ?", [(number,) for number in post_numbers])
+        self.changes["removed"].update(post_numbers)
+
+    def get_posts(self, type_slry=None, currency=None, since=None, username=None, pending=False):
+        '''Método que retorna como diccionarios (ordenados por n° de post) los posts que cumplen los filtros recibidos. 'since' es un timestamp y con 'pending' sólo se retornan los posts sin analizar.'''
+        filters = [("type = ?", type_slry), ("currency = ?", currency), ("timestamp >= ?", since), ("username = ?", username)]
+        conditions = [condition for condition, value in filters if value is not None]
+        parameters = [value for _, value in filters if value is not None]
+        if pending:
+            conditions.append("NOT analyzed")
+
+        query = f"SELECT {', '.join(POST_COLUMNS)} FROM posts"
+        if conditions:
+            query += f" WHERE {' AND '.join(conditions)}"
+        with self.lock:
+            rows = self.connection.execute(f"{query} ORDER BY post_number", parameters).fetchall()
+
+        return [dict(row) for row in rows]
+
+    def count_posts(self):
+        '''Método que retorna la cantidad de posts guardados y cuántos de ellos tienen un salario.'''
+        with self.lock:
+            return tuple(self.connection.execute("SELECT COUNT(*), COUNT(selected_text) FROM posts").fetchone())
+
+    def get_metadata(self):
+        '''Método que retorna un dicc. con los datos guardados de la última ejecución (vacío si no hay).'''
+        with self.lock:
+            return dict(self.connection.execute("SELECT key, value FROM metadata").fetchall())
+
+    def set_metadata(self, data):
+        '''Método que guarda los datos (dicc.) de la ejecución actual.'''
+        with self.lock, self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)", data.items())
+
+    def close(self):
+        '''Método que cierra la conexión con la base.'''
+        with self.lock:
+            self.connection.close()
+
+
+class PostRecord:
+    '''Clase con los datos de un post. Ocupa bastante menos memoria que un dicc. (usa __slots__: no tiene un dicc. propio por post), pero se usa igual que uno con las claves de POST_COLUMNS. Una clave sin valor asignado (ej: 'type' antes de analizar el post) no existe.'''
+    __slots__ = tuple(POST_COLUMNS)
+
+    def __init__(self, **values):
+        for key, value in values.items():
+            setattr(self, key, value)
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return hasattr(self, key)
+
+    def __eq__(self, other):
+        if isinstance(other, PostRecord):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    def __repr__(self):
+        return f"PostRecord({self.to_dict()})"
+
+    def get(self, key, default=None):
+        '''Método que retorna el valor de una clave o 'default' si no tiene (igual que en un dicc.).'''
+        return getattr(self, key, default)
+
+    def keys(self):
+        '''Método que retorna las claves con valor asignado, en el orden de POST_COLUMNS.'''
+        return [key for key in self.__slots__ if hasattr(self, key)]
+
+    def to_dict(self):
+        '''Método que retorna los datos del post como dicc. (ej: para guardarlo en json).'''
+        return {key: getattr(self, key) for key in self.keys()}
+
+
+class PostBatch:
+    '''Clase con las columnas de salarios de muchos posts (n° de post, fecha, tipo, moneda y monto) guardadas en arrays de tipo fijo, en vez de un objeto por post, para analizarlos sin cargar el texto de cada uno. El tipo de salario y la moneda se guardan como códigos: su posición en 'categories' (o MISSING_CODE si no tiene).'''
+
+    def __init__(self):
+        self.post_number = array("q")
+        self.timestamp = array("q")
+        self.type = array("b")
+        self.currency = array("b")
+        self.amount = array("d")            # NaN si el post no tiene monto.
+        self.categories = {"type": [], "currency": []}
+
+    @classmethod
+    def from_posts(cls, posts):
+        '''Método que crea un lote con las columnas de los posts recibidos (un array o un generador).'''
+        batch = cls()
+        batch.extend(posts)
+
+        return batch
+
+    def __len__(self):
+        return len(self.post_number)
+
+    def extend(self, posts):
+        '''Método que agrega al lote las columnas de los posts recibidos.'''
+        for post in posts:
+            amount = post.get("amount")
+            self.post_number.append(post["post_number"])
+            self.timestamp.append(post["timestamp"])
+            self.type.append(self.get_code("type", post.get("type")))
+            self.currency.append(self.get_code("currency", post.get("currency")))
+            self.amount.append(float("nan") if amount is None else amount)
+
+    def get_code(self, column, value):
+        '''Método que retorna el código de un valor de una columna con categorías (tipo o moneda), agregándolo si es nuevo.'''
+        if value is None:
+            return MISSING_CODE
+
+        categories = self.categories[column]
+        if value not in categories:
+            categories.append(value)
+
+        return categories.index(value)
+
+    def get_values(self, column):
+        '''Método que retorna como array los valores de una columna (con None en vez de MISSING_CODE o NaN).'''
+        if column in self.categories:
+            categories = self.categories[column]
+            return [categories[code] if code != MISSING_CODE else None for code in getattr(self, column)]
+        if column == "amount":
+            return [None if amount != amount else amount for amount in self.amount]
+
+        return list(getattr(self, column))
+
+    def to_arrow(self):
+        '''Método que retorna el lote como tabla de pyarrow con las columnas (y tipos) de PARQUET_COLUMNS, sin pasar por un objeto de Python por post.'''
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        columns = {"post_number": pa.array(self.post_number, pa.int64()),
+                   "timestamp": pa.array(self.timestamp, pa.int64()).cast(pa.timestamp("s")),
+                   "amount": pa.array(self.amount, pa.float64(), from_pandas=True)}      # NaN -> null.
+        for column, categories in self.categories.items():
+            # Cada código es la posición de su valor en 'categories' (el último, None, es para MISSING_CODE):
+            codes = pa.array(getattr(self, column), pa.int8())
+            codes = pc.if_else(pc.equal(codes, MISSING_CODE), len(categories), codes)
+            columns[column] = pc.take(pa.array(categories + [None], pa.string()), codes)
+
+        schema = pa.schema([(name, pa.type_for_alias(type_name)) for name, type_name in PARQUET_COLUMNS])
+        return pa.Table.from_pydict({name: columns[name] for name, _ in PARQUET_COLUMNS}, schema=schema)
+
+
+class ThreadContext:
+    '''Clase con el estado de un thread de 3DG: su url, su id, las páginas ya parseadas al buscar la última y los posts descargados de cada página. Permite procesar varios threads a la vez (cada uno con su contexto) y es segura entre hilos.'''
+
+    def __init__(self, url):
+        self.url = url
+        thread_id = REGEX_THREAD_ID.search(url)
+        self.thread_id = thread_id.group(1) if thread_id else hashlib.sha1(url.encode()).hexdigest()[:12]
+        self.log_prefix = ""                # Para distinguir en los mensajes a cada thread (ej: "[1059022] ").
+        self.number_pages = None
+        self.lock = threading.Lock()
+        self.discovered_pages = {}          # Páginas ya parseadas al buscar la última página (n° página -> posts).
+        self.pages_results = {}             # Posts de cada página descargada (n° página -> posts).
+
+    def get_page_url(self, page_number):
+        '''Método que retorna la url de una página del thread.'''
+        return self.url + str(page_number)
+
+    def get_cache_key(self, page_number):
+        '''Método que retorna la clave de una página en el caché: el id del thread de 3DG y el n° de página.'''
+        return f"{self.thread_id}/{page_number}"
+
+    def add_discovered_pages(self, pages):
+        '''Método que guarda páginas ya parseadas (dicc. n° página -> posts) para no volver a descargarlas.'''
+        with self.lock:
+            self.discovered_pages.update(pages)
+
+    def pop_discovered_page(self, page_number):
+        '''Método que retorna (y olvida) los posts de una página ya parseada, o None si no se parseó.'''
+        with self.lock:
+            return self.discovered_pages.pop(page_number, None)
+
+    def add_page_results(self, page_number, page_results):
+        '''Método que guarda los posts de una página descargada.'''
+        with self.lock:
+            self.pages_results[page_number] = page_results
+
+    def get_results(self):
+        '''Método que retorna los posts de todas las páginas descargadas, en orden.'''
+        with self.lock:
+            return [post for page in sorted(self.pages_results) for post in self.pages_results[page]]
+
 
 # -------------------------------------------------------------------------------------------------
 # Funciones
@@ -113,25 +793,261 @@ def log_and_print(text, **kwargs):
     print(text, **kwargs)
 
 
-def get_html_from_page(page_number):
-    '''Función que realiza un request de una url para obtener todo el html de una página del thread de 3DG.'''
-    return requests.get(URL + str(page_number), timeout=TIMEOUT).content
+def get_nlp():
+    '''Función que retorna el modelo de spaCy, cargándolo (junto a la librería) la 1° vez que se necesita.'''
+    global nlp
+
+    if nlp is None:
+        import en_core_web_sm
+
+        # Método alternativo para cargar pipiline. Pero se necesita descargar 1° el mismo desde:
+        # https://github.com/explosion/spacy-models/releases?q=+es_core_news_lg&expanded=true
+        nlp = en_core_web_sm.load()
+        # import spacy
+        # nlp = spacy.load("es_core_news_sm")
+        nlp.enable_pipe("senter")
+
+    return nlp
+
+
+def set_download_options(workers=None, requests_per_second=None, engine=None, retries=None):
+    '''Función que cambia la cantidad de hilos (o descargas simultáneas) de descarga, el límite de requests por segundo, la forma de descargar y/o los reintentos por página. Se descartan la sesión y el limitador actuales para que se creen de nuevo con los valores recibidos.'''
+    global DOWNLOAD_WORKERS, REQUESTS_PER_SECOND, MAX_RETRIES, fetch_engine, session, rate_limiter
+
+    if engine == "asyncio" and not util.find_spec("aiohttp"):
+        log_and_print(f"   - Falta instalar la librería 'aiohttp' para descargar con asyncio. Se usa '{FETCH_ENGINE}'.")
+        engine = FETCH_ENGINE
+
+    with session_lock:
+        if workers is not None:
+            DOWNLOAD_WORKERS = max(workers, 1)
+        if requests_per_second is not None:
+            REQUESTS_PER_SECOND = max(requests_per_second, 0)
+        if engine is not None:
+            fetch_engine = engine
+        if retries is not None:
+            MAX_RETRIES = max(retries, 0)
+        if session is not None:
+            session.close()
+        session = None
+        rate_limiter = None
+
+
+def get_session():
+    '''Función que retorna la sesión HTTP compartida, creándola la 1° vez. Su pool de conexiones keep-alive tiene lugar para todos los hilos de descarga.'''
+    global session, rate_limiter
+
+    with session_lock:
+        if session is None:
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=DOWNLOAD_WORKERS)
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            rate_limiter = RateLimiter(REQUESTS_PER_SECOND)
+
+        return session
 
 
-def get_page_and_parse_to_bs4(page_number):
+def set_cache_options(enabled=True, max_megabytes=CACHE_MAX_MEGABYTES, offline_mode=False):
+    '''Función que activa (o desactiva) el caché de páginas html en disco y el modo sin conexión.'''
+    global page_cache, offline
+
+    page_cache = PageCache(max_megabytes=max_megabytes) if enabled else None
+    offline = offline_mode and enabled
+
+
+def get_default_context():
+    '''Función que retorna el contexto del thread de URL, creándolo la 1° vez (o de nuevo si cambió URL).'''
+    global default_context
+
+    with context_lock:
+        if default_context is None or default_context.url != URL:
+            default_context = ThreadContext(URL)
+
+        return default_context
+
+
+def get_html_from_page(page_number, context=None):
+    '''Función que realiza un request de una url para obtener todo el html de una página del thread de 3DG (por defecto, el de URL). Si hay caché, se realiza un GET condicional y se reutiliza la página guardada si no cambió. Si el foro responde un error, se lanza una excepción (requests.HTTPError) sin guardar nada.'''
+    context = context or get_default_context()
+    url = context.get_page_url(page_number)
+    key = context.get_cache_key(page_number)
+    entry = page_cache.get_entry(key) if page_cache else None
+
+    if entry and offline:
+        return page_cache.load(key, entry)
+
+    current_session = get_session()
+    rate_limiter.wait(url)
+    initial_time = time.perf_counter()
+    response = current_session.get(url,
+                                   headers=page_cache.get_conditional_headers(entry) if entry else None,
+                                   timeout=TIMEOUT)
+    metrics.add_request(time.perf_counter() - initial_time, len(response.content))
+
+    if entry and response.status_code == HTTP_NOT_MODIFIED:
+        return page_cache.load(key, entry)
+
+    # Una página de error (404, 429, 5xx, etc.) no se guarda en el caché: se informa a quien la pidió.
+    response.raise_for_status()
+    if page_cache and response.status_code == HTTP_OK:
+        page_cache.store(key, response.content, response.headers)
+
+    return response.content
+
+
+async def fetch_pages_async(pages, workers=None, context=None):
+    '''Corrutina que descarga con aiohttp el html de varias páginas de un thread, con a lo sumo 'workers' requests en simultáneo. Retorna un dicc. con el html de cada página o, si falló aún después de reintentar, el error (así una página no corta la descarga del resto).'''
+    context = context or get_default_context()
+    htmls = await fetch_threads_pages_async([(context, page) for page in pages], workers)
+
+    return dict(zip(pages, htmls))
+
+
+async def fetch_threads_pages_async(jobs, workers=None):
+    '''Corrutina que descarga con aiohttp las páginas (contexto del thread, n° de página) recibidas, de uno o varios threads, con a lo sumo 'workers' requests en simultáneo entre todas. Retorna, en el mismo orden, el html de cada página o el error.'''
+    import aiohttp
+
+    semaphore = asyncio.Semaphore(workers or DOWNLOAD_WORKERS)
+    timeout = aiohttp.ClientTimeout(total=TIMEOUT)
+    async with aiohttp.ClientSession(timeout=timeout) as http_session:
+        return await asyncio.gather(*[fetch_page_async(http_session, semaphore, page, context) for context, page in jobs],
+                                    return_exceptions=True)
+
+
+async def fetch_page_async(http_session, semaphore, page_number, context):
+    '''Corrutina que descarga el html de una página (con GET condicional si hay caché, igual que get_html_from_page). Si hay un error de conexión, un timeout o una respuesta 429/5xx, se reintenta hasta MAX_RETRIES veces esperando lo que pida 'Retry-After' o un backoff exponencial con jitter.'''
+    import aiohttp
+
+    url = context.get_page_url(page_number)
+    key = context.get_cache_key(page_number)
+    entry = page_cache.get_entry(key) if page_cache else None
+
+    if entry and offline:
+        return page_cache.load(key, entry)
+
+    attempt = 0
+    while True:
+        retry_after = None
+        async with semaphore:
+            await asyncio.sleep(rate_limiter.reserve(url))
+            initial_time = time.perf_counter()
+            try:
+                async with http_session.get(url, headers=page_cache.get_conditional_headers(entry) if entry else None) as response:
+                    content = await response.read()
+                    metrics.add_request(time.perf_counter() - initial_time, len(content))
+
+                    if response.status not in RETRY_STATUS_CODES or attempt >= MAX_RETRIES:
+                        response.raise_for_status()
+                        if entry and response.status == HTTP_NOT_MODIFIED:
+                            return page_cache.load(key, entry)
+                        if page_cache and response.status == HTTP_OK:
+                            page_cache.store(key, content, response.headers)
+                        return content
+
+                    retry_after = response.headers.get("Retry-After")
+            except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError):
+                if attempt >= MAX_RETRIES:
+                    raise
+
+        # Se espera fuera del semáforo, para no ocupar el lugar de otra descarga:
+        metrics.count("retries")
+        await asyncio.sleep(get_retry_delay(attempt, retry_after))
+        attempt += 1
+
+
+def get_retry_delay(attempt, retry_after=None):
+    '''Función que retorna los segundos a esperar antes de un reintento: lo que pida el servidor con 'Retry-After' (en segundos o como fecha) o, si no, un backoff exponencial con jitter (al azar entre 0 y BACKOFF_BASE_SECONDS * 2^intento). Nunca más de BACKOFF_MAX_SECONDS.'''
+    if retry_after:
+        try:
+            return min(max(float(retry_after), 0), BACKOFF_MAX_SECONDS)
+        except ValueError:
+            pass
+        try:
+            retry_date = parsedate_to_datetime(retry_after)
+            if retry_date.tzinfo is None:
+                retry_date = retry_date.replace(tzinfo=datetime.timezone.utc)
+            seconds = (retry_date - datetime.datetime.now(datetime.timezone.utc)).total_seconds()
+            return min(max(seconds, 0), BACKOFF_MAX_SECONDS)
+        except (TypeError, ValueError):
+            pass
+
+    return random.uniform(0, min(BACKOFF_BASE_SECONDS * 2 ** attempt, BACKOFF_MAX_SECONDS))
+
+
+def read_failed_pages(context=None, file=FAILED_PAGES_FILE):
+    '''Función que retorna las páginas de un thread que no se pudieron descargar en la ejecución anterior.'''
+    context = context or get_default_context()
+    try:
+        with open(file, "r", encoding="utf8") as open_file:
+            return json.load(open_file).get(context.thread_id, [])
+    except (OSError, ValueError):
+        return []
+
+
+def save_failed_pages(pages, context=None, file=FAILED_PAGES_FILE):
+    '''Función que guarda las páginas de un thread que no se pudieron descargar, para reintentarlas en la próxima ejecución. Si no hay ninguna, se quita el thread del archivo.'''
+    context = context or get_default_context()
+    try:
+        with open(file, "r", encoding="utf8") as open_file:
+            failed_pages = json.load(open_file)
+    except (OSError, ValueError):
+        failed_pages = {}
+
+    if pages:
+        failed_pages[context.thread_id] = sorted(pages)
+    elif failed_pages.pop(context.thread_id, None) is None:
+        return
+
+    Path(file).parent.mkdir(parents=True, exist_ok=True)
+    with open(file, "w", encoding="utf8") as open_file:
+        json.dump(failed_pages, open_file, indent=4)
+
+
+def get_page_and_parse_to_bs4(page_number, context=None):
     '''Función para realizar request en la URL de 3DG, obtener html y parsear con BS4.'''
-    html_page = get_html_from_page(page_number)
-    soup = BeautifulSoup(html_page, "html.parser", from_encoding="ISO-8859-1")
+    context = context or get_default_context()
+
+    # Reutilizar la página si ya se descargó al buscar la última página del thread:
+    all_posts = context.pop_discovered_page(page_number)
+    if all_posts is not None:
+        return all_posts
+
+    html_page = get_html_from_page(page_number, context)
+
+    return parse_html_to_posts(html_page, html_parser, use_soup_strainer)
+
+
+def parse_html_to_posts(html_page, parser=HTML_PARSER, strainer=USE_SOUP_STRAINER):
+    '''Función que parsea con BS4 el html de una página y retorna sus <li> con posts. Con 'strainer' sólo se construyen esos <li> (y su contenido), sin armar el resto de la página.'''
+    from bs4 import BeautifulSoup, SoupStrainer
 
     # Obtener todos los <li> donde normalmente está el contenido de cada post.
     # Se obtiene un array de 15 posts por página:
-    all_posts = soup.findAll("li", {"id": re.compile(POST_CLASS + ".*")})
+    posts_filter = {"id": re.compile(POST_CLASS + ".*")}
+    parse_only = SoupStrainer("li", posts_filter) if strainer else None
+    with metrics.stage("parsing"):
+        soup = BeautifulSoup(html_page, parser, from_encoding=HTML_ENCODING, parse_only=parse_only)
+        all_posts = soup.findAll("li", posts_filter)
 
     return all_posts
 
 
-def check_in_3DG_thread_the_last_pages():
-    '''Función que chequea json con dato de últimas páginas y también si existen más páginas en 3DG. Guarda dicha cantidad en un archivo json y retorna el valor de la cantidad de páginas encontradas.'''
+def set_parser_options(parser=HTML_PARSER, strainer=USE_SOUP_STRAINER, extractor=TEXT_EXTRACTOR):
+    '''Función que elige el parser de html para BS4 (si no está instalado, se usa 'html.parser'), si se usa un SoupStrainer y cómo se extrae el texto de cada post.'''
+    global html_parser, use_soup_strainer, text_extractor
+
+    if parser != HTML_PARSER and not util.find_spec(parser):
+        log_and_print(f"   - El parser '{parser}' no está instalado. Se usa '{HTML_PARSER}'.")
+        parser = HTML_PARSER
+
+    html_parser = parser
+    use_soup_strainer = strainer
+    text_extractor = extractor
+
+
+def check_in_3DG_thread_the_last_pages(context=None):
+    '''Función que chequea json con dato de últimas páginas y también si existen más páginas en 3DG. Retorna la cantidad de páginas encontradas y la última cantidad conocida (la guardada en el json).'''
     # Un diccionario con el formato de datos esperado, pero con valores en cero:
     empty_db_data = {
         "total_pages": 1,
@@ -140,15 +1056,28 @@ def check_in_3DG_thread_the_last_pages():
         "last_timestamp": None
     }
 
-    data = read_from_json_file(JSON_DB_FILE, empty_db_data)
-    number_pages = get_and_update_last_page(data)
+    data = read_from_db(empty_db_data)
+    number_pages = get_and_update_last_page(data, context)
+
+    return number_pages, data["total_pages"]
 
-    return number_pages
 
+def read_from_db(empty_data):
+    '''Función que retorna los datos de la última ejecución guardados en la base. Si todavía no hay, se leen del archivo json que se usaba antes (si existe).'''
+    global main_counter
+    data = post_store.get_metadata() if post_store else {}
+    if not data and JSON_DB_FILE.exists():
+        return read_from_json_file(JSON_DB_FILE, empty_data)
+
+    log_and_print(f"\n   {main_counter}) Leyendo datos de la base '{DB_FILE}'... 💾")
+    main_counter += 1
 
-def get_and_update_last_page(data):
+    return {**empty_data, **data}
+
+
+def get_and_update_last_page(data, context=None):
     '''Función que chequea el último número de páginas del thread de 3DG y actualiza este n° realizando requests por si existen nuevas páginas.'''
-    global number_pages, main_counter
+    global main_counter
 
     # Mostrando mensaje:
     log_and_print(f"\n   {main_counter}) Chequeando la última cantidad de páginas en thread de 3DG... 🔎")
@@ -167,42 +1096,124 @@ def get_and_update_last_page(data):
 
     log_and_print(f"   {main_counter}) Chequeando nuevas páginas de 3DG... 🔎")
     main_counter += 1
-    last_posts = str(get_page_and_parse_to_bs4(last_number_pages))
-
-    # Se fija contador y flag de control:
-    pages_counter = last_number_pages + 1
-    not_same_content = True
-
-    # Se realiza ciclo de comprobación de nuevas páginas, si existen:
-    while not_same_content:
-        next_posts = str(get_page_and_parse_to_bs4(pages_counter))
-        if next_posts != last_posts:
-            log_and_print(f"   - Página {pages_counter}: ✅")
-            last_number_pages = pages_counter
-            last_posts = next_posts
-            pages_counter += 1
+
+    return find_last_page(context or get_default_context(), last_number_pages)
+
+
+def find_last_page(context, last_number_pages=1):
+    '''Función que busca la última página de un thread, a partir de la última conocida (hacia adelante o, si el thread se achicó, hacia atrás), con la menor cantidad de requests posible. Las páginas parseadas en la búsqueda quedan guardadas en el contexto del thread. Si alguna página no se puede obtener (aún reintentando), se retorna la última conocida.'''
+    # Al pedir una página que no existe, 3DG devuelve la última. Así se obtiene el id del último
+    # post del thread, que sirve para reconocer la última página sin comparar todo su html:
+    probed_pages = {}
+    last_fingerprint = probe_page(BEYOND_LAST_PAGE, probed_pages, context)
+    if last_fingerprint is None:
+        log_and_print(f"   - {context.log_prefix}No se pudo obtener la última página. Se usa la última conocida.")
+        return last_number_pages
+
+    def is_last_or_beyond(page_number):
+        fingerprint = probe_page(page_number, probed_pages, context)
+        if fingerprint is None:
+            # Una página sin posts (de error) no dice nada de dónde está la última: no se sigue buscando.
+            raise ProbeError(page_number)
+        found = fingerprint == last_fingerprint
+        log_and_print(f"   - {context.log_prefix}Página {page_number}: {'🔚 (la última o posterior)' if found else '✅'}")
+        return found
+
+    try:
+        low = last_number_pages
+        if is_last_or_beyond(low):
+            # La última conocida puede estar después de la última real (ej: si se borraron posts y el
+            # thread tiene menos páginas). Se retrocede de a 1, 2, 4, 8... páginas hasta una anterior:
+            high = low
+            step = 1
+            low = high - step
+            while low >= 1 and is_last_or_beyond(low):
+                high = low
+                step *= 2
+                low = high - step
+            low = max(low, 0)
         else:
-            log_and_print(f"   - Página {pages_counter}: ❌")
-            log_and_print("   - No hay más páginas.")
-            break
+            # Búsqueda exponencial: se avanza de a 1, 2, 4, 8... páginas hasta pasar la última:
+            step = 1
+            high = low + step
+            while not is_last_or_beyond(high):
+                low = high
+                step *= 2
+                high = low + step
+
+        # Búsqueda binaria entre la última página que existe ('low') y una igual o posterior a la última ('high'):
+        while high - low > 1:
+            middle = (low + high) // 2
+            if is_last_or_beyond(middle):
+                high = middle
+            else:
+                low = middle
+    except ProbeError as error:
+        log_and_print(f"   - {context.log_prefix}No se pudo obtener la página {error}. Se usa la última conocida ({last_number_pages}).")
+        return last_number_pages
+
+    log_and_print(f"   - {context.log_prefix}No hay más páginas. La última es la {high} ({len(probed_pages)} requests).")
+
+    # Guardar las páginas ya parseadas para no volver a descargarlas luego:
+    context.add_discovered_pages({page: posts for page, posts in probed_pages.items() if page < high})
+    context.add_discovered_pages({high: probed_pages[BEYOND_LAST_PAGE]})
+
+    return high
+
 
-    return last_number_pages
+def probe_page(page_number, probed_pages, context=None, retries=None):
+    '''Función que descarga y parsea una página (guardándola en el dicc. recibido) y retorna su huella: el id del último post (ej: 'post_123456'). Si la descarga falla o la página no tiene posts, se reintenta hasta 'retries' veces (por defecto MAX_RETRIES) y luego se retorna None.'''
+    context = context or get_default_context()
+    retries = MAX_RETRIES if retries is None else retries
+
+    for attempt in range(retries + 1):
+        if attempt:
+            metrics.count("retries")
+            time.sleep(get_retry_delay(attempt - 1))
+        try:
+            all_posts = get_page_and_parse_to_bs4(page_number, context)
+        except requests.RequestException as error:
+            log_and_print(f"   - {context.log_prefix}Página {page_number}: ❌ ({type(error).__name__}: {error})")
+            continue
+        if all_posts:
+            probed_pages[page_number] = all_posts
+            return all_posts[-1].get("id")
+
+    return None
 
 
 def parse_bs4_to_markdown(bs4_object):
     '''Función que convierte un texto con contenido html a formato markdown.'''
-    return mdc(strip=['<!--']).convert_soup(bs4_object)
+    from markdownify import MarkdownConverter as mdc
+
+    with metrics.stage("markdown"):
+        return mdc(strip=['<!--']).convert_soup(bs4_object)
 
 
 def get_specific_user_info(post):
-    '''Función que obtiene info específica del user del post: nombre, fecha, nro. post y texto.'''
-    username = post.find("a", class_= USERNAME_CLASS)
-    number_post = post.find("a", class_= NUMBER_POST_CLASS)
-    date_post = post.find("span", class_= DATE_POST_CLASS)
-    # time_post = post.find("span", class_= TIME_POST_CLASS)
-    post_text = post.find("blockquote", class_= BLOCKQUOTE_CLASS)
+    '''Función que obtiene info específica del user del post: nombre, fecha, nro. post y texto. Se recorren los tags del post una sola vez (en vez de un 'find' por dato), quedándose con el 1° de cada uno.'''
+    wanted_tags = [("a", USERNAME_CLASS),           # username
+                   ("a", NUMBER_POST_CLASS),        # number_post
+                   ("span", DATE_POST_CLASS),       # date_post
+                   ("blockquote", BLOCKQUOTE_CLASS)]  # post_text
+    # ("span", TIME_POST_CLASS)                     # time_post
+    found_tags = [None] * len(wanted_tags)
+    missing = len(wanted_tags)
+
+    for tag in post.descendants:
+        if tag.name is None:        # Texto suelto, no es un tag.
+            continue
+
+        classes = tag.get("class") or ()
+        for position, (name, class_name) in enumerate(wanted_tags):
+            if found_tags[position] is None and tag.name == name and class_name in classes:
+                found_tags[position] = tag
+                missing -= 1
+
+        if not missing:
+            break
 
-    return [username, number_post, date_post, post_text]
+    return found_tags
 
 
 def remove_quote(post):
@@ -215,10 +1226,39 @@ def remove_quote(post):
     return post
 
 
+def get_post_text(blockquote):
+    '''Función que obtiene el texto de un post recorriendo su <blockquote> una sola vez, sin armar markdown: los <br> y los tags de bloque pasan a ser NEW_ENDLINE_CHAR, y los quotes (y comentarios) se saltean. Los saltos de linea y espacios del código html (fuera de <pre>) son un solo espacio, como al mostrar el post. Equivale a remove_quote() + parse_bs4_to_markdown() + remove_problematic_chars() para buscar el salario.'''
+    from bs4.element import NavigableString, PreformattedString
+
+    parts = []
+
+    def add_text_from(tag, preformatted=False):
+        for child in tag.children:
+            if isinstance(child, NavigableString):
+                if not isinstance(child, PreformattedString):       # Comentarios, CDATA, etc.
+                    parts.append(child if preformatted else REGEX_SOURCE_WHITESPACE.sub(" ", child))
+            elif child.name == "br":
+                parts.append(ORIGINAL_NEWLINE_CHAR)
+            elif QUOTE_CLASS in (child.get("class") or ()):
+                continue
+            elif child.name in BLOCK_TAGS:
+                parts.append(ORIGINAL_NEWLINE_CHAR)
+                add_text_from(child, preformatted or child.name == "pre")
+                parts.append(ORIGINAL_NEWLINE_CHAR)
+            else:
+                add_text_from(child, preformatted)
+
+    with metrics.stage("text"):
+        add_text_from(blockquote)
+        text = REGEX_REPEATED_SPACES.sub(" ", "".join(parts))
+
+    return remove_problematic_chars(text)
+
+
 def remove_problematic_chars(text):
     '''Función para remover caracteres problemáticos para parsear dentro de un texto.'''
-    text = re.sub(REGEX_PROBLEMATIC_CHARS_PATTERN, '', text, flags=re.IGNORECASE)
-    text = re.sub(ORIGINAL_NEWLINE_CHAR, NEW_ENDLINE_CHAR, text, flags=re.IGNORECASE)
+    text = REGEX_PROBLEMATIC_CHARS.sub('', text)
+    text = text.replace(ORIGINAL_NEWLINE_CHAR, NEW_ENDLINE_CHAR)
 
     return text.strip()
 
@@ -231,48 +1271,201 @@ def parse_date_string_to_timestamp(date_string):
     return ts
 
 
-def get_posts_from(page_number):
+def get_content_hash(text_post):
+    '''Función que retorna el hash del texto de un post normalizado (sin espacios repetidos ni al principio o al final), para detectar si fue editado. Retorna None si no hay texto.'''
+    if text_post is None:
+        return None
+    normalized_text = " ".join(text_post.split())
+    return hashlib.sha256(normalized_text.encode()).hexdigest()[:CONTENT_HASH_LENGTH]
+
+
+def get_posts_from(page_number, context=None):
     '''Funcion que obtiene todos los posts del una página del thread de 3DG y los guarda en un array.'''
-    all_posts = get_page_and_parse_to_bs4(page_number)
+    all_posts = get_page_and_parse_to_bs4(page_number, context)
+
+    return get_posts_data_from(all_posts)
+
+
+def get_posts_data_from(all_posts):
+    '''Función que obtiene los datos de cada post (los <li> de una página ya parseada) y los guarda en un array.'''
     page_results = []
 
     for post in all_posts:
         # Obtener todos los datos:
         username, post_number, date_post, text_post = get_specific_user_info(post)
 
-        # Parsear los datos recibidos a un formato más adecuado:
-        username = username.string
+        # Parsear los datos recibidos a un formato más adecuado. El nombre pasa a ser un str común (un
+        # NavigableString mantiene en memoria toda la página parseada) y compartido entre sus posts:
+        username = sys.intern(str(username.string))
         post_number = int(post_number.string[1:])
         ts_post = parse_date_string_to_timestamp(date_post.get_text())
 
-        # Quitar quotes, convertir a markdown y eliminar caracteres innecesarios del post:
-        text_post = remove_quote(text_post)
-        text_post = parse_bs4_to_markdown(text_post)
-        text_post = remove_problematic_chars(text_post)
+        if text_extractor == "direct":
+            # Obtener el texto del post (sin quotes) en una sola pasada:
+            text_post = get_post_text(text_post)
+        else:
+            # Quitar quotes, convertir a markdown y eliminar caracteres innecesarios del post:
+            text_post = remove_quote(text_post)
+            text_post = parse_bs4_to_markdown(text_post)
+            text_post = remove_problematic_chars(text_post)
+
+        # Crear un PostRecord con todos los datos obtenidos para guardarlos en array:
+        page_results.append(PostRecord(post_number=post_number,
+                                       username=username,
+                                       timestamp=ts_post,
+                                       post=text_post))
 
-        # Crear diccionario con todos los datos obtenidos para guardarlos en array:
-        page_results.append({"post_number": post_number, 
-                             "username":  username.string,
-                             "timestamp": ts_post,
-                             "post": text_post})
+    # Guardar los posts en la base apenas se descargan (sin pisar el análisis de los que no cambiaron):
+    if post_store:
+        post_store.upsert_posts(page_results, track_changes=True)
 
     return page_results
 
 
-def get_all_post_from(results, number_pages):
-    '''Función que llama un n° de veces (recibido por arg.) a otra función para generar arrays de posts de varias páginas. Se devuelve modificado el array recibido por argumento con nuevos posts.'''
+def get_all_post_from(results, number_pages, workers=None, first_page=1):
+    '''Función que llama un n° de veces (recibido por arg.) a otra función para generar arrays de posts de varias páginas, desde la página 'first_page' hasta 'number_pages'. Se devuelve modificado el array recibido por argumento con nuevos posts.'''
     global main_counter
 
-    log_and_print(f"\n   {main_counter}) Descargando las {number_pages} páginas del thread. Esto puede llevar varios segundos... ⏳")
+    if workers is None:
+        workers = DOWNLOAD_WORKERS
+
+    # Las páginas que fallaron la vez anterior se descargan de nuevo (aunque sean previas a 'first_page'):
+    retried_pages = [page for page in read_failed_pages() if page < first_page]
+    pages = retried_pages + list(range(first_page, number_pages + 1))
+    log_and_print(f"\n   {main_counter}) Descargando {len(pages)} páginas del thread (de la {first_page} a la {number_pages}). Esto puede llevar varios segundos... ⏳")
     main_counter += 1
+    if retried_pages:
+        log_and_print(f"   - Se reintentan {len(retried_pages)} páginas que fallaron la vez anterior: {retried_pages}")
 
-    for page in range(1, number_pages + 1):
-        results += get_posts_from(page)
-        log_and_print(f"   - Página {page}: ✅")
+    pages_posts = {}        # N° de página -> n° de sus posts (para detectar los posts borrados).
+    if fetch_engine == "asyncio":
+        failed_pages = get_all_post_from_async(results, pages, workers, pages_posts)
+        save_failed_pages(failed_pages)
+    else:
+        if workers > 1:
+            # Descargando varias páginas en simultáneo. 'map' devuelve los resultados en el mismo
+            # orden de las páginas, así que el array queda igual que al descargar de a una:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for page, page_results in zip(pages, executor.map(get_posts_from, pages)):
+                    results += page_results
+                    pages_posts[page] = [post["post_number"] for post in page_results]
+                    log_and_print(f"   - Página {page}: ✅")
+        else:
+            for page in pages:
+                page_results = get_posts_from(page)
+                results += page_results
+                pages_posts[page] = [post["post_number"] for post in page_results]
+                log_and_print(f"   - Página {page}: ✅")
+        save_failed_pages([])
+
+    if post_store:
+        remove_deleted_posts(pages_posts, number_pages)
 
     return results
 
 
+def remove_deleted_posts(pages_posts, last_page):
+    '''Función que borra de la base los posts guardados que ya no están en el thread: los que no aparecieron en las páginas descargadas pero cuyo n° cae dentro de una de ellas (o entre dos páginas seguidas descargadas, o después de la última página). Las páginas que fallaron no se tienen en cuenta. Retorna los n° de los posts borrados.'''
+    # Rangos de n° de post cubiertos por las páginas descargadas (ordenados, como las páginas):
+    ranges = []
+    for page in sorted(pages_posts):
+        numbers = pages_posts[page]
+        if not numbers:
+            continue
+        next_numbers = pages_posts.get(page + 1)
+        if next_numbers:
+            highest = min(next_numbers) - 1
+        elif page == last_page:
+            highest = float("inf")
+        else:
+            highest = max(numbers)
+        ranges.append((min(numbers), highest))
+    if not ranges:
+        return []
+
+    seen_numbers = {number for numbers in pages_posts.values() for number in numbers}
+    lowest_numbers = [lowest for lowest, _ in ranges]
+    removed_posts = []
+    for number in post_store.get_post_numbers():
+        position = bisect_right(lowest_numbers, number) - 1
+        if position >= 0 and number <= ranges[position][1] and number not in seen_numbers:
+            removed_posts.append(number)
+
+    if removed_posts:
+        post_store.delete_posts(removed_posts)
+    return removed_posts
+
+
+def log_posts_changes(max_listed=POSTS_CHANGES_LISTED):
+    '''Función que muestra cuántos posts (y cuáles) son nuevos, fueron editados o fueron borrados desde la ejecución anterior, y los guarda en las métricas.'''
+    global main_counter
+    changes = post_store.changes
+    log_and_print(f"\n   {main_counter}) Cambios en el thread: {len(changes['added'])} posts nuevos, {len(changes['changed'])} editados y {len(changes['removed'])} borrados. 📝")
+    main_counter += 1
+
+    for name, label in [("added", "Nuevos"), ("changed", "Editados"), ("removed", "Borrados")]:
+        metrics.count(f"posts_{name}", len(changes[name]))
+        numbers = sorted(changes[name])
+        if numbers:
+            listed = ", ".join(f"#{number}" for number in numbers[:max_listed])
+            log_and_print(f"   - {label}: {listed}{' ...' if len(numbers) > max_listed else ''}")
+
+
+def get_all_post_from_async(results, pages, workers=None, pages_posts=None):
+    '''Función que descarga con asyncio las páginas recibidas y agrega sus posts (en orden) al array recibido ('pages_posts' recibe los n° de los posts de cada página). Las páginas que fallan, aún después de reintentar, no cortan la descarga: se informan y se retornan para reintentarlas en la próxima ejecución.'''
+    failed_pages = []
+    for page, page_results in get_pages_posts_async(pages, workers).items():
+        if isinstance(page_results, Exception):
+            failed_pages.append(page)
+            log_and_print(f"   - Página {page}: ❌ ({type(page_results).__name__}: {page_results})")
+            continue
+
+        results += page_results
+        if pages_posts is not None:
+            pages_posts[page] = [post["post_number"] for post in page_results]
+        log_and_print(f"   - Página {page}: ✅")
+
+    if failed_pages:
+        metrics.count("failed_pages", len(failed_pages))
+        log_and_print(f"   - {len(failed_pages)} páginas con errores. Se reintentan en la próxima ejecución ('{FAILED_PAGES_FILE}').")
+
+    return failed_pages
+
+
+def get_pages_posts_async(pages, workers=None):
+    '''Función que descarga con asyncio las páginas recibidas y retorna un dicc. (en el orden de las páginas) con los posts de cada una o, si falló aún después de reintentar, el error.'''
+    context = get_default_context()
+    get_session()               # Crea (si no existe) el limitador de requests por segundo compartido.
+
+    # No se descargan de nuevo las páginas ya parseadas al buscar la última página:
+    parsed_pages = {page: context.pop_discovered_page(page) for page in pages}
+    htmls = asyncio.run(fetch_pages_async([page for page in pages if parsed_pages[page] is None], workers, context))
+
+    pages_posts = {}
+    for page in pages:
+        all_posts = parsed_pages[page]
+        if all_posts is None:
+            if isinstance(htmls[page], Exception):
+                pages_posts[page] = htmls[page]
+                continue
+            all_posts = parse_html_to_posts(htmls[page], html_parser, use_soup_strainer)
+        pages_posts[page] = get_posts_data_from(all_posts)
+
+    return pages_posts
+
+
+def get_pages_posts(pages):
+    '''Función que descarga (de a una, con requests) las páginas recibidas y retorna un dicc. con los posts de cada una o, si falló, el error.'''
+    pages_posts = {}
+    for page in pages:
+        try:
+            pages_posts[page] = get_posts_from(page)
+        except requests.RequestException as error:
+            pages_posts[page] = error
+
+    return pages_posts
+
+
 def read_from_json_file(file, empty_results=None):
     '''Función que abre un archivo json y retorna su contenido.'''
     global main_counter
@@ -297,8 +1490,103 @@ def save_to_json_file(file, data):
     main_counter += 1
 
     try:
-        with open(file, "w", encoding="utf8") as file_to_save:
-            json.dump(data, file_to_save, indent=4, ensure_ascii=False)
+        with metrics.stage("saving"), open(file, "w", encoding="utf8") as file_to_save:
+            json.dump(data, file_to_save, indent=4, ensure_ascii=False, default=get_serializable)
+    except Exception as error:
+        error_message(error)
+
+
+def save_to_jsonl_file(file, data, append=False):
+    '''Función que guarda posts en un archivo json lines (un post por linea). Con 'append' se agregan al final del archivo sin reescribirlo: al leerlo, la última versión de cada post es la que vale.'''
+    global main_counter
+    log_and_print(f"\n   {main_counter}) {'Agregando' if append else 'Guardando'} datos en archivo '{file}'... 💾")
+    main_counter += 1
+
+    try:
+        with metrics.stage("saving"), open(file, "a" if append else "w", encoding="utf8") as file_to_save:
+            for post in data:
+                file_to_save.write(json.dumps(post, ensure_ascii=False, default=get_serializable) + "\n")
+    except Exception as error:
+        error_message(error)
+
+
+def get_serializable(value):
+    '''Función para el 'default' de json.dump(): convierte a dicc. los objetos que json no sabe guardar (los PostRecord).'''
+    if isinstance(value, PostRecord):
+        return value.to_dict()
+
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def read_from_jsonl_file(file):
+    '''Función que lee un archivo json lines y retorna sus posts ordenados por n° de post. Si un post aparece varias veces (por agregados), se queda con la última versión.'''
+    posts = {}
+    with open(file, "r", encoding="utf8") as open_file:
+        for line in open_file:
+            if line.strip():
+                post = json.loads(line)
+                posts[post["post_number"]] = post
+
+    return [posts[number] for number in sorted(posts)]
+
+
+def is_jsonl_up_to_date():
+    '''Función que retorna True si el archivo json lines de resultados existe y está al día con el json.'''
+    return JSONL_RESULTS_FILE.exists() and (not JSON_RESULTS_FILE.exists()
+                                           or JSONL_RESULTS_FILE.stat().st_mtime >= JSON_RESULTS_FILE.stat().st_mtime)
+
+
+def read_previous_results():
+    '''Función que retorna los posts guardados en la ejecución anterior. Se prefiere el archivo json lines (más rápido de leer) si está al día con el json.'''
+    if is_jsonl_up_to_date():
+        global main_counter
+        log_and_print(f"\n   {main_counter}) Leyendo datos del archivo '{JSONL_RESULTS_FILE}'... 💾")
+        main_counter += 1
+        return read_from_jsonl_file(JSONL_RESULTS_FILE)
+
+    return read_from_json_file(JSON_RESULTS_FILE, [])
+
+
+def save_to_parquet_file(file, data):
+    '''Función que guarda en un archivo parquet (columnar y con tipos) sólo las columnas de los posts que hacen falta para analizar salarios. Necesita la librería pyarrow.'''
+    global main_counter
+    log_and_print(f"\n   {main_counter}) Guardando datos en archivo '{file}'... 💾")
+    main_counter += 1
+
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        log_and_print("   - Falta instalar la librería 'pyarrow' para guardar en formato parquet.")
+        return
+
+    try:
+        table = PostBatch.from_posts(data).to_arrow()
+        with metrics.stage("saving"):
+            pq.write_table(table, file)
+    except Exception as error:
+        error_message(error)
+
+
+def save_statistics(all_posts, changed_posts=None, removed_posts=()):
+    '''Función que actualiza el resumen de estadísticas de salarios (ver estadisticas_salarios.py): si ya existe, sólo con los posts nuevos o editados ('changed_posts') y los borrados; si no, con todos los posts. Necesita numpy.'''
+    global main_counter
+
+    try:
+        import estadisticas_salarios as estadisticas
+    except ImportError:
+        log_and_print("   - Falta instalar la librería 'numpy' para guardar las estadísticas de salarios.")
+        return
+
+    log_and_print(f"\n   {main_counter}) Actualizando estadísticas de salarios en '{estadisticas.SUMMARY_FILE}'... 📊")
+    main_counter += 1
+    try:
+        with metrics.stage("statistics"):
+            statistics = estadisticas.SalaryStatistics()
+            if changed_posts is not None and statistics.load():
+                statistics.update(PostBatch.from_posts(changed_posts), removed_posts)
+            else:
+                statistics.rebuild(PostBatch.from_posts(all_posts))
+            statistics.save()
     except Exception as error:
         error_message(error)
 
@@ -306,7 +1594,7 @@ def save_to_json_file(file, data):
 def get_value_from_string(post_text):
     '''Función que recibe un string y devuelve un substring que coincida con un patrón buscado.'''
     # Aplicando 1° regex de búsqueda:
-    value = re.findall(REGEX_SALARY_PATTERN_1, post_text, re.IGNORECASE)
+    value = REGEX_SALARY_1.findall(post_text)
     '''
     if value and not value[0]:
         value = re.findall(REGEX_SALARY_PATTERN_2, post_text, re.IGNORECASE)
@@ -321,8 +1609,96 @@ def get_value_from_string(post_text):
 def analize_and_get_data_from(full_text):
     '''Función que recibe un string de parámetro y parsea este para devolver 3 valores determinados.'''
     # log_and_print(f"\"{full_text}\"")
-    nlp_obj = nlp(full_text)         # Pasando texto objeto NLP (spaCy).
+    nlp_obj = get_nlp()(full_text)   # Pasando texto objeto NLP (spaCy).
+
+    return get_data_from_doc(nlp_obj)
+
+
+def analize_all_and_get_data_from(texts, batch_size=NLP_BATCH_SIZE):
+    '''Función que analiza varios strings juntos con nlp.pipe, en lotes y sin los componentes de spaCy que no se usan (sólo hacen falta pos_, text y lemma_). Retorna un array con los 3 valores de cada string, en el mismo orden.'''
+    disabled_pipes = [pipe for pipe in NLP_DISABLED_PIPES if pipe in get_nlp().pipe_names]
+    docs = get_nlp().pipe(texts, batch_size=batch_size, disable=disabled_pipes)
+
+    return [get_data_from_doc(nlp_obj) for nlp_obj in docs]
+
+
+def analize_chunk(texts, batch_size):
+    '''Función que analiza una parte de los textos. Es la tarea que ejecuta cada proceso del pool.'''
+    if batch_size:
+        return analize_all_and_get_data_from(texts, batch_size)
+
+    return [analize_and_get_data_from(text) for text in texts]
+
+
+def analize_texts(texts, batch_size=NLP_BATCH_SIZE, workers=NLP_WORKERS):
+    '''Función que analiza un array de textos con salarios y retorna los 3 valores de cada uno, en el mismo orden. Los textos se buscan primero en el caché de análisis y sólo el resto (sin repetidos) pasa por el análisis NLP.'''
+    values = [analysis_cache.get(text) for text in texts] if analysis_cache else [None] * len(texts)
+    analysis_stats["cache"] += sum(1 for value in values if value is not None)
+
+    pending_texts = list(dict.fromkeys(text for text, value in zip(texts, values) if value is None))
+    with metrics.stage("nlp"):
+        nlp_values = dict(zip(pending_texts, analize_texts_with_nlp(pending_texts, batch_size, workers)))
+    analysis_stats["nlp"] += len(pending_texts)
+
+    if analysis_cache:
+        for text, value in nlp_values.items():
+            analysis_cache.put(text, value)
+
+    return [nlp_values[text] if value is None else value for text, value in zip(texts, values)]
+
+
+def analize_texts_with_nlp(texts, batch_size=NLP_BATCH_SIZE, workers=NLP_WORKERS):
+    '''Función que analiza un array de textos con spaCy y retorna los 3 valores de cada uno, en el mismo orden. Con más de un 'worker' se reparten los textos en partes entre varios procesos, cada uno con su propio modelo de spaCy.'''
+    if not texts:
+        return []           # Así no se carga spaCy si no hay nada para analizar.
+
+    if workers <= 1 or len(texts) < workers:
+        return analize_chunk(texts, batch_size)
+
+    chunk_size = -(-len(texts) // (workers * NLP_CHUNKS_PER_WORKER))     # División redondeando hacia arriba.
+    chunks = [texts[start:start + chunk_size] for start in range(0, len(texts), chunk_size)]
 
+    # 'map' devuelve los resultados de cada parte en el mismo orden en que se enviaron:
+    values = []
+    # Cada proceso carga su modelo de spaCy una sola vez, al iniciarse:
+    with ProcessPoolExecutor(max_workers=workers, initializer=get_nlp) as executor:
+        for chunk_values in executor.map(analize_chunk, chunks, repeat(batch_size)):
+            values += chunk_values
+
+    return values
+
+
+def normalize_salary_text(text):
+    '''Función que normaliza un texto de salario para usarlo como clave del caché de análisis. Sólo se quitan espacios en los extremos y se pasa a mayúsculas (igual que en get_value_from_string): los espacios internos generan tokens en spaCy y pueden cambiar el resultado.'''
+    return text.strip().upper()
+
+
+def get_analysis_version():
+    '''Función que retorna un string que identifica al modelo de spaCy y a las reglas de análisis. Si alguno cambia, también cambia este string.'''
+    try:
+        model_version = metadata.version(NLP_MODEL_PACKAGE)
+        spacy_version = metadata.version("spacy")
+    except metadata.PackageNotFoundError:
+        model_version = spacy_version = "?"
+
+    rules = [PARSING_RULES_VERSION, TOKENS_LIMIT, DISCARDED_TAGS, VALID_CURRENCY_TYPES, VALID_NET_TYPES,
+             VALID_TYPE_CURRENCIES_TAGS, VALID_CURRENCIES_SYMBOLS_TAGS, VALID_AMOUNTS_TAGS,
+             VALID_SUFFIX_SYMBOLS_TAGS, VALID_CURRENCIES_CODES, VALID_PESOS_CODES, VALID_DOLAR_CODES,
+             VALID_EUROS_CODES, REGEX_REPLACE_INVALID_PATTERN, REGEX_CONVERT_AMOUNT_PATTERN, AMOUNT_REPLACEMENTS]
+    rules_hash = hashlib.sha1(json.dumps(rules, ensure_ascii=False).encode()).hexdigest()[:12]
+
+    return f"{NLP_MODEL_PACKAGE}-{model_version}/spacy-{spacy_version}/reglas-{rules_hash}"
+
+
+def set_analysis_cache_options(enabled=True, max_entries=ANALYSIS_CACHE_MAX_ENTRIES):
+    '''Función que activa (leyendo desde disco) o desactiva el caché de textos de salarios ya analizados.'''
+    global analysis_cache
+
+    analysis_cache = AnalysisCache(max_entries=max_entries) if enabled else None
+
+
+def get_data_from_doc(nlp_obj):
+    '''Función que recorre los tokens de un texto ya analizado por spaCy y devuelve 3 valores determinados: tipo de salario, moneda y monto.'''
     # Variables que guardarán los datos a obtener:
     type_slry = None
     currency_slry= None
@@ -426,12 +1802,7 @@ def parse_string_to_integer(string_number):
     if string_number:
         # Si el string no contiene solamente dígitos...
         if not string_number.isdigit():
-            # Borrar cualquier caracter que no sea números, puntos. comas o palabras clave:
-            string_number = re.sub(REGEX_REPLACE_INVALID_PATTERN, '', string_number, flags=re.IGNORECASE)
-
-            # Reemplazar sufijos o palabras clave (ej: 'miles') con el patrón que corresponda:
-            for pattern in REGEX_CONVERT_AMOUNT_PATTERNS:
-                string_number = re.sub(pattern[0], pattern[1], string_number, flags=re.IGNORECASE)
+            string_number = normalize_amount_string(string_number)
 
         # Parsear string a número entero:
         try:
@@ -443,22 +1814,62 @@ def parse_string_to_integer(string_number):
             return number
 
 
-def get_all_salaries_data_from(results):
-    '''Función que recibe un array de dicc. y guarda nuevos valores dentro de cada dicc. Retorna este array modificado, además de un número contador.''' 
+def normalize_amount_string(string_number):
+    '''Función que deja un monto listo para float() en una sola pasada: borra separadores de miles, cambia la coma decimal por punto, reemplaza sufijos (MIL, K, MILLONES) por su valor y borra el resto de las letras.'''
+    # Borrar cualquier caracter que no sea números, puntos. comas o palabras clave:
+    string_number = REGEX_REPLACE_INVALID.sub('', string_number)
+
+    return REGEX_CONVERT_AMOUNT.sub(replace_amount_match, string_number)
+
+
+def replace_amount_match(match):
+    '''Función que devuelve el reemplazo de cada parte de un monto encontrada por REGEX_CONVERT_AMOUNT.'''
+    return AMOUNT_REPLACEMENTS[match.lastgroup]
+
+
+def get_all_salaries_data_from(results, batch_size=NLP_BATCH_SIZE, workers=NLP_WORKERS):
+    '''Función que recibe un array de dicc. y guarda nuevos valores dentro de cada dicc. Retorna este array modificado, además de un número contador. Con 'batch_size' se analizan todos los textos juntos con nlp.pipe (0 = de a un post) y con 'workers' se reparten entre varios procesos.''' 
     global main_counter
     salaries_posts_counter = 0
-    value = None
+    percent_posts_salaries = 0
 
     log_and_print(f"\n   {main_counter}) Analizando los {len(results)} posts encontrados. Esto también va a tardar unos segundos... ⏳")
     main_counter += 1
 
-    # Recorriendo cada post en array results:
-    for position, post in enumerate(results):
-        # Obtener array de valores encontrados dentro del string posts['text']:
-        selected_text = get_value_from_string(post["post"])
+    if not results:
+        log_and_print("   - No hay posts nuevos para analizar.")
+        return results, salaries_posts_counter
+
+    initial_time = get_time()
+    salaries_posts_counter = add_salaries_data_to(results, batch_size, workers)
+    elapsed_time = get_elapsed_time_from(initial_time, get_time())
 
+    # Porcentaje de posts con contenido detectado de salarios:
+    percent_posts_salaries = round((salaries_posts_counter * 100) / len(results), 1)
+
+    log_and_print(f"   - Se detectaron {salaries_posts_counter} posts con salarios ({percent_posts_salaries}% del total). ")
+    log_analysis_stats(salaries_posts_counter, elapsed_time, workers)
+
+    return results, salaries_posts_counter
+
+
+def add_salaries_data_to(results, batch_size=NLP_BATCH_SIZE, workers=NLP_WORKERS):
+    '''Función que agrega a cada dicc. de un array el texto con el salario y sus 3 valores (tipo, moneda y monto). Retorna la cantidad de posts con salarios.'''
+    salaries_posts_counter = 0
+
+    # Obtener el texto con el salario de cada post (string vacío si no tiene):
+    with metrics.stage("salary_search"):
+        selected_texts = [get_value_from_string(post["post"]) for post in results]
+    apply_post_text_mode(results)
+    texts_to_analize = [text for text in selected_texts if text]
+    with metrics.stage("analysis"):
+        analized_values = iter(analize_texts(texts_to_analize, batch_size, workers))
+    metrics.count("posts_analyzed", len(results))
+
+    # Recorriendo cada post en array results:
+    for position, selected_text in enumerate(selected_texts):
         if selected_text:
-            type_slry, currency_slry, amount_slry = analize_and_get_data_from(selected_text)
+            type_slry, currency_slry, amount_slry = next(analized_values)
             salaries_posts_counter += 1
 
         else:
@@ -470,30 +1881,406 @@ def get_all_salaries_data_from(results):
             currency_slry = None
             amount_slry = None
 
-        # Porcentaje de posts con contenido detectado de salarios:
-        percent_posts_salaries = round((salaries_posts_counter * 100) / len(results), 1)
-
         # Agregar finalmente a cada diccionario dentro del array results:
         results[position]["selected_text"] = selected_text
-        results[position]["type"] = type_slry
-        results[position]["currency"] = currency_slry
+        results[position]["type"] = sys.intern(type_slry) if type_slry else type_slry
+        results[position]["currency"] = sys.intern(currency_slry) if currency_slry else currency_slry
         results[position]["amount"] = amount_slry
 
+    return salaries_posts_counter
+
+
+def apply_post_text_mode(results):
+    '''Función que, una vez obtenido el texto con el salario de cada post, descarta su texto completo ("drop") o lo comparte con el de los posts de texto igual ("intern"), según post_text_mode. El texto completo queda igual guardado en la base.'''
+    if post_text_mode == "drop":
+        for post in results:
+            post["post"] = None
+    elif post_text_mode == "intern":
+        for post in results:
+            if post["post"]:
+                post["post"] = sys.intern(post["post"])
+
+
+def set_post_options(text_mode=POST_TEXT_MODE):
+    '''Función que elige qué hacer con el texto de cada post una vez obtenido el texto con el salario.'''
+    global post_text_mode
+
+    post_text_mode = text_mode
+
+
+def log_analysis_stats(salaries_posts_counter, elapsed_time, workers):
+    '''Función que muestra los aciertos del caché de análisis y la velocidad del análisis.'''
+    if analysis_cache:
+        log_and_print(f"   - Caché de análisis: {analysis_cache.hits} aciertos, {analysis_cache.misses} fallos.")
+    if elapsed_time:
+        log_and_print(f"   - Análisis: {int(salaries_posts_counter / elapsed_time)} posts/seg. ({workers} proceso/s).")
+
+
+def stream_posts_by_page(pages, workers=None, failed_pages=None):
+    '''Generador que descarga y parsea las páginas recibidas (en varios hilos o, con asyncio, por grupos) y devuelve, en orden, el n° y los posts de cada una. Nunca hay más de STREAM_QUEUE_SIZE páginas descargándose o esperando a ser consumidas. Las páginas que fallan no cortan el flujo: se informan y se agregan a 'failed_pages'.'''
+    if workers is None:
+        workers = DOWNLOAD_WORKERS
+
+    if fetch_engine == "asyncio":
+        # Un hilo descarga con asyncio un grupo de páginas mientras se consume el anterior:
+        group_size = max(STREAM_QUEUE_SIZE // 2, 1)
+        groups = iter([pages[start:start + group_size] for start in range(0, len(pages), group_size)])
+        executor_workers = 1
+
+        def get_group_posts(group):
+            return get_pages_posts_async(group, workers)
+    else:
+        groups = iter([[page] for page in pages])
+        executor_workers = workers
+        get_group_posts = get_pages_posts
+    pending_groups = deque()        # Cola acotada con los grupos de páginas pedidos (future), en orden.
+
+    with ThreadPoolExecutor(max_workers=executor_workers) as executor:
+        try:
+            for group in groups:
+                pending_groups.append(executor.submit(get_group_posts, group))
+                if len(pending_groups) * len(group) >= STREAM_QUEUE_SIZE:
+                    break
+
+            while pending_groups:
+                pages_posts = pending_groups.popleft().result()
+
+                # Al consumir un grupo se pide el siguiente, así la descarga sigue mientras se analiza:
+                next_group = next(groups, None)
+                if next_group is not None:
+                    pending_groups.append(executor.submit(get_group_posts, next_group))
+
+                for page, page_results in pages_posts.items():
+                    if isinstance(page_results, Exception):
+                        metrics.count("failed_pages")
+                        log_and_print(f"   - Página {page}: ❌ ({type(page_results).__name__}: {page_results})")
+                        if failed_pages is not None:
+                            failed_pages.append(page)
+                        continue
+                    yield page, page_results
+        finally:
+            for future in pending_groups:
+                future.cancel()
+
+
+def stream_salaries_by_page(pages_stream, batch_size=NLP_BATCH_SIZE):
+    '''Generador que agrega los datos de salarios a los posts de cada página recibida y la devuelve junto a su cantidad de posts con salarios.'''
+    for page, page_results in pages_stream:
+        salaries_posts_counter = add_salaries_data_to(page_results, batch_size, 1)
+        yield page, page_results, salaries_posts_counter
+
+
+def write_pages_to_progress_file(queue_pages, file=PROGRESS_FILE):
+    '''Función que toma páginas de una cola (hasta recibir None) y las agrega, una por linea, al archivo de progreso. Se ejecuta en un hilo aparte.'''
+    with open(file, "a", encoding="utf8") as open_file:
+        while (item := queue_pages.get()) is not None:
+            page, page_results = item
+            with metrics.stage("saving"):
+                open_file.write(json.dumps({"page": page, "posts": page_results}, ensure_ascii=False, default=get_serializable) + "\n")
+                open_file.flush()
+            if post_store:
+                post_store.upsert_posts(page_results)
+
+
+def read_progress_file(file=PROGRESS_FILE):
+    '''Generador que devuelve el n° y los posts de cada página guardada en el archivo de progreso. Una última linea incompleta (por un corte a mitad de escritura) se ignora.'''
+    try:
+        with open(file, "r", encoding="utf8") as open_file:
+            for line in open_file:
+                try:
+                    data = json.loads(line)
+                except ValueError:
+                    break
+                yield data["page"], data["posts"]
+    except FileNotFoundError:
+        return
+
+
+def read_posts_from_progress_file(file=PROGRESS_FILE):
+    '''Generador que devuelve uno por uno los posts guardados en el archivo de progreso.'''
+    for _, page_results in read_progress_file(file):
+        yield from page_results
+
+
+def truncate_incomplete_progress(file=PROGRESS_FILE):
+    '''Función que borra del archivo de progreso una última linea incompleta (por un corte a mitad de escritura), para poder seguir agregando páginas.'''
+    try:
+        with open(file, "rb+") as open_file:
+            valid_length = 0
+            for line in open_file:
+                try:
+                    json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                valid_length += len(line)
+            open_file.truncate(valid_length)
+    except FileNotFoundError:
+        pass
+
+
+def save_progress_to_json_file(file, progress_file=PROGRESS_FILE):
+    '''Función que pasa los posts del archivo de progreso al archivo json de resultados, con el mismo formato que save_to_json_file() pero sin cargar todos los posts en memoria.'''
+    global main_counter
+    log_and_print(f"\n   {main_counter}) Guardando datos en archivo '{file}'... 💾")
+    main_counter += 1
+
+    separator = "\n"
+    with metrics.stage("saving"), open(file, "w", encoding="utf8") as file_to_save:
+        file_to_save.write("[")
+        for _, page_results in read_progress_file(progress_file):
+            for post in page_results:
+                post_text = json.dumps(post, indent=4, ensure_ascii=False)
+                file_to_save.write(separator + textwrap.indent(post_text, "    "))
+                separator = ",\n"
+        file_to_save.write("\n]" if separator != "\n" else "]")
+
+
+def run_streaming_pipeline(number_pages, batch_size=NLP_BATCH_SIZE, progress_file=PROGRESS_FILE):
+    '''Función que descarga, analiza y guarda las páginas del thread en un flujo continuo: cada página pasa por todas las etapas apenas se descarga y queda guardada en el archivo de progreso. Si una ejecución anterior se cortó, se retoma desde la página siguiente a la última guardada. Retorna la cantidad de posts con salarios y el total de posts.'''
+    global main_counter
+
+    # Retomar desde donde quedó la ejecución anterior (si no terminó):
+    truncate_incomplete_progress(progress_file)
+    salaries_posts_counter = 0
+    total_posts = 0
+    last_saved_page = 0
+    for page, page_results in read_progress_file(progress_file):
+        last_saved_page = max(last_saved_page, page)     # Las páginas reintentadas se guardan fuera de orden.
+        total_posts += len(page_results)
+        salaries_posts_counter += count_salaries_posts(page_results)
+    if last_saved_page >= number_pages:
+        # Si el progreso llega hasta la última página, es de una ejecución que ya terminó: empezar de cero.
+        Path(progress_file).unlink()
+        salaries_posts_counter = total_posts = last_saved_page = 0
+
+    log_and_print(f"\n   {main_counter}) Descargando y analizando las páginas {last_saved_page + 1} a {number_pages} del thread, de a una... ⏳")
+    main_counter += 1
+    if last_saved_page:
+        log_and_print(f"   - Se retoma lo guardado en '{progress_file}' (hasta la página {last_saved_page}).")
+    # Las páginas que fallaron la vez anterior (y ya quedaron atrás) se descargan de nuevo:
+    retried_pages = [page for page in read_failed_pages() if page <= last_saved_page]
+    if retried_pages:
+        log_and_print(f"   - Se reintentan {len(retried_pages)} páginas que fallaron la vez anterior: {retried_pages}")
+    pages = retried_pages + list(range(last_saved_page + 1, number_pages + 1))
+
+    # El guardado se hace en otro hilo, con una cola acotada entre el análisis y la escritura:
+    queue_pages = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+    writer = threading.Thread(target=write_pages_to_progress_file, args=(queue_pages, progress_file))
+    writer.start()
+
+    initial_time = get_time()
+    failed_pages = []
+    saved_pages = set()
+    try:
+        pages_stream = stream_posts_by_page(pages, failed_pages=failed_pages)
+        for page, page_results, page_salaries in stream_salaries_by_page(pages_stream, batch_size):
+            queue_pages.put((page, page_results))
+            saved_pages.add(page)
+            salaries_posts_counter += page_salaries
+            total_posts += len(page_results)
+            log_and_print(f"   - Página {page}: ✅ ({page_salaries} salarios)")
+    finally:
+        queue_pages.put(None)
+        writer.join()
+        # Si se corta antes de llegar a las páginas reintentadas, siguen pendientes para la próxima vez:
+        save_failed_pages(failed_pages + [page for page in retried_pages if page not in saved_pages and page not in failed_pages])
+    if failed_pages:
+        log_and_print(f"   - {len(failed_pages)} páginas con errores. Se reintentan en la próxima ejecución ('{FAILED_PAGES_FILE}').")
+    elapsed_time = get_elapsed_time_from(initial_time, get_time())
+
+    percent_posts_salaries = round((salaries_posts_counter * 100) / total_posts, 1) if total_posts else 0
     log_and_print(f"   - Se detectaron {salaries_posts_counter} posts con salarios ({percent_posts_salaries}% del total). ")
+    log_analysis_stats(salaries_posts_counter, elapsed_time, 1)
+
+    return salaries_posts_counter, total_posts
+
+
+def crawl_threads(urls, batch_size=NLP_BATCH_SIZE, workers=NLP_WORKERS, check_only=False):
+    '''Función que procesa varios threads de 3DG (ej: el de cada año) a la vez, cada uno con su propio contexto: busca la última página de cada uno, descarga todas sus páginas, analiza los posts, guarda los resultados de cada thread y los une en una serie por fecha.'''
+    contexts = make_thread_contexts(urls)
+    find_threads_last_pages(contexts)
+
+    if check_only:
+        for context in contexts:
+            log_and_print(f"   - {context.log_prefix}{context.number_pages} páginas ({context.url}).")
+        return contexts
+
+    get_all_threads_posts(contexts)
+    all_posts = [post for context in contexts for post in context.get_results()]
+    get_all_salaries_data_from(all_posts, batch_size, workers)
+
+    THREADS_FOLDER_PATH.mkdir(parents=True, exist_ok=True)
+    for context in contexts:
+        save_to_json_file(THREADS_FOLDER_PATH / f"{context.thread_id}.json", context.get_results())
+    save_to_jsonl_file(SERIES_FILE, merge_threads_results(THREADS_FOLDER_PATH))
+
+    return contexts
+
+
+def make_thread_contexts(urls):
+    '''Función que retorna un contexto por cada thread de las urls recibidas (sin repetir threads).'''
+    contexts = {}
+    for url in urls:
+        context = ThreadContext(url)
+        context.log_prefix = f"[{context.thread_id}] "
+        contexts.setdefault(context.thread_id, context)
+
+    return list(contexts.values())
 
-    return results, salaries_posts_counter
 
+def find_threads_last_pages(contexts):
+    '''Función que busca en simultáneo la última página de varios threads y la guarda en el contexto de cada uno.'''
+    global main_counter
+
+    log_and_print(f"\n   {main_counter}) Buscando la última página de {len(contexts)} threads de 3DG... 🔎")
+    main_counter += 1
+
+    # La búsqueda de cada thread es secuencial, pero los threads se buscan a la vez (sin pasar el límite de hilos):
+    with ThreadPoolExecutor(max_workers=max(min(len(contexts), DOWNLOAD_WORKERS), 1)) as executor:
+        for context, number_pages in zip(contexts, executor.map(find_last_page, contexts)):
+            context.number_pages = number_pages
+
+    return contexts
+
+
+def get_all_threads_posts(contexts, workers=None):
+    '''Función que descarga todas las páginas de varios threads con un único grupo de hilos: así todos los threads comparten el mismo límite de conexiones (y de requests por segundo). Los posts quedan en el contexto de cada thread.'''
+    global main_counter
+
+    if workers is None:
+        workers = DOWNLOAD_WORKERS
+
+    jobs = [(context, page) for context in contexts for page in range(1, context.number_pages + 1)]
+    log_and_print(f"\n   {main_counter}) Descargando {len(jobs)} páginas de {len(contexts)} threads. Esto puede llevar varios segundos... ⏳")
+    main_counter += 1
+    # Las páginas que fallaron la vez anterior se vuelven a pedir junto con el resto (se descargan todas):
+    for context in contexts:
+        retried_pages = [page for page in read_failed_pages(context) if page <= context.number_pages]
+        if retried_pages:
+            log_and_print(f"   - {context.log_prefix}Se reintentan {len(retried_pages)} páginas que fallaron la vez anterior: {retried_pages}")
+
+    if fetch_engine == "asyncio":
+        return get_all_threads_posts_async(contexts, jobs, workers)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(get_thread_page_posts, context, page) for context, page in jobs]
+        for (context, page), future in zip(jobs, futures):
+            future.result()
+            log_and_print(f"   - {context.log_prefix}Página {page}: ✅")
+    for context in contexts:
+        save_failed_pages([], context)
+
+    return contexts
+
+
+def get_all_threads_posts_async(contexts, jobs, workers=None):
+    '''Función que descarga con asyncio las páginas (contexto, n° de página) de varios threads, todas con el mismo límite de requests en simultáneo, y guarda los posts en el contexto de cada thread. Una página que falla (aún reintentando) no corta la descarga del resto: se informa y se guarda (por thread) para reintentarla en la próxima ejecución.'''
+    get_session()               # Crea (si no existe) el limitador de requests por segundo compartido.
+
+    # No se descargan de nuevo las páginas ya parseadas al buscar la última página:
+    parsed_pages = [context.pop_discovered_page(page) for context, page in jobs]
+    pending_jobs = [job for job, all_posts in zip(jobs, parsed_pages) if all_posts is None]
+    htmls = iter(asyncio.run(fetch_threads_pages_async(pending_jobs, workers)))
+
+    failed_pages = {context.thread_id: [] for context in contexts}
+    for (context, page), all_posts in zip(jobs, parsed_pages):
+        if all_posts is None:
+            html_page = next(htmls)
+            if isinstance(html_page, Exception):
+                failed_pages[context.thread_id].append(page)
+                log_and_print(f"   - {context.log_prefix}Página {page}: ❌ ({type(html_page).__name__}: {html_page})")
+                continue
+            all_posts = parse_html_to_posts(html_page, html_parser, use_soup_strainer)
+
+        context.add_page_results(page, get_posts_data_from(all_posts))
+        log_and_print(f"   - {context.log_prefix}Página {page}: ✅")
+
+    for context in contexts:
+        save_failed_pages(failed_pages[context.thread_id], context)
+    total_failed_pages = sum(len(pages) for pages in failed_pages.values())
+    if total_failed_pages:
+        metrics.count("failed_pages", total_failed_pages)
+        log_and_print(f"   - {total_failed_pages} páginas con errores. Se reintentan en la próxima ejecución ('{FAILED_PAGES_FILE}').")
+
+    return contexts
+
+
+def get_thread_page_posts(context, page_number):
+    '''Función que descarga los posts de una página de un thread y los guarda en su contexto.'''
+    page_results = get_posts_from(page_number, context)
+    context.add_page_results(page_number, page_results)
 
-def save_to_db(salaries_counter, file=JSON_DB_FILE):
-    '''Función para crear dicc. con datos importantes del script, para guardar en archivo json.'''
+    return page_results
+
+
+def merge_threads_results(folder=THREADS_FOLDER_PATH):
+    '''Función que une los resultados guardados de cada thread (uno por archivo json) en una sola serie de posts ordenada por fecha. A cada post se le agrega el id de su thread.'''
+    series = []
+    for file in sorted(Path(folder).glob("*.json")):
+        with open(file, "r", encoding="utf8") as open_file:
+            series += [{"thread_id": file.stem, **post} for post in json.load(open_file)]
+
+    return sorted(series, key=lambda post: (post["timestamp"] or 0, post["thread_id"], post["post_number"]))
+
+
+def count_salaries_posts(results):
+    '''Sencilla función que retorna la cantidad de posts de un array en los que se detectó un salario.'''
+    return sum(1 for post in results if post.get("selected_text"))
+
+
+def save_to_db(number_pages, total_posts, salaries_counter):
+    '''Función para crear dicc. con datos importantes del script, para guardar en la base.'''
+    global main_counter
     new_data = {
         "total_pages": number_pages,
-        "total_posts": len(results),
+        "total_posts": total_posts,
         "salaries_posts": salaries_counter,
-        "last_timestamp": int(get_time())
+        "last_timestamp": int(get_time()),
+        "text_extractor": text_extractor
     }
 
-    save_to_json_file(file, new_data)
+    log_and_print(f"\n   {main_counter}) Guardando datos de la ejecución en la base '{post_store.file}'... 💾")
+    main_counter += 1
+    post_store.set_metadata(new_data)
+
+
+def save_posts_to_db(posts):
+    '''Función que guarda (o actualiza) en la base los posts de un array.'''
+    global main_counter
+    log_and_print(f"\n   {main_counter}) Guardando {len(posts)} posts en la base '{post_store.file}'... 💾")
+    main_counter += 1
+    post_store.upsert_posts(posts)
+
+
+def save_metrics(file=METRICS_FILE, prometheus_file=None):
+    '''Función que muestra los segundos de cada etapa y guarda el resumen de mediciones de la ejecución en un archivo json y, si se pide, en formato de texto de Prometheus.'''
+    summary = metrics.get_summary()
+    stages_seconds = ", ".join(f"{name} {stage['seconds']:.2f}" for name, stage in summary["stages"].items())
+    log_and_print(f"   - Segundos por etapa: {stages_seconds}.")
+
+    try:
+        Path(file).parent.mkdir(parents=True, exist_ok=True)
+        with open(file, "w") as open_file:
+            json.dump(summary, open_file, indent=4)
+
+        if prometheus_file:
+            # Se escribe aparte y se renombra, así node exporter nunca lee un archivo a medias:
+            temp_file = Path(f"{prometheus_file}.tmp")
+            temp_file.write_text(metrics.to_prometheus(summary))
+            os.replace(temp_file, prometheus_file)
+    except Exception as error:
+        error_message(error)
+
+
+def save_profile(profiler, file=PROFILE_FILE):
+    '''Función que guarda las estadísticas de cProfile de la ejecución y muestra las funciones con mayor tiempo acumulado.'''
+    profiler.dump_stats(file)
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+    log_and_print(f"\n   - Perfil de la ejecución guardado en '{file}' (ver con: python -m pstats {file}).")
+    log_and_print(stream.getvalue())
 
 
 def get_time():
@@ -516,10 +2303,10 @@ def end_message():
     log_and_print("\n# Fin del script.\n") 
 
 
-def success_message(elapsed_time):
+def success_message(elapsed_time, results_file=JSON_RESULTS_FILE):
     '''Función que muestra mensaje al usuario sobre finalización del script.'''
     log_and_print(f"\n   {main_counter}) Listo el pollo: todos los posts fueron analizados con éxito. 🐔✨")
-    log_and_print(f"   - Recordar que los datos recolectados fueron guardados en el archivo '{JSON_RESULTS_FILE}'.")
+    log_and_print(f"   - Recordar que los datos recolectados fueron guardados en el archivo '{results_file}'.")
     log_and_print(f"   - Tardé {elapsed_time} seg. en realizar todas las tareas. ⏳")
 
 
@@ -530,13 +2317,76 @@ def error_message(error):
     logging.error("", exc_info=True)
 
 
-def main():
-    global results
-    global number_pages
+def parse_arguments(args=None):
+    '''Función que define y parsea los argumentos recibidos por línea de comandos.'''
+    parser = argparse.ArgumentParser(description="Obtiene y analiza los salarios del thread de 3DG.")
+    parser.add_argument("--download-workers", type=int, default=DOWNLOAD_WORKERS,
+                        help=f"Hilos para descargar páginas en simultáneo (1 = secuencial, por defecto {DOWNLOAD_WORKERS}).")
+    parser.add_argument("--rate-limit", type=float, default=REQUESTS_PER_SECOND,
+                        help=f"Máximo de requests por segundo al host de 3DG (0 = sin límite, por defecto {REQUESTS_PER_SECOND}).")
+    parser.add_argument("--fetch-engine", choices=FETCH_ENGINES, default=FETCH_ENGINE,
+                        help=f"Cómo se descargan las páginas del thread: con hilos y requests ('requests') o con asyncio y aiohttp ('asyncio', con reintentos; una página que falla no corta la descarga y se reintenta en la próxima ejecución). Sin aiohttp instalada se usa '{FETCH_ENGINE}'. Por defecto '{FETCH_ENGINE}'.")
+    parser.add_argument("--retries", type=int, default=MAX_RETRIES,
+                        help=f"Reintentos de cada página que falla (429, 5xx, timeout o error de conexión) con '--fetch-engine asyncio' (por defecto {MAX_RETRIES}).")
+    parser.add_argument("--offline", action="store_true",
+                        help="Usa las páginas guardadas en el caché sin consultar al foro (si no están, se descargan).")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="No guarda ni reutiliza páginas html en el caché en disco.")
+    parser.add_argument("--cache-size", type=int, default=CACHE_MAX_MEGABYTES,
+                        help=f"Tamaño máximo del caché de páginas en MB (por defecto {CACHE_MAX_MEGABYTES}).")
+    parser.add_argument("--nlp-batch-size", type=int, default=NLP_BATCH_SIZE,
+                        help=f"Textos por lote al analizar con spaCy (0 = de a un post, por defecto {NLP_BATCH_SIZE}).")
+    parser.add_argument("--workers", type=int, default=NLP_WORKERS,
+                        help=f"Procesos para el análisis NLP de los posts (por defecto {NLP_WORKERS}).")
+    parser.add_argument("--no-analysis-cache", action="store_true",
+                        help=f"No usa ni guarda el caché de textos de salarios ya analizados ('{ANALYSIS_CACHE_FILE}').")
+    parser.add_argument("--parser", choices=HTML_PARSERS, default=HTML_PARSER,
+                        help=f"Parser de html para BS4 (por defecto '{HTML_PARSER}').")
+    parser.add_argument("--full-soup", action="store_true",
+                        help="Parsea cada página entera, sin SoupStrainer (más lento).")
+    parser.add_argument("--text-extractor", choices=TEXT_EXTRACTORS, default=TEXT_EXTRACTOR,
+                        help=f"Cómo se obtiene el texto de cada post: recorriendo el html una vez ('direct') o convirtiéndolo a markdown como antes ('markdown'). Por defecto '{TEXT_EXTRACTOR}'.")
+    parser.add_argument("--post-text", choices=POST_TEXT_MODES, default=POST_TEXT_MODE,
+                        help=f"Qué hacer con el texto de cada post una vez obtenido el salario, para ahorrar memoria: dejarlo ('keep'), compartirlo entre posts de texto igual ('intern') o descartarlo de los resultados ('drop'; sigue en la base). Por defecto '{POST_TEXT_MODE}'.")
+    parser.add_argument("--check-only", action="store_true",
+                        help="Sólo informa si hay páginas nuevas en el thread, sin descargar ni analizar posts (no carga spaCy).")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--incremental", action="store_true",
+                      help=f"Reutiliza los posts de la base '{DB_FILE}' y sólo descarga la última página conocida y las nuevas.")
+    mode.add_argument("--refresh", action="store_true",
+                      help=f"Descarga de nuevo todas las páginas, pero sólo analiza los posts nuevos o editados (según el hash de su texto en la base '{DB_FILE}') y borra los que ya no están.")
+    parser.add_argument("--jsonl", action="store_true",
+                        help=f"Guarda también los posts en formato json lines ('{JSONL_RESULTS_FILE}'). En modo incremental sólo se agregan los posts nuevos o editados.")
+    parser.add_argument("--parquet", action="store_true",
+                        help=f"Guarda también las columnas de salarios en formato parquet ('{PARQUET_RESULTS_FILE}'). Necesita pyarrow (si no está instalada, se avisa y no se guarda).")
+    parser.add_argument("--prometheus", type=Path, metavar="ARCHIVO",
+                        help=f"Guarda también las mediciones de la ejecución (las de '{METRICS_FILE}') en formato de texto de Prometheus, para el 'textfile collector' de node exporter.")
+    parser.add_argument("--profile", type=Path, nargs="?", const=PROFILE_FILE, metavar="ARCHIVO",
+                        help=f"Ejecuta todo bajo cProfile y guarda las estadísticas (por defecto en '{PROFILE_FILE}'). No incluye a los procesos de --workers.")
+    mode.add_argument("--thread-urls", nargs="+", metavar="URL",
+                      help=f"Procesa a la vez varios threads de 3DG (ej: el de cada año; cada url termina en '/page'). Guarda los resultados de cada uno en '{THREADS_FOLDER_PATH}' y todos juntos, por fecha, en '{SERIES_FILE}'.")
+    mode.add_argument("--stream", action="store_true",
+                      help=f"Descarga, analiza y guarda cada página en un flujo continuo (memoria constante). El progreso queda en '{PROGRESS_FILE}' y se retoma si se corta.")
+
+    return parser.parse_args(args)
 
+
+def main():
+    global post_store
+
+    args = parse_arguments()
+    set_download_options(args.download_workers, args.rate_limit, args.fetch_engine, args.retries)
+    set_cache_options(not args.no_cache, args.cache_size, args.offline)
+    set_analysis_cache_options(not args.no_analysis_cache)
+    set_parser_options(args.parser, not args.full_soup, args.text_extractor)
+    set_post_options(args.post_text)
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler:
+        profiler.enable()
+
+    initial_time = get_time()
     try:
         # Iniciando:
-        initial_time = get_time()
         logging.basicConfig(filename=LOG_FILE,
                             filemode="w",
                             format="[%(levelname)s] %(message)s",
@@ -544,12 +2394,71 @@ def main():
         logging.info(f"[{time.ctime(initial_time)}]")
         init_message()
 
+        if args.thread_urls:
+            # Varios threads a la vez, cada uno con sus resultados (no se usa la base del thread de URL):
+            crawl_threads(args.thread_urls, args.nlp_batch_size, args.workers, args.check_only)
+            if not args.check_only:
+                success_message(get_elapsed_time_from(initial_time, get_time()), SERIES_FILE)
+            return
+
+        post_store = PostStore()
+        if post_store.set_text_extractor(text_extractor):
+            log_and_print("\n   - Los posts guardados se extrajeron con otro '--text-extractor': se recalcula su hash sin marcarlos como editados. 🔁")
+
         # Realizando las tareas necesarias:
-        number_pages = check_in_3DG_thread_the_last_pages()
-        results = get_all_post_from(results, number_pages)
-        results, salaries_counter = get_all_salaries_data_from(results)
-        save_to_db(salaries_counter)
-        save_to_json_file(JSON_RESULTS_FILE, results)
+        number_pages, last_known_pages = check_in_3DG_thread_the_last_pages()
+
+        if args.check_only:
+            log_and_print(f"\n   {main_counter}) Páginas nuevas desde la última vez: {number_pages - last_known_pages} (total: {number_pages}). 📄")
+            return
+
+        if args.incremental or args.refresh:
+            # Sólo se descargan (con --refresh, todas) y analizan las páginas que pueden haber cambiado desde la última vez:
+            append_to_jsonl = is_jsonl_up_to_date()
+            if not post_store.count_posts()[0]:
+                # La 1° vez con la base se importan los posts guardados por la ejecución anterior:
+                save_posts_to_db(read_previous_results())
+            # (Si cambió el extractor de texto se vuelven a descargar todas, para rehashear todos los posts):
+            first_page = last_known_pages if post_store.count_posts()[0] and not args.refresh and not post_store.rehashing else 1
+            # Cada página se guarda en la base al descargarse; quedan pendientes los posts nuevos o editados:
+            get_all_post_from([], number_pages, first_page=first_page)
+            pending_posts = post_store.get_posts(pending=True)
+            get_all_salaries_data_from(pending_posts, args.nlp_batch_size, args.workers)
+            save_posts_to_db(pending_posts)
+            results = post_store.get_posts()
+            salaries_counter = post_store.count_posts()[1]
+        elif args.stream:
+            salaries_counter, total_posts = run_streaming_pipeline(number_pages, args.nlp_batch_size)
+        else:
+            results = get_all_post_from([], number_pages)
+            results, salaries_counter = get_all_salaries_data_from(results, args.nlp_batch_size, args.workers)
+            save_posts_to_db(results)
+        log_posts_changes()
+
+        if args.stream:
+            save_to_db(number_pages, total_posts, salaries_counter)
+            save_progress_to_json_file(JSON_RESULTS_FILE)
+            if args.jsonl:
+                save_to_jsonl_file(JSONL_RESULTS_FILE, read_posts_from_progress_file())
+            if args.parquet:
+                save_to_parquet_file(PARQUET_RESULTS_FILE, read_posts_from_progress_file())
+            save_statistics(read_posts_from_progress_file())
+            PROGRESS_FILE.unlink()
+        else:
+            save_to_db(number_pages, len(results), salaries_counter)
+            save_to_json_file(JSON_RESULTS_FILE, results)
+            if args.jsonl:
+                # En modo incremental, si ya existe el archivo, sólo se agregan los posts nuevos o editados (si se
+                # borraron posts, se escribe de nuevo):
+                append = args.incremental and append_to_jsonl and not post_store.changes["removed"]
+                save_to_jsonl_file(JSONL_RESULTS_FILE, pending_posts if append else results, append)
+            if args.parquet:
+                save_to_parquet_file(PARQUET_RESULTS_FILE, results)
+            # En modo incremental sólo se actualizan los grupos de salarios con posts nuevos, editados o borrados:
+            if args.incremental or args.refresh:
+                save_statistics(results, pending_posts, post_store.changes["removed"])
+            else:
+                save_statistics(results)
 
         # Finalizando, con mensaje de éxito:
         final_time = get_time()
@@ -561,6 +2470,18 @@ def main():
         error_message(error)
 
     finally:
+        if page_cache:
+            page_cache.save()
+            log_and_print(f"\n   - Caché de páginas: {page_cache.hits} reutilizadas, {page_cache.misses} descargadas.")
+        if analysis_cache:
+            analysis_cache.save()
+        if post_store:
+            post_store.close()
+        metrics.add_time("total", get_time() - initial_time)
+        save_metrics(METRICS_FILE, args.prometheus)
+        if profiler:
+            profiler.disable()
+            save_profile(profiler, args.profile)
         end_message()
 
 # -------------------------------------------------------------------------------------------------
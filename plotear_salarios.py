@@ -2,25 +2,38 @@
 # Librerías
 # -------------------------------------------------------------------------------------------------
 # Biblioteca estándar
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import datetime
+import json
 from pathlib import Path
 import requests
+import sqlite3
 import time
-import tkinter
 
-# De terceros:
+# De terceros (el backend de matplotlib se elige recién en main(), según se muestre o se guarde el gráfico):
 import matplotlib
-matplotlib.use("tkagg")         # Para evitar mensaje de error (por no estar 'tkinter').
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
 import pandas as pd
 import regex as re
 
+# Propias:
+import estadisticas_salarios as estadisticas
+
 # -------------------------------------------------------------------------------------------------
 # Constantes
 # -------------------------------------------------------------------------------------------------
 FOLDER_PATH = "data"
+DB_FILE = Path(f"{FOLDER_PATH}/salarios.db")
 JSON_RESULTS_FILE = Path(f"{FOLDER_PATH}/resultados.json")
+JSONL_RESULTS_FILE = Path(f"{FOLDER_PATH}/resultados.jsonl")
+PARQUET_RESULTS_FILE = Path(f"{FOLDER_PATH}/resultados.parquet")
+# Únicas columnas que hacen falta para el gráfico (en la base y en parquet se leen sólo éstas):
+PLOT_COLUMNS = ["post_number", "type", "currency", "amount"]
+FX_CACHE_FILE = Path(f"{FOLDER_PATH}/cotizaciones.json")
+FX_TTL_SECONDS = 3600               # Segundos durante los cuales se reutiliza una cotización guardada.
 
 CRYPTO_YA_URL = "https://criptoya.com/api/dolar"
 TIMEOUT = 0.5
@@ -31,6 +44,103 @@ GROSS = "BRUTO"
 NET = "NETO"
 CHOOSED_SALARIES_TYPE = GROSS
 TITLE = "[3DG] 2022 - ¿Cuánto ganás/cobrás?"
+INTERACTIVE_BACKEND = "tkagg"
+HEADLESS_BACKEND = "Agg"            # Sin ventana (ni Tk): sólo para guardar archivos.
+IMAGE_FORMATS = ["png", "svg"]
+IMAGE_DPI = 100
+HEXBIN_GRID_SIZE = 60
+
+# -------------------------------------------------------------------------------------------------
+# Clases
+# -------------------------------------------------------------------------------------------------
+class ExchangeRates:
+    '''Clase que obtiene las cotizaciones (en pesos) de cada moneda extranjera consultando en simultáneo a sus proveedores. Las guarda en disco junto a un historial por fecha: si la guardada tiene menos de 'ttl' segundos no se consulta al proveedor, y si éste falla (o se trabaja sin conexión) se usa el último valor guardado.'''
+
+    def __init__(self, file=FX_CACHE_FILE, ttl=FX_TTL_SECONDS, urls=None):
+        self.file = Path(file)
+        self.ttl = ttl
+        # Moneda -> (función que consulta la cotización de venta, url del proveedor):
+        self.providers = {"USD": (request_dolar_blue, CRYPTO_YA_URL),
+                          "EUR": (request_euro_blue, PRECIOEUROBLUE_URL)}
+        for currency, url in (urls or {}).items():
+            self.providers[currency] = (self.providers[currency][0], url)
+        self.sources = {}           # Moneda -> de dónde salió la última cotización ('proveedor' o 'caché').
+        self.posts_before_history = {}      # Moneda -> posts anteriores al historial (convertidos con la última cotización).
+
+        try:
+            with open(self.file, "r") as open_file:
+                data = json.load(open_file)
+            self.latest = data["latest"]        # Moneda -> {"value": cotización, "timestamp": fecha de consulta}
+            self.history = data["history"]      # Moneda -> {"AAAA-MM-DD": cotización de ese día}
+        except (OSError, ValueError, KeyError):
+            self.latest = {}
+            self.history = {}
+
+    def request_rate(self, currency):
+        '''Método que consulta la cotización de una moneda a su proveedor. Retorna None si falla.'''
+        request_function, url = self.providers[currency]
+        try:
+            return request_function(url)
+        except (requests.RequestException, ValueError, KeyError, IndexError, TypeError):
+            return None
+
+    def get_rates(self, offline=False):
+        '''Método que retorna un dicc. con la cotización de cada moneda (None si nunca se pudo obtener). Sólo se consulta a los proveedores de las monedas cuya cotización guardada está vencida.'''
+        now = time.time()
+        expired = [currency for currency in self.providers
+                   if currency not in self.latest or now - self.latest[currency]["timestamp"] >= self.ttl]
+        rates = {currency: self.latest[currency]["value"] for currency in self.providers if currency in self.latest}
+        self.sources = {currency: "caché" for currency in rates}
+
+        if expired and not offline:
+            with ThreadPoolExecutor(max_workers=len(expired)) as executor:
+                for currency, value in zip(expired, executor.map(self.request_rate, expired)):
+                    if value is not None:
+                        rates[currency] = value
+                        self.sources[currency] = "proveedor"
+                        self.add_rate(currency, value, now)
+
+        return {currency: rates.get(currency) for currency in self.providers}
+
+    def add_rate(self, currency, value, timestamp):
+        '''Método que guarda una cotización como la última conocida y en el historial del día.'''
+        self.latest[currency] = {"value": value, "timestamp": timestamp}
+        date = datetime.date.fromtimestamp(timestamp).isoformat()
+        self.history.setdefault(currency, {})[date] = value
+
+    def get_rates_by_post(self, df):
+        '''Método que retorna una serie con la cotización de cada post del dataframe según su moneda y la fecha del post (la última del historial hasta ese día). Los posts anteriores al historial se convierten con la última cotización conocida y se cuentan en 'posts_before_history'. Los posts en pesos o sin moneda tienen cotización 1.'''
+        rates = pd.Series(1.0, index=df.index)
+        dates = df["timestamp"]
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            dates = pd.to_datetime(dates, unit="s")
+        self.posts_before_history = {}
+
+        for currency, history in self.history.items():
+            mask = df["currency"] == currency
+            if not history or not mask.any():
+                continue
+            history_df = pd.DataFrame({"date": pd.to_datetime(list(history)), "rate": list(history.values())})
+            posts_df = pd.DataFrame({"date": dates[mask].astype("datetime64[ns]"), "position": df.index[mask]})
+            merged = pd.merge_asof(posts_df.sort_values("date"),
+                                   history_df.astype({"date": "datetime64[ns]"}).sort_values("date"),
+                                   on="date", direction="backward")
+            # Nunca se usa una cotización posterior al post: los anteriores al historial van con la última conocida:
+            before_history = merged["rate"].isna()
+            if before_history.any():
+                latest = self.latest[currency]["value"] if currency in self.latest else history[max(history)]
+                merged.loc[before_history, "rate"] = latest
+                self.posts_before_history[currency] = int(before_history.sum())
+            rates[merged["position"].to_numpy()] = merged["rate"].to_numpy()
+
+        return rates
+
+    def save(self):
+        '''Método que guarda en disco las últimas cotizaciones y su historial.'''
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.file, "w") as open_file:
+            json.dump({"latest": self.latest, "history": self.history}, open_file, indent=4)
+
 
 # -------------------------------------------------------------------------------------------------
 # Funciones
@@ -52,12 +162,11 @@ def request_dolar_blue(url):
     response_dolar = requests.get(url, timeout=TIMEOUT).json()
     if response_dolar:
         dolar_blue = float(response_dolar["blue"])
-        print(f"\n- Dolar blue: {dolar_blue}")
 
     return dolar_blue
 
 
-def request_euro_blue(url, regex_pattern):
+def request_euro_blue(url, regex_pattern=EURO_REGEX_PATTERN):
     '''Función que obtiene valor de venta del euro blue desde html de precioeuroblue.com.ar'''
     euro_blue = None
     # Obtener euro blue bajando html de www.precioeuroblue.com.ar:
@@ -67,36 +176,63 @@ def request_euro_blue(url, regex_pattern):
         euro_values = re.findall(regex_pattern, response_euro)
         if euro_values: # 2 valores: el 1°es euro blue de compra, el 2° valor el de venta.
             euro_blue = float(euro_values[1])       # Obtenemos el 2° valor, el de venta.
-            print(f"- Euro blue: {euro_blue}\n")
 
     return euro_blue
 
 
-def make_and_return_dataframe(file):
-    '''Función que crea y retorna un objeto dataframe (pandas)'''
-    # Leer Json y convertir a Panda Dataframe:
-    df = pd.read_json(file)
+def get_results_file():
+    '''Función que retorna el archivo de resultados más conveniente para leer: la base SQLite (siempre al día) si existe, luego parquet o json lines si están al día con el json, si no el json.'''
+    if DB_FILE.exists():
+        return DB_FILE
+
+    for file in (PARQUET_RESULTS_FILE, JSONL_RESULTS_FILE):
+        if file.exists() and (not JSON_RESULTS_FILE.exists()
+                              or file.stat().st_mtime >= JSON_RESULTS_FILE.stat().st_mtime):
+            return file
+
+    return JSON_RESULTS_FILE
+
+
+def make_and_return_dataframe(file, with_dates=False):
+    '''Función que crea y retorna un objeto dataframe (pandas). Con 'with_dates' se lee también la fecha de cada post.'''
+    file = Path(file)
+    columns = PLOT_COLUMNS + ["timestamp"] if with_dates else PLOT_COLUMNS
+    if file.suffix == ".db":
+        connection = sqlite3.connect(file)
+        try:
+            df = pd.read_sql_query(f"SELECT {', '.join(columns)} FROM posts ORDER BY post_number", connection)
+        finally:
+            connection.close()
+    elif file.suffix == ".parquet":
+        # Parquet es columnar: se leen sólo las columnas necesarias y ya con sus tipos:
+        df = pd.read_parquet(file, columns=columns)
+    elif file.suffix == ".jsonl":
+        # En json lines un post editado se agrega al final, así que se queda la última versión:
+        df = pd.read_json(file, lines=True)
+        df = df.drop_duplicates(subset="post_number", keep="last").sort_values("post_number")
+        df = df.reset_index(drop=True)
+    else:
+        # Leer Json y convertir a Panda Dataframe:
+        df = pd.read_json(file)
 
     return df
 
 
-def change_to_pesos(df, amount_counter, dolar_blue, euro_blue):
-    '''Función que recorre un objeto dataframe y reemplaza ciertos valores de monedas extrajeras por moneda local. Devuelve el dataframe modificado y un contador de campos con valores de montos.'''
-    # Convirtiendo dolares y euros a pesos:
-    for x in range(len(df)) :
-        if df.iloc[x, 7] > 0:
-            amount_counter += 1
-        if df.iloc[x, 6] == "USD":
-            df.iloc[x, 7] *= dolar_blue
-        elif df.iloc[x, 6] == "EUR":
-            df.iloc[x, 7] *= euro_blue
+def change_to_pesos(df, amount_counter, rates):
+    '''Función que reemplaza en un objeto dataframe los montos en monedas extranjeras por moneda local, según un dicc. de cotizaciones (moneda -> valor en pesos) o una serie con la cotización de cada post. Devuelve el dataframe modificado y un contador de campos con valores de montos.'''
+    amount_counter += int((df["amount"] > 0).sum())
+
+    # Convirtiendo a pesos toda la columna de una vez (las monedas sin cotización, como ARS, quedan igual):
+    if not isinstance(rates, pd.Series):
+        rates = df["currency"].map(rates).fillna(1)
+    df["amount"] = df["amount"] * rates
 
     return df, amount_counter
 
 
-def filter_salaries(df):
+def filter_salaries(df, salaries_type=CHOOSED_SALARIES_TYPE):
     '''Función que retoma un nuevo dataframe a partir del filtro sobre el dataframe recibido por argumento.'''
-    return df[df[TYPE] == CHOOSED_SALARIES_TYPE]
+    return df[df[TYPE] == salaries_type]
 
 
 def get_mean_from_dataframe(df, dolar_blue):
@@ -108,46 +244,107 @@ def get_mean_from_dataframe(df, dolar_blue):
     return mean_pesos, mean_dolares
 
 
-def show_scatterplot(df, total_posts, amount_counter, mean_pesos):
-    '''Función que plotea un gráfico con libería seaborn a partir de dataframe y demás datos pasados por argumento.'''
-    # Plotear con Seaborn:
+def print_precomputed_statistics(summary, salaries_type=CHOOSED_SALARIES_TYPE):
+    '''Función que muestra, para cada moneda, la mediana, los percentiles 25 y 75 y la media recortada de un tipo de salario, tomadas del resumen precalculado por estadisticas_salarios.py (en la moneda original de cada post).'''
+    for currency, statistics in sorted(summary.get(salaries_type, {}).items()):
+        print(f"- Mediana de salarios {salaries_type} en {currency}: {statistics['median']} (p25: {statistics['p25']}, "
+              f"p75: {statistics['p75']}, media recortada: {statistics['trimmed_mean']}, {statistics['count']} posts)")
+
+
+def make_scatterplot(df, total_posts, amount_counter, mean_pesos, salaries_type=CHOOSED_SALARIES_TYPE, max_points=0, hexbin=False):
+    '''Función que arma en una figura nueva un gráfico con libería seaborn a partir de dataframe y demás datos pasados por argumento. Con 'max_points' se grafica sólo una muestra de los posts y con 'hexbin' la densidad de posts en lugar de cada uno (para muchos posts). Retorna la figura.'''
     sns.set_theme(style="darkgrid", palette="rocket")
-    g = sns.scatterplot(data=df,
+    fig, g = plt.subplots(num=f"{TITLE} ({salaries_type})")
+
+    if hexbin:
+        # Densidad de posts por zona (el tiempo no depende de la cantidad de posts):
+        hexagons = g.hexbin(df.post_number, df.amount, gridsize=HEXBIN_GRID_SIZE, cmap="rocket_r", mincnt=1)
+        fig.colorbar(hexagons, ax=g, label="Posts")
+    else:
+        if max_points and len(df) > max_points:
+            df = df.sample(max_points, random_state=0).sort_values("post_number")
+
+        # Plotear con Seaborn:
+        sns.scatterplot(data=df,
                         x="post_number",
                         y="amount",
                         hue="type",
                         s=100,
                         palette="deep",
-                        marker="o")
+                        marker="o",
+                        ax=g)
 
     # Título y labels:
     g.set_title(TITLE)
-    g.set_xlabel(f"Users ({total_posts} salarios detectados en {CHOOSED_SALARIES_TYPE.lower()})")
+    g.set_xlabel(f"Users ({total_posts} salarios detectados en {salaries_type.lower()})")
     g.set_ylabel("Sueldos en pesos ($)")
 
     # Linea de salario medio (matplotlib):
-    plt.axhline(y=mean_pesos,
-                color='red',
-                linestyle='dashed',
-                label="media", )
-
-    # Leyenda :
-    plt.text(172.0,
-             mean_pesos,
-             f"Media (${int(mean_pesos)})",
-             horizontalalignment='left',
-             size='small',
-             color='red') #, weight='semibold')
+    g.axhline(y=mean_pesos,
+              color='red',
+              linestyle='dashed',
+              label="media", )
+
+    # Leyenda (a la derecha del gráfico, sea cual sea la cantidad de posts):
+    g.text(1.01,
+           mean_pesos,
+           f"Media (${int(mean_pesos)})",
+           transform=g.get_yaxis_transform(),
+           horizontalalignment='left',
+           size='small',
+           color='red') #, weight='semibold')
 
     # El argumento style='plain' evita que se convierta los salarios a notación científica:
-    plt.ticklabel_format(style='plain', axis='y')
+    g.ticklabel_format(style='plain', axis='y')
 
+    return fig
 
-    # plt.figure(num=TITLE) # Intentando poner título en ventana de matplotlib/seaborn.
+
+def show_scatterplot(df, total_posts, amount_counter, mean_pesos):
+    '''Función que plotea un gráfico con libería seaborn a partir de dataframe y demás datos pasados por argumento.'''
+    make_scatterplot(df, total_posts, amount_counter, mean_pesos)
     plt.show()
 
 
+def save_figure(fig, folder, salaries_type, formats):
+    '''Función que guarda una figura en la carpeta recibida, en cada uno de los formatos de imagen pedidos, y la cierra. Retorna los archivos guardados.'''
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    files = [folder / f"salarios_{salaries_type.lower()}.{image_format}" for image_format in formats]
+    for file in files:
+        fig.savefig(file, dpi=IMAGE_DPI, bbox_inches="tight")
+    plt.close(fig)      # Para no acumular figuras en memoria al generar varias.
+
+    return files
+
+
+def parse_arguments(args=None):
+    '''Función que define y parsea los argumentos recibidos por línea de comandos.'''
+    parser = argparse.ArgumentParser(description="Muestra en un gráfico los salarios del thread de 3DG.")
+    parser.add_argument("--offline", action="store_true",
+                        help=f"Usa las últimas cotizaciones guardadas en '{FX_CACHE_FILE}' sin consultar a los proveedores.")
+    parser.add_argument("--fx-ttl", type=int, default=FX_TTL_SECONDS,
+                        help=f"Segundos durante los cuales se reutiliza una cotización guardada (por defecto {FX_TTL_SECONDS}).")
+    parser.add_argument("--historical-rates", action="store_true",
+                        help="Convierte cada post a pesos con la última cotización guardada hasta su fecha, en lugar de la actual (los anteriores al historial, con la última conocida).")
+    parser.add_argument("--output", type=Path,
+                        help="Carpeta donde guardar los gráficos como imágenes, sin abrir ninguna ventana (backend Agg, sirve para cron).")
+    parser.add_argument("--formats", nargs="+", choices=IMAGE_FORMATS, default=IMAGE_FORMATS[:1],
+                        help="Formatos de imagen a guardar con --output (por defecto png).")
+    parser.add_argument("--types", nargs="+", choices=[GROSS, NET], default=[CHOOSED_SALARIES_TYPE],
+                        help=f"Tipos de salario a graficar, uno por figura (por defecto {CHOOSED_SALARIES_TYPE}).")
+    parser.add_argument("--max-points", type=int, default=0,
+                        help="Máximo de posts a dibujar por gráfico; si hay más se toma una muestra al azar (0 = todos).")
+    parser.add_argument("--hexbin", action="store_true",
+                        help="Grafica la densidad de posts (hexágonos) en lugar de cada post. El tiempo no crece con la cantidad de posts.")
+
+    return parser.parse_args(args)
+
+
 def main():
+    args = parse_arguments()
+    # Sin ventana si sólo se guardan imágenes (tampoco se carga Tk):
+    matplotlib.use(HEADLESS_BACKEND if args.output else INTERACTIVE_BACKEND)
 
     # Variables:
     print("\n# Iniciando script.")
@@ -155,29 +352,49 @@ def main():
     total_posts = 0
 
     # Tareas:
-    dolar_blue = request_dolar_blue(CRYPTO_YA_URL)
-    euro_blue = request_euro_blue(PRECIOEUROBLUE_URL, EURO_REGEX_PATTERN)
-    df = make_and_return_dataframe(JSON_RESULTS_FILE)
+    exchange_rates = ExchangeRates(ttl=args.fx_ttl)
+    rates = exchange_rates.get_rates(args.offline)
+    exchange_rates.save()
+    print(f"\n- Dolar blue: {rates['USD']} ({exchange_rates.sources.get('USD', 'sin datos')})")
+    print(f"- Euro blue: {rates['EUR']} ({exchange_rates.sources.get('EUR', 'sin datos')})\n")
+    missing_currencies = [currency for currency, value in rates.items() if value is None]
+    if missing_currencies:
+        raise SystemExit(f"- No hay cotización (ni guardada) de: {', '.join(missing_currencies)}. Reintentar con conexión.\n")
+    dolar_blue = rates["USD"]
+
+    df = make_and_return_dataframe(get_results_file(), args.historical_rates)
     total_posts = len(df)
-    df, amount_counter = change_to_pesos(df, amount_counter, dolar_blue, euro_blue)
-    df = filter_salaries(df)
-    mean_pesos, mean_dolares = get_mean_from_dataframe(df, dolar_blue)
-
-    '''
-    time_list = [time_0, time_1, time_2, time_3, time_4, time_5, time_6]
-    for pos, t in enumerate(time_list, 1):
-        if pos < len(time_list)-1:
-            print(f"- Tiempo {pos}: {get_elapsed_time_from(t, time_list[pos+1])} seg.")
-    '''
+    if args.historical_rates:
+        rates = exchange_rates.get_rates_by_post(df)
+        for currency, posts_counter in exchange_rates.posts_before_history.items():
+            print(f"- Posts en {currency} anteriores al historial de cotizaciones (convertidos con la última): {posts_counter}")
+    df, amount_counter = change_to_pesos(df, amount_counter, rates)
 
     # Mostrar datos por terminal antes de mostrar gráfico:
     print(f"- Total de posts en thread: {total_posts}")
     print(f"- Posts con salarios detectados: {amount_counter}")
-    print(f"- Valor medio de salarios (en pesos): ${mean_pesos}")
-    print(f"- Valor medio de salarios (en dolares blue:) u$s{mean_dolares}\n")
 
-    # Mostrar gráfico:
-    show_scatterplot(df, len(df), amount_counter, mean_pesos)
+    # Un gráfico por tipo de salario, todos a partir del mismo dataframe ya convertido a pesos:
+    summary = estadisticas.read_summary()
+    for salaries_type in args.types:
+        type_df = filter_salaries(df, salaries_type)
+        mean_pesos, mean_dolares = get_mean_from_dataframe(type_df, dolar_blue)
+        print(f"- Valor medio de salarios {salaries_type} (en pesos): ${mean_pesos}")
+        print(f"- Valor medio de salarios {salaries_type} (en dolares blue:) u$s{mean_dolares}")
+        if summary:
+            print_precomputed_statistics(summary, salaries_type)
+        print()
+
+        fig = make_scatterplot(type_df, len(type_df), amount_counter, mean_pesos, salaries_type,
+                               args.max_points, args.hexbin)
+        if args.output:
+            for file in save_figure(fig, args.output, salaries_type, args.formats):
+                print(f"- Gráfico guardado en '{file}'.")
+            print()
+
+    # Mostrar gráficos:
+    if not args.output:
+        plt.show()
 
 
     print("# Fin del script.\n")
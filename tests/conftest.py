@@ -0,0 +1,5 @@
+# Los scripts no son un paquete: se importan desde la carpeta raíz del repositorio.
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
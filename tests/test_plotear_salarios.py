@@ -0,0 +1,192 @@
+# -------------------------------------------------------------------------------------------------
+# Librerías
+# -------------------------------------------------------------------------------------------------
+# Biblioteca estándar:
+import threading
+import time
+
+# De terceros:
+import numpy as np
+import pandas as pd
+import pytest
+import requests
+
+# Propias:
+import plotear_salarios
+
+# -------------------------------------------------------------------------------------------------
+# Constantes
+# -------------------------------------------------------------------------------------------------
+DOLAR_BLUE = 201.5
+EURO_BLUE = 212.25
+EURO_PAGE = """<div><span class="label reference">208.50</span> <span class="label reference">{euro}</span></div>"""
+PROVIDER_LATENCY = 0.2              # Segundos que tarda cada proveedor falso en responder.
+NUMBER_ROWS = 5000
+
+# -------------------------------------------------------------------------------------------------
+# Funciones auxiliares
+# -------------------------------------------------------------------------------------------------
+def change_to_pesos_by_row(df, amount_counter, dolar_blue, euro_blue):
+    '''Función con la conversión a pesos anterior (fila por fila, con iloc), como referencia.'''
+    amount_column = df.columns.get_loc("amount")
+    currency_column = df.columns.get_loc("currency")
+
+    for x in range(len(df)):
+        if df.iloc[x, amount_column] > 0:
+            amount_counter += 1
+        if df.iloc[x, currency_column] == "USD":
+            df.iloc[x, amount_column] *= dolar_blue
+        elif df.iloc[x, currency_column] == "EUR":
+            df.iloc[x, amount_column] *= euro_blue
+
+    return df, amount_counter
+
+
+def make_salaries_dataframe(number_rows):
+    '''Función que retorna un dataframe con salarios al azar (con posts sin salario y sin moneda).'''
+    generator = np.random.default_rng(0)
+    amounts = generator.uniform(1000, 1000000, number_rows).round()
+    amounts[generator.random(number_rows) < 0.1] = np.nan
+    currencies = generator.choice(np.array(["ARS", "USD", "EUR", None], dtype=object), number_rows)
+
+    return pd.DataFrame({"post_number": np.arange(1, number_rows + 1),
+                         "type": generator.choice(["BRUTO", "NETO"], number_rows),
+                         "currency": currencies,
+                         "amount": amounts})
+
+
+def make_exchange_rates(cache_file, ttl, values=None, calls=None):
+    '''Función que crea un ExchangeRates cuyos proveedores son funciones locales (sin red): tardan PROVIDER_LATENCY, cuentan sus llamadas en 'calls' y retornan el valor de 'values' o, si es None, fallan como sin conexión.'''
+    values = {"USD": DOLAR_BLUE, "EUR": EURO_BLUE} if values is None else values
+    calls = {} if calls is None else calls
+    lock = threading.Lock()
+
+    def make_provider(currency):
+        def provider(url):
+            with lock:
+                calls[currency] = calls.get(currency, 0) + 1
+            time.sleep(PROVIDER_LATENCY)
+            if values.get(currency) is None:
+                raise requests.ConnectionError(url)
+            return values[currency]
+        return provider
+
+    exchange_rates = plotear_salarios.ExchangeRates(cache_file, ttl=ttl)
+    exchange_rates.providers = {currency: (make_provider(currency), url)
+                                for currency, (_, url) in exchange_rates.providers.items()}
+
+    return exchange_rates
+
+
+class FakeResponse:
+    '''Clase con la parte de requests.Response que usan los proveedores de cotizaciones.'''
+
+    def __init__(self, text="", data=None):
+        self.text = text
+        self.data = data
+
+    def json(self):
+        return self.data
+
+# -------------------------------------------------------------------------------------------------
+# Tests
+# -------------------------------------------------------------------------------------------------
+def test_change_to_pesos_same_as_by_row():
+    df = make_salaries_dataframe(NUMBER_ROWS)
+    expected_df, expected_counter = change_to_pesos_by_row(df.copy(), 3, DOLAR_BLUE, EURO_BLUE)
+
+    converted_df, counter = plotear_salarios.change_to_pesos(df.copy(), 3, {"USD": DOLAR_BLUE, "EUR": EURO_BLUE})
+
+    pd.testing.assert_frame_equal(converted_df, expected_df)
+    assert counter == expected_counter
+
+
+def test_change_to_pesos_with_rates_by_post():
+    df = pd.DataFrame({"currency": ["USD", "EUR", "ARS", None], "amount": [10.0, 10.0, 10.0, np.nan]})
+
+    converted_df, counter = plotear_salarios.change_to_pesos(df, 0, pd.Series([200.0, 210.0, 1.0, 1.0]))
+
+    assert converted_df["amount"].tolist()[:3] == [2000.0, 2100.0, 10.0]
+    assert np.isnan(converted_df["amount"].iloc[3])
+    assert counter == 3
+
+
+def test_request_providers_parse_responses(monkeypatch):
+    responses = {"dolar": FakeResponse(data={"oficial": 100.0, "blue": DOLAR_BLUE}),
+                 "euro": FakeResponse(text=EURO_PAGE.format(euro=EURO_BLUE))}
+    monkeypatch.setattr(plotear_salarios.requests, "get", lambda url, timeout: responses[url])
+
+    assert plotear_salarios.request_dolar_blue("dolar") == DOLAR_BLUE
+    assert plotear_salarios.request_euro_blue("euro") == EURO_BLUE
+
+
+def test_exchange_rates_are_requested_at_once(tmp_path):
+    exchange_rates = make_exchange_rates(tmp_path / "cotizaciones.json", ttl=60)
+
+    initial_time = time.perf_counter()
+    rates = exchange_rates.get_rates()
+    elapsed_time = time.perf_counter() - initial_time
+
+    assert rates == {"USD": DOLAR_BLUE, "EUR": EURO_BLUE}
+    assert exchange_rates.sources == {"USD": "proveedor", "EUR": "proveedor"}
+    assert elapsed_time < PROVIDER_LATENCY * 1.9
+
+
+def test_exchange_rates_cache_within_ttl(tmp_path):
+    cache_file = tmp_path / "cotizaciones.json"
+    first_rates = make_exchange_rates(cache_file, ttl=60)
+    first_rates.get_rates()
+    first_rates.save()
+
+    calls = {}
+    rates = make_exchange_rates(cache_file, ttl=60, values={"USD": 1.0, "EUR": 1.0}, calls=calls).get_rates()
+
+    assert calls == {}
+    assert rates == {"USD": DOLAR_BLUE, "EUR": EURO_BLUE}
+
+
+@pytest.mark.parametrize("offline", [False, True])
+def test_exchange_rates_fall_back_to_saved_values(tmp_path, offline):
+    cache_file = tmp_path / "cotizaciones.json"
+    first_rates = make_exchange_rates(cache_file, ttl=60)
+    first_rates.get_rates()
+    first_rates.save()
+
+    calls = {}
+    exchange_rates = make_exchange_rates(cache_file, ttl=0, values={}, calls=calls)
+    rates = exchange_rates.get_rates(offline)
+
+    assert rates == {"USD": DOLAR_BLUE, "EUR": EURO_BLUE}
+    assert exchange_rates.sources == {"USD": "caché", "EUR": "caché"}
+    assert calls == ({} if offline else {"USD": 1, "EUR": 1})
+
+
+def test_exchange_rates_without_any_value(tmp_path):
+    rates = make_exchange_rates(tmp_path / "cotizaciones.json", ttl=60, values={}).get_rates()
+
+    assert rates == {"USD": None, "EUR": None}
+
+
+def test_rates_by_post_never_use_a_later_rate(tmp_path):
+    exchange_rates = make_exchange_rates(tmp_path / "cotizaciones.json", ttl=60)
+    exchange_rates.add_rate("USD", 250.0, pd.Timestamp("2022-04-01").timestamp())
+    exchange_rates.history = {"USD": {"2022-02-01": 200.0, "2022-03-01": 220.0, "2022-04-01": 250.0}}
+    df = pd.DataFrame({"currency": ["USD", "USD", "USD", "USD", "ARS", "EUR"],
+                       "timestamp": pd.to_datetime(["2021-06-01", "2022-02-02", "2022-02-28", "2022-03-05",
+                                                    "2022-03-05", "2022-03-05"]),
+                       "amount": [1000.0] * 6})
+
+    rates = exchange_rates.get_rates_by_post(df)
+
+    # El post anterior al historial va con la última cotización conocida (y se cuenta), no con la más cercana:
+    assert rates.tolist() == [250.0, 200.0, 200.0, 220.0, 1.0, 1.0]
+    assert exchange_rates.posts_before_history == {"USD": 1}
+
+
+def test_rates_by_post_with_unix_timestamps(tmp_path):
+    exchange_rates = make_exchange_rates(tmp_path / "cotizaciones.json", ttl=60)
+    exchange_rates.history = {"EUR": {"2022-02-01": 210.0}}
+    df = pd.DataFrame({"currency": ["EUR"], "timestamp": [int(pd.Timestamp("2022-02-10").timestamp())], "amount": [1.0]})
+
+    assert exchange_rates.get_rates_by_post(df).tolist() == [210.0]
+    assert exchange_rates.posts_before_history == {}